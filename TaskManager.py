@@ -8,17 +8,31 @@
 - Поддержка горячих клавиш
 """
 
+import os
 import sys
+import threading
 import traceback
 import logging
-from PyQt6.QtWidgets import QMainWindow, QApplication, QMessageBox
+from PyQt6.QtWidgets import QMainWindow, QApplication, QMessageBox, QInputDialog, QMenu, QFileDialog
 from PyQt6.QtGui import QAction
-from PyQt6.QtCore import Qt
-from database import DatabaseManager
+from PyQt6.QtCore import QTimer, pyqtSignal
+from task import TaskSelection
 from settings import SettingsManager
 from ui_manager import UIManager
 from sound_manager import SoundManager
 from edit_task import EditTaskDialog
+from archive_dialog import ArchiveSearchDialog
+from agenda_dialog import AgendaDialog
+from analytics_dialog import AnalyticsDialog
+from attachments_dialog import AttachmentsDialog
+from duplicates_dialog import DuplicatesDialog
+from duplicate_index import find_duplicate_groups
+from database import DatabaseManager, database_needs_upgrade
+from sync_manager import SyncManager, SYNC_RULES
+from reminder_scheduler import ReminderScheduler
+from maintenance_scheduler import MaintenanceScheduler
+from workspace_manager import WorkspaceManager
+from diagnostics import StallWatchdog, profiler, profiled, env_flag
 
 # Настройка логирования
 logging.basicConfig(level=logging.DEBUG,
@@ -28,6 +42,11 @@ logger = logging.getLogger(__name__)
 class TaskManager(QMainWindow):
     """Главное окно приложения."""
     
+    # Сигнал о завершении резервного копирования: (путь, длительность, ошибка)
+    backup_finished = pyqtSignal(str, float, str)
+    # Сигнал о завершении поиска дубликатов: (группы, путь к базе, ошибка)
+    duplicates_found = pyqtSignal(object, str, str)
+    
     def __init__(self):
         """Инициализация главного окна приложения."""
         try:
@@ -35,13 +54,23 @@ class TaskManager(QMainWindow):
             super().__init__()
             
             # Инициализация менеджеров
-            self.db_manager = DatabaseManager()
             self.settings_manager = SettingsManager()
+            self.workspace_manager = WorkspaceManager(self.settings_manager)
+            self.set_workspace(self.workspace_manager.get(self.workspace_manager.initial_name()))
             self.ui_manager = UIManager(self)
             self.sound_manager = SoundManager()
+            self.reminder_scheduler = ReminderScheduler(self.db_manager, self)
+            self.maintenance_scheduler = MaintenanceScheduler(self.db_manager, self)
+            self.watchdog = StallWatchdog(self)
+            # Признак того, что список устарел после изменений в дереве
+            self.list_dirty = False
+            # Фоновый поток отчета о дубликатах
+            self.duplicates_thread = None
+            if env_flag("TASKMANAGER_WATCHDOG"):
+                self.watchdog.start()
             
             # Устанавливаем заголовок окна
-            self.setWindowTitle("Менеджер задач")
+            self.setWindowTitle(f"Менеджер задач - {self.workspace.name}")
             
             # Настройка меню
             self.setup_menu()
@@ -52,12 +81,24 @@ class TaskManager(QMainWindow):
             # Загрузка стилей
             self.ui_manager.load_styles()
             
-            # Загрузка задач
-            self.load_tasks()
+            # Загрузка задач с последним состоянием вида рабочей области
+            self.ui_manager.load_workspaces(self.workspace_manager.names(), self.workspace.name)
+            self.show_workspace()
             
             # Подключение сигналов
             self.setup_connections()
             
+            # Архивация давно выполненных задач после отображения окна
+            QTimer.singleShot(0, self.auto_archive_tasks)
+            
+            # Резервное копирование по расписанию
+            self.backupTimer = QTimer(self)
+            self.backupTimer.timeout.connect(self.start_backup)
+            self.backupTimer.start(self.settings_manager.load_backup_interval() * 60 * 1000)
+            
+            # Обслуживание базы, пока пользователь не работает с приложением
+            self.maintenance_scheduler.start()
+            
             logger.debug("Инициализация завершена успешно")
         except Exception as e:
             logger.error(f"Ошибка в инициализации TaskManager: {str(e)}")
@@ -83,16 +124,37 @@ class TaskManager(QMainWindow):
             self.increasePriorityAction.setShortcut("Ctrl+Up")
             self.decreasePriorityAction = QAction("Уменьшить приоритет", self)
             self.decreasePriorityAction.setShortcut("Ctrl+Down")
+            self.addTagsAction = QAction("Добавить теги", self)
+            self.addTagsAction.setShortcut("Ctrl+T")
+            self.removeTagsAction = QAction("Удалить теги", self)
+            self.deleteCompletedAction = QAction("Удалить все выполненные", self)
+            self.attachmentsAction = QAction("Вложения...", self)
+            self.attachmentsAction.setShortcut("Ctrl+Shift+A")
+            self.agendaAction = QAction("Ближайшие сроки", self)
+            self.agendaAction.setShortcut("Ctrl+Shift+D")
+            self.analyticsAction = QAction("История выполнения", self)
+            self.analyticsAction.setShortcut("Ctrl+Shift+H")
             
             # Добавляем действия в меню
             file_menu.addAction(self.addAction)
             file_menu.addAction(self.editAction)
             file_menu.addAction(self.deleteAction)
+            file_menu.addAction(self.deleteCompletedAction)
             file_menu.addAction(self.completeAction)
             file_menu.addSeparator()
             file_menu.addAction(self.increasePriorityAction)
             file_menu.addAction(self.decreasePriorityAction)
             file_menu.addSeparator()
+            file_menu.addAction(self.addTagsAction)
+            file_menu.addAction(self.removeTagsAction)
+            file_menu.addAction(self.attachmentsAction)
+            file_menu.addSeparator()
+            file_menu.addAction(self.agendaAction)
+            file_menu.addAction(self.analyticsAction)
+            file_menu.addSeparator()
+            self.newWorkspaceAction = QAction("Новая рабочая область...", self)
+            file_menu.addAction(self.newWorkspaceAction)
+            file_menu.addSeparator()
             
             # Добавляем действие выхода
             exit_action = QAction("Выход", self)
@@ -100,6 +162,58 @@ class TaskManager(QMainWindow):
             exit_action.triggered.connect(self.close)
             file_menu.addAction(exit_action)
             
+            # Создаем меню "Правка"
+            edit_menu = self.menuBar().addMenu("Правка")
+            self.undoAction = QAction("Отменить", self)
+            self.undoAction.setShortcut("Ctrl+Z")
+            self.redoAction = QAction("Повторить", self)
+            self.redoAction.setShortcut("Ctrl+Y")
+            edit_menu.addAction(self.undoAction)
+            edit_menu.addAction(self.redoAction)
+            edit_menu.addSeparator()
+            self.goToAction = QAction("Перейти к задаче...", self)
+            self.goToAction.setShortcut("Ctrl+G")
+            edit_menu.addAction(self.goToAction)
+            edit_menu.aboutToShow.connect(self.update_undo_actions)
+            
+            # Создаем меню "Сервис"
+            service_menu = self.menuBar().addMenu("Сервис")
+            self.checkStatsAction = QAction("Проверить статистику", self)
+            service_menu.addAction(self.checkStatsAction)
+            self.duplicatesAction = QAction("Найти похожие задачи", self)
+            service_menu.addAction(self.duplicatesAction)
+            self.rebuildHistoryAction = QAction("Пересчитать историю выполнения", self)
+            service_menu.addAction(self.rebuildHistoryAction)
+            service_menu.addSeparator()
+            self.syncAction = QAction("Синхронизировать с базой...", self)
+            self.exportChangesAction = QAction("Сохранить файл изменений...", self)
+            self.importChangesAction = QAction("Применить файл изменений...", self)
+            service_menu.addAction(self.syncAction)
+            service_menu.addAction(self.exportChangesAction)
+            service_menu.addAction(self.importChangesAction)
+            service_menu.addSeparator()
+            self.backupAction = QAction("Создать резервную копию", self)
+            self.restoreAction = QAction("Восстановить из копии", self)
+            service_menu.addAction(self.backupAction)
+            service_menu.addAction(self.restoreAction)
+            service_menu.addSeparator()
+            self.watchdogAction = QAction("Отслеживать зависания интерфейса", self)
+            self.watchdogAction.setCheckable(True)
+            self.watchdogAction.setChecked(self.watchdog.is_running())
+            self.profileAction = QAction("Профилировать действия", self)
+            self.profileAction.setCheckable(True)
+            self.profileAction.setChecked(profiler.enabled)
+            service_menu.addAction(self.watchdogAction)
+            service_menu.addAction(self.profileAction)
+            
+            # Создаем меню "Архив"
+            archive_menu = self.menuBar().addMenu("Архив")
+            self.archiveAction = QAction("Архивировать выполненные", self)
+            self.archiveSearchAction = QAction("Поиск в архиве", self)
+            self.archiveSearchAction.setShortcut("Ctrl+Shift+F")
+            archive_menu.addAction(self.archiveAction)
+            archive_menu.addAction(self.archiveSearchAction)
+            
             logger.debug("Меню настроено успешно")
         except Exception as e:
             logger.error(f"Ошибка при настройке меню: {str(e)}")
@@ -116,49 +230,393 @@ class TaskManager(QMainWindow):
             self.ui_manager.completeButton.clicked.connect(self.toggle_task_status)
             self.ui_manager.clearButton.clicked.connect(self.clear_tasks)
             
-            # Подключаем сигнал переупорядочивания
-            self.ui_manager.taskTable.model().rowsMoved.connect(self.handle_task_reorder)
+            # Подключаем сигналы редактирования в таблице
+            for delegate in self.ui_manager.delegates:
+                delegate.task_edited.connect(self.handle_task_edited)
             
-            # Подключаем сигнал изменения ячейки
-            self.ui_manager.taskTable.itemChanged.connect(self.handle_cell_changed)
+            # Подключаем сигналы доски
+            self.ui_manager.taskBoard.task_dropped.connect(self.handle_task_dropped)
+            self.ui_manager.taskBoard.task_activated.connect(self.edit_task)
             
             # Подключаем горячие клавиши
+            self.deleteCompletedAction.triggered.connect(self.delete_completed_tasks)
             self.completeAction.triggered.connect(self.toggle_task_status)
             self.increasePriorityAction.triggered.connect(self.increase_priority)
             self.decreasePriorityAction.triggered.connect(self.decrease_priority)
             
+            # Подключаем теги и фильтр по тегам
+            self.addTagsAction.triggered.connect(self.add_tags)
+            self.removeTagsAction.triggered.connect(self.remove_tags)
+            self.agendaAction.triggered.connect(self.show_agenda)
+            self.analyticsAction.triggered.connect(self.show_analytics)
+            self.attachmentsAction.triggered.connect(self.show_attachments)
+            self.undoAction.triggered.connect(self.undo)
+            self.newWorkspaceAction.triggered.connect(self.create_workspace)
+            self.ui_manager.workspaceCombo.currentTextChanged.connect(self.switch_workspace)
+            self.redoAction.triggered.connect(self.redo)
+            self.goToAction.triggered.connect(self.go_to_task)
+            self.ui_manager.tagList.itemChanged.connect(self.load_tasks)
+            self.ui_manager.tagModeCombo.currentIndexChanged.connect(self.load_tasks)
+            self.ui_manager.clearTagsButton.clicked.connect(self.clear_tag_filter)
+            
+            # Подключаем сигналы дерева подзадач
+            self.ui_manager.viewTabs.currentChanged.connect(self.handle_view_changed)
+            self.ui_manager.taskTree.customContextMenuRequested.connect(self.show_tree_menu)
+            
+            # Подключаем действия архива
+            self.archiveAction.triggered.connect(self.archive_tasks)
+            self.archiveSearchAction.triggered.connect(self.search_archive)
+            
+            # Подключаем действия сервиса
+            self.checkStatsAction.triggered.connect(self.check_stats)
+            self.duplicatesAction.triggered.connect(self.find_duplicates)
+            self.duplicates_found.connect(self.show_duplicates)
+            self.rebuildHistoryAction.triggered.connect(self.rebuild_history)
+            self.syncAction.triggered.connect(self.sync_database)
+            self.exportChangesAction.triggered.connect(self.export_changes)
+            self.importChangesAction.triggered.connect(self.import_changes)
+            self.backupAction.triggered.connect(self.start_backup)
+            self.restoreAction.triggered.connect(self.restore_backup)
+            self.watchdogAction.toggled.connect(self.toggle_watchdog)
+            self.profileAction.toggled.connect(self.toggle_profiler)
+            self.backup_finished.connect(self.handle_backup_finished)
+            
+            # Подключаем напоминания о сроках
+            self.reminder_scheduler.reminder_due.connect(self.show_reminder)
+            self.maintenance_scheduler.maintenance_finished.connect(self.handle_maintenance_finished)
+            
             logger.debug("Подключения сигналов настроены")
         except Exception as e:
             logger.error(f"Ошибка при настройке подключений: {str(e)}")
             logger.error(traceback.format_exc())
             raise
     
+    def set_workspace(self, workspace):
+        """Переключение менеджеров окна на базу рабочей области."""
+        self.workspace = workspace
+        self.db_manager = workspace.db_manager
+        self.archive_manager = workspace.archive_manager
+        self.backup_manager = workspace.backup_manager
+        self.attachment_manager = workspace.attachment_manager
+        if hasattr(self, 'ui_manager'):
+            self.ui_manager.set_db_manager(self.db_manager)
+            self.reminder_scheduler.db_manager = self.db_manager
+            self.maintenance_scheduler.db_manager = self.db_manager
+    
+    def show_workspace(self):
+        """Загрузка задач текущей рабочей области с ее сохраненным состоянием вида."""
+        state = self.settings_manager.load_view_state(self.workspace.name)
+        self.ui_manager.load_tags(self.db_manager.get_tags())
+        self.ui_manager.restore_view_state(state)
+        self.load_tasks()
+        self.ui_manager.restore_view_position(state)
+        self.reminder_scheduler.reload()
+    
+    @profiled
+    def switch_workspace(self, name):
+        """Переключение на другую рабочую область."""
+        try:
+            if not name or name == self.workspace.name:
+                return
+            previous = self.workspace
+            self.settings_manager.save_view_state(previous.name, self.ui_manager.get_view_state())
+            try:
+                self.set_workspace(self.workspace_manager.get(name))
+            except Exception:
+                self.ui_manager.load_workspaces(self.workspace_manager.names(), previous.name)
+                raise
+            self.settings_manager.save_current_workspace(name)
+            self.setWindowTitle(f"Менеджер задач - {name}")
+            self.show_workspace()
+            self.statusBar().showMessage(f"Рабочая область: {name}", 3000)
+        except Exception as e:
+            logger.error(f"Ошибка при переключении рабочей области: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось открыть рабочую область: {str(e)}")
+    
+    def create_workspace(self):
+        """Создание новой рабочей области и переключение на нее."""
+        try:
+            name, ok = QInputDialog.getText(self, "Новая рабочая область", "Название:")
+            if not ok or not name.strip():
+                return
+            self.workspace_manager.create(name)
+            # Переключение произойдет по сигналу смены текущего элемента списка
+            self.ui_manager.load_workspaces(self.workspace_manager.names(), self.workspace.name)
+            self.ui_manager.workspaceCombo.setCurrentText(name.strip())
+        except ValueError as e:
+            QMessageBox.warning(self, "Предупреждение", str(e))
+        except Exception as e:
+            logger.error(f"Ошибка при создании рабочей области: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось создать рабочую область: {str(e)}")
+    
+    @profiled
     def load_tasks(self):
-        """Загрузка задач из базы данных."""
+        """Загрузка задач из базы данных с учетом фильтра по тегам."""
         try:
-            tasks = self.db_manager.get_all_tasks()
-            self.ui_manager.load_tasks(tasks)
+            # Таблица и доска подгружают следующие страницы сами при прокрутке
+            names, match_all = self.ui_manager.get_tag_filter()
+            self.ui_manager.load_tasks(names, match_all)
+            self.ui_manager.load_tags(self.db_manager.get_tags())
+            self.list_dirty = False
+            
+            # Дерево перечитывается сразу, только если оно открыто
+            if self.ui_manager.is_tree_view():
+                self.ui_manager.treeModel.reload()
+            else:
+                self.ui_manager.treeModel.mark_dirty()
+            
+            self.update_stats()
             self.statusBar().showMessage("Готово")
         except Exception as e:
             logger.error(f"Ошибка при загрузке задач: {str(e)}")
             logger.error(traceback.format_exc())
             raise
     
+    def handle_view_changed(self, tab_index):
+        """Обновление устаревшей вкладки при переключении между списком и деревом."""
+        try:
+            if self.ui_manager.is_tree_view():
+                if self.ui_manager.treeModel.dirty:
+                    self.ui_manager.treeModel.reload()
+            elif self.list_dirty:
+                self.load_tasks()
+        except Exception as e:
+            logger.error(f"Ошибка при переключении вида: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    def tree_changed(self):
+        """Учет изменения задач из дерева: список перечитывается при возврате к нему."""
+        self.list_dirty = True
+        self.reminder_scheduler.reload()
+        self.update_stats()
+    
+    def show_tree_menu(self, pos):
+        """Контекстное меню дерева с операциями над поддеревом."""
+        try:
+            index = self.ui_manager.taskTree.indexAt(pos)
+            menu = QMenu(self)
+            if index.isValid():
+                index = index.sibling(index.row(), 0)
+                self.ui_manager.taskTree.setCurrentIndex(index)
+                completed = self.ui_manager.treeModel.node(index).completed
+                menu.addAction("Добавить подзадачу", self.add_subtask)
+                menu.addAction("Возобновить ветку" if completed else "Выполнить ветку", self.complete_subtree)
+                menu.addAction("Перенести ветку...", self.move_subtree)
+                menu.addSeparator()
+                menu.addAction("Удалить ветку", self.delete_subtree)
+            else:
+                menu.addAction("Добавить задачу", self.add_task)
+            menu.exec(self.ui_manager.taskTree.viewport().mapToGlobal(pos))
+        except Exception as e:
+            logger.error(f"Ошибка при показе меню дерева: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    @profiled
+    def add_subtask(self):
+        """Добавление подзадачи к выбранной задаче дерева."""
+        try:
+            index = self.ui_manager.get_current_tree_index()
+            if index is None:
+                return
+            dialog = EditTaskDialog(self, duplicate_finder=self.db_manager.find_duplicates)
+            dialog.setWindowTitle("Добавить подзадачу")
+            if dialog.exec():
+                title, desc, due_at = dialog.get_data()
+                parent_id = self.ui_manager.treeModel.task_id(index)
+                self.db_manager.add_task(title, desc, due_at, dialog.get_recurrence(), parent_id)
+                self.ui_manager.treeModel.refresh_children(index)
+                self.ui_manager.taskTree.expand(index)
+                self.tree_changed()
+                self.statusBar().showMessage(f"Подзадача '{title}' добавлена", 3000)
+            # Диалог создан с родителем-окном и без удаления остался бы в памяти окна
+            dialog.deleteLater()
+        except Exception as e:
+            logger.error(f"Ошибка при добавлении подзадачи: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось добавить подзадачу: {str(e)}")
+    
+    @profiled
+    def complete_subtree(self):
+        """Выполнение или возобновление выбранной задачи со всеми подзадачами."""
+        try:
+            index = self.ui_manager.get_current_tree_index()
+            if index is None:
+                return
+            model = self.ui_manager.treeModel
+            completed = not model.node(index).completed
+            created = self.db_manager.complete_subtree(model.task_id(index), completed)
+            if created:
+                # Следующие повторения создаются рядом с выполненными задачами
+                model.refresh_children(index.parent())
+            else:
+                model.refresh_node(index)
+            self.sound_manager.play_complete()
+            self.tree_changed()
+            self.schedule_occurrences(created)
+        except Exception as e:
+            logger.error(f"Ошибка при изменении статуса ветки: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось изменить статус ветки: {str(e)}")
+    
+    @profiled
+    def delete_subtree(self):
+        """Удаление выбранной задачи со всеми подзадачами."""
+        try:
+            index = self.ui_manager.get_current_tree_index()
+            if index is None:
+                return
+            model = self.ui_manager.treeModel
+            node = model.node(index)
+            done, total = self.db_manager.get_subtree_progress(node.task_id)
+            reply = QMessageBox.question(
+                self,
+                "Подтверждение",
+                f"Удалить задачу '{node.title}' и подзадачи ({total})?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if reply == QMessageBox.StandardButton.Yes:
+                deleted = self.db_manager.delete_subtree(node.task_id)
+                model.remove_node(index)
+                self.tree_changed()
+                self.statusBar().showMessage(f"Удалено задач: {deleted}", 3000)
+        except Exception as e:
+            logger.error(f"Ошибка при удалении ветки: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось удалить ветку: {str(e)}")
+    
+    @profiled
+    def move_subtree(self):
+        """Перенос выбранной задачи с подзадачами к другой родительской задаче."""
+        try:
+            index = self.ui_manager.get_current_tree_index()
+            if index is None:
+                return
+            model = self.ui_manager.treeModel
+            parent_id, ok = QInputDialog.getInt(self, "Перенести ветку",
+                                                "ID новой родительской задачи (0 - верхний уровень):",
+                                                0, 0, 2**31 - 1)
+            if not ok:
+                return
+            new_parent_id = parent_id or None
+            self.db_manager.move_task(model.task_id(index), new_parent_id)
+            model.remove_node(index)
+            # Новый родитель обновляется, только если его узел уже загружен
+            target = model.find_index(new_parent_id)
+            if target is not None:
+                model.refresh_children(target)
+            self.tree_changed()
+        except ValueError as e:
+            QMessageBox.warning(self, "Предупреждение", str(e))
+        except Exception as e:
+            logger.error(f"Ошибка при переносе ветки: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось перенести ветку: {str(e)}")
+    
+    def clear_tag_filter(self):
+        """Сброс фильтра по тегам."""
+        self.ui_manager.clear_tag_filter()
+        self.load_tasks()
+    
+    def ask_tag_names(self, title):
+        """
+        Запрос списка тегов у пользователя.
+        
+        Returns:
+            list: Названия тегов без повторов или пустой список при отмене
+        """
+        text, ok = QInputDialog.getText(self, title, "Теги через запятую:")
+        if not ok:
+            return []
+        return list(dict.fromkeys(name.strip() for name in text.split(",") if name.strip()))
+    
+    @profiled
+    def add_tags(self):
+        """Добавление тегов ко всем выбранным задачам."""
+        try:
+            selection = self.ui_manager.get_selection()
+            if not selection:
+                QMessageBox.warning(self, "Предупреждение", "Выберите задачи")
+                return
+            
+            names = self.ask_tag_names("Добавить теги")
+            if names:
+                self.db_manager.add_tags(selection, names)
+                self.load_tasks()
+                self.statusBar().showMessage(f"Теги добавлены к задачам: {len(selection)}", 3000)
+        except Exception as e:
+            logger.error(f"Ошибка при добавлении тегов: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось добавить теги: {str(e)}")
+    
+    @profiled
+    def remove_tags(self):
+        """Удаление тегов у всех выбранных задач."""
+        try:
+            selection = self.ui_manager.get_selection()
+            if not selection:
+                QMessageBox.warning(self, "Предупреждение", "Выберите задачи")
+                return
+            
+            names = self.ask_tag_names("Удалить теги")
+            if names:
+                self.db_manager.remove_tags(selection, names)
+                self.load_tasks()
+                self.statusBar().showMessage(f"Теги удалены у задач: {len(selection)}", 3000)
+        except Exception as e:
+            logger.error(f"Ошибка при удалении тегов: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось удалить теги: {str(e)}")
+    
+    def update_stats(self):
+        """Обновление статистики задач в строке состояния."""
+        try:
+            stats = self.db_manager.get_task_stats()
+            stats['overdue'] = self.db_manager.count_overdue()
+            self.ui_manager.update_stats(stats)
+            # Счетчики в колонках доски верны только для списка без фильтра
+            self.ui_manager.taskBoard.update_counts(stats if self.ui_manager.taskModel.is_complete() else None)
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении статистики: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    @profiled
+    def check_stats(self):
+        """Проверка счетчиков статистики по фактическим данным."""
+        try:
+            mismatches = self.db_manager.check_task_stats()
+            self.update_stats()
+            if mismatches:
+                details = "\n".join(f"- {key}: {stored} -> {actual}"
+                                    for key, (stored, actual) in mismatches.items())
+                QMessageBox.warning(self, "Статистика", f"Счетчики исправлены:\n{details}")
+            else:
+                QMessageBox.information(self, "Статистика", "Счетчики статистики корректны")
+        except Exception as e:
+            logger.error(f"Ошибка при проверке статистики: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось проверить статистику: {str(e)}")
+    
+    @profiled
     def add_task(self):
         """Добавление новой задачи."""
         try:
-            dialog = EditTaskDialog(self)
+            dialog = EditTaskDialog(self, duplicate_finder=self.db_manager.find_duplicates)
             dialog.setWindowTitle("Добавить задачу")
             if dialog.exec():
-                title, desc = dialog.get_data()
-                self.db_manager.add_task(title, desc)
+                title, desc, due_at = dialog.get_data()
+                task_id = self.db_manager.add_task(title, desc, due_at, dialog.get_recurrence())
+                self.reminder_scheduler.update_task(task_id, title, due_at)
                 self.load_tasks()
                 self.statusBar().showMessage(f"Задача '{title}' добавлена", 3000)
+            dialog.deleteLater()
         except Exception as e:
             logger.error(f"Ошибка при добавлении задачи: {str(e)}")
             logger.error(traceback.format_exc())
             QMessageBox.critical(self, "Ошибка", f"Не удалось добавить задачу: {str(e)}")
     
+    @profiled
     def edit_task(self):
         """Редактирование существующей задачи."""
         try:
@@ -167,28 +625,39 @@ class TaskManager(QMainWindow):
                 QMessageBox.warning(self, "Предупреждение", "Выберите задачу для редактирования")
                 return
             
-            dialog = EditTaskDialog(self, task['title'], task['description'])
+            dialog = EditTaskDialog(self, task.title, task.description, task.due_at,
+                                    self.db_manager.get_recurrence(task.id),
+                                    lambda title, desc: self.db_manager.find_duplicates(title, desc, task.id))
             dialog.setWindowTitle("Редактировать задачу")
             if dialog.exec():
-                new_title, new_desc = dialog.get_data()
-                self.db_manager.update_task(task['id'], new_title, new_desc)
-                self.load_tasks()
+                new_title, new_desc, new_due_at = dialog.get_data()
+                self.db_manager.update_task(task.id, new_title, new_desc, new_due_at, dialog.get_recurrence())
+                if not task.completed:
+                    self.reminder_scheduler.update_task(task.id, new_title, new_due_at)
+                # Обновляется только строка задачи в таблице и на доске
+                self.ui_manager.refresh_row(self.ui_manager.get_current_row())
+                self.ui_manager.treeModel.mark_dirty()
+                self.update_stats()
                 self.statusBar().showMessage(f"Задача '{new_title}' обновлена", 3000)
+            dialog.deleteLater()
         except Exception as e:
             logger.error(f"Ошибка при редактировании задачи: {str(e)}")
             logger.error(traceback.format_exc())
             QMessageBox.critical(self, "Ошибка", f"Не удалось отредактировать задачу: {str(e)}")
     
+    @profiled
     def delete_task(self):
         """Удаление выбранных задач."""
         try:
-            task_ids = self.ui_manager.get_selected_task_ids()
-            if not task_ids:
+            selection = self.ui_manager.get_selection()
+            if not selection:
                 QMessageBox.warning(self, "Предупреждение", "Выберите задачи для удаления")
                 return
             
             task_titles = self.ui_manager.get_selected_task_titles()
             tasks_str = "\n".join([f"- {title}" for title in task_titles])
+            if len(selection) > len(task_titles):
+                tasks_str += f"\n... и еще {len(selection) - len(task_titles)}"
             
             reply = QMessageBox.question(
                 self, 
@@ -198,53 +667,88 @@ class TaskManager(QMainWindow):
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                self.db_manager.delete_tasks(task_ids)
+                self.db_manager.delete_tasks(selection)
+                self.reminder_scheduler.remove_tasks(selection)
                 self.load_tasks()
-                self.statusBar().showMessage(f"Удалено задач: {len(task_ids)}", 3000)
+                self.statusBar().showMessage(f"Удалено задач: {len(selection)}", 3000)
         except Exception as e:
             logger.error(f"Ошибка при удалении задач: {str(e)}")
             logger.error(traceback.format_exc())
             QMessageBox.critical(self, "Ошибка", f"Не удалось удалить задачи: {str(e)}")
     
+    @profiled
+    def delete_completed_tasks(self):
+        """Удаление всех выполненных задач одним запросом по предикату."""
+        try:
+            done = self.db_manager.get_task_stats()['done']
+            if not done:
+                QMessageBox.information(self, "Информация", "Нет выполненных задач")
+                return
+            
+            reply = QMessageBox.question(
+                self,
+                "Подтверждение",
+                f"Удалить все выполненные задачи ({done})?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            
+            if reply == QMessageBox.StandardButton.Yes:
+                self.db_manager.delete_tasks(TaskSelection(predicate='completed', count=done))
+                self.load_tasks()
+                self.statusBar().showMessage(f"Удалено задач: {done}", 3000)
+        except Exception as e:
+            logger.error(f"Ошибка при удалении выполненных задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось удалить задачи: {str(e)}")
+    
+    @profiled
     def toggle_task_status(self):
         """Переключение статуса выполнения для выбранных задач."""
         try:
-            task_ids = self.ui_manager.get_selected_task_ids()
-            if not task_ids:
+            selection = self.ui_manager.get_selection()
+            if not selection:
                 QMessageBox.warning(self, "Предупреждение", "Выберите задачи")
                 return
             
             # Получаем текущий статус первой задачи и применяем противоположный ко всем
-            current_row = self.ui_manager.taskTable.currentRow()
-            current_status = self.ui_manager.taskTable.item(current_row, 4).text() == "Выполнено"
-            new_status = not current_status
+            current = self.ui_manager.get_current_preview()
+            new_status = not (current and current.completed)
+            
+            created = self.db_manager.toggle_task_status(selection, new_status)
             
-            self.db_manager.toggle_task_status(task_ids, new_status)
+            # Выполненные задачи убираем из напоминаний, для возобновленных перечитываем сроки
+            if new_status:
+                self.reminder_scheduler.remove_tasks(selection)
+                self.schedule_occurrences(created)
+            else:
+                self.reminder_scheduler.reload()
             
             # Воспроизводим звук завершения
             self.sound_manager.play_complete()
             
             # Обновляем отображение
             self.load_tasks()
-            self.statusBar().showMessage(f"Обновлено задач: {len(task_ids)}", 3000)
+            self.statusBar().showMessage(f"Обновлено задач: {len(selection)}", 3000)
         except Exception as e:
             logger.error(f"Ошибка при изменении статуса задач: {str(e)}")
             logger.error(traceback.format_exc())
             QMessageBox.critical(self, "Ошибка", f"Не удалось изменить статус задач: {str(e)}")
     
+    @profiled
     def increase_priority(self):
         """Увеличение приоритета выбранных задач."""
         try:
-            task_ids = self.ui_manager.get_selected_task_ids()
-            if not task_ids:
+            selection = self.ui_manager.get_selection()
+            if not selection:
                 QMessageBox.warning(self, "Предупреждение", "Выберите задачи")
                 return
             
             # Получаем текущий приоритет первой задачи и увеличиваем его
-            current_priority = int(self.ui_manager.taskTable.item(self.ui_manager.taskTable.currentRow(), 3).text())
+            current = self.ui_manager.get_current_preview()
+            current_priority = current.priority if current else 1
             new_priority = min(current_priority + 1, 4)  # Максимальный приоритет 4
             
-            self.db_manager.update_task_priority(task_ids, new_priority)
+            self.db_manager.update_task_priority(selection, new_priority)
             
             # Воспроизводим звук
             self.sound_manager.play_click()
@@ -257,19 +761,21 @@ class TaskManager(QMainWindow):
             logger.error(traceback.format_exc())
             QMessageBox.critical(self, "Ошибка", f"Не удалось изменить приоритет: {str(e)}")
     
+    @profiled
     def decrease_priority(self):
         """Уменьшение приоритета выбранных задач."""
         try:
-            task_ids = self.ui_manager.get_selected_task_ids()
-            if not task_ids:
+            selection = self.ui_manager.get_selection()
+            if not selection:
                 QMessageBox.warning(self, "Предупреждение", "Выберите задачи")
                 return
             
             # Получаем текущий приоритет первой задачи и уменьшаем его
-            current_priority = int(self.ui_manager.taskTable.item(self.ui_manager.taskTable.currentRow(), 3).text())
+            current = self.ui_manager.get_current_preview()
+            current_priority = current.priority if current else 1
             new_priority = max(current_priority - 1, 1)  # Минимальный приоритет 1
             
-            self.db_manager.update_task_priority(task_ids, new_priority)
+            self.db_manager.update_task_priority(selection, new_priority)
             
             # Воспроизводим звук
             self.sound_manager.play_click()
@@ -282,80 +788,85 @@ class TaskManager(QMainWindow):
             logger.error(traceback.format_exc())
             QMessageBox.critical(self, "Ошибка", f"Не удалось изменить приоритет: {str(e)}")
     
-    def handle_task_reorder(self, parent, start, end, destination, row):
-        """Обработка переупорядочивания задач."""
+    @profiled
+    def handle_task_edited(self, row, task_id, field, value):
+        """Сохранение поля, измененного в таблице или на доске, и обновление одной строки."""
         try:
-            # Блокируем сигналы таблицы, чтобы избежать рекурсивных вызовов
-            self.ui_manager.taskTable.blockSignals(True)
-            
-            # Получаем ID задач
-            source_id = int(self.ui_manager.taskTable.item(start, 0).text())
-            target_id = int(self.ui_manager.taskTable.item(row, 0).text())
-            
-            # Обновляем порядок в базе данных
-            self.db_manager.reorder_tasks(source_id, target_id)
-            
-            # Перезагружаем данные из базы
-            self.load_tasks()
-            
-            # Воспроизводим звук
+            created = self.db_manager.update_task_field(task_id, field, value)
+            # Строка обновляется в общей модели, поэтому меняется и в таблице, и на доске
+            task = self.ui_manager.refresh_row(row)
+            self.ui_manager.treeModel.mark_dirty()
             self.sound_manager.play_click()
             
-            logger.debug(f"Задачи переупорядочены: {source_id} -> {target_id}")
+            # Выполнение повторяющейся задачи создает ее следующее повторение
+            if created:
+                self.schedule_occurrences(created)
+                self.load_tasks()
             
+            if field in ('priority', 'completed'):
+                self.update_stats()
+            if task and field in ('title', 'completed'):
+                if task.completed:
+                    self.reminder_scheduler.remove_tasks([task_id])
+                else:
+                    self.reminder_scheduler.update_task(task_id, task.title, task.due_at)
         except Exception as e:
-            logger.error(f"Ошибка при переупорядочивании задач: {str(e)}")
+            logger.error(f"Ошибка при сохранении изменения задачи: {str(e)}")
             logger.error(traceback.format_exc())
-            # Восстанавливаем исходное состояние таблицы
-            self.load_tasks()
-        finally:
-            # Разблокируем сигналы таблицы
-            self.ui_manager.taskTable.blockSignals(False)
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить изменение: {str(e)}")
     
-    def handle_cell_changed(self, item):
-        """Обработка изменения ячейки в таблице."""
+    def handle_task_dropped(self, task_id, field, value):
+        """Перенос задачи в другую колонку доски: изменение статуса или приоритета одной задачи."""
         try:
-            # Блокируем сигналы, чтобы избежать рекурсии
-            self.ui_manager.taskTable.blockSignals(True)
-            
-            # Получаем ID задачи из данных первой ячейки строки
-            task_id = self.ui_manager.taskTable.item(item.row(), 0).data(Qt.ItemDataRole.UserRole)
-            
-            # Проверяем, что изменилась ячейка с приоритетом (колонка 2)
-            if item.column() == 2:
-                try:
-                    # Пытаемся преобразовать новое значение в число
-                    new_priority = int(item.text())
-                    
-                    # Проверяем, что приоритет в допустимом диапазоне
-                    if 1 <= new_priority <= 4:
-                        # Обновляем приоритет в базе данных
-                        self.db_manager.update_task_priority([task_id], new_priority)
-                        # Воспроизводим звук
-                        self.sound_manager.play_click()
-                        # Обновляем только цвет и флаги ячейки
-                        item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                    else:
-                        # Если приоритет вне диапазона, возвращаем старое значение
-                        tasks = self.db_manager.get_all_tasks()
-                        old_priority = next(task[3] for task in tasks if task[0] == task_id)
-                        item.setText(str(old_priority))
-                        self.show_warning("Приоритет должен быть от 1 до 4")
-                except ValueError:
-                    # Если введено не число, возвращаем старое значение
-                    tasks = self.db_manager.get_all_tasks()
-                    old_priority = next(task[3] for task in tasks if task[0] == task_id)
-                    item.setText(str(old_priority))
-                    self.show_warning("Приоритет должен быть числом от 1 до 4")
-                    
-        except Exception as e:
-            logger.error(f"Ошибка при обработке изменения ячейки: {str(e)}")
-            logger.error(traceback.format_exc())
-            # Перезагружаем задачи только в случае серьезной ошибки
+            row = self.ui_manager.taskModel.find_row(task_id)
+            if row is not None:
+                self.handle_task_edited(row, task_id, field, value)
+        except Exception as e:
+            logger.error(f"Ошибка при переносе задачи на доске: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    @profiled
+    def update_undo_actions(self):
+        """Обновление названий действий отмены и повтора при открытии меню."""
+        try:
+            undo_label = self.db_manager.get_undo_label()
+            redo_label = self.db_manager.get_redo_label()
+            self.undoAction.setText(f"Отменить: {undo_label}" if undo_label else "Отменить")
+            self.redoAction.setText(f"Повторить: {redo_label}" if redo_label else "Повторить")
+            self.undoAction.setEnabled(undo_label is not None)
+            self.redoAction.setEnabled(redo_label is not None)
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении действий отмены: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    @profiled
+    def undo(self):
+        """Отмена последнего действия."""
+        self.replay_change(undo=True)
+    
+    @profiled
+    def redo(self):
+        """Повтор последнего отмененного действия."""
+        self.replay_change(undo=False)
+    
+    def replay_change(self, undo):
+        """Отмена или повтор действия из журнала и обновление списка и дерева."""
+        try:
+            label = self.db_manager.undo() if undo else self.db_manager.redo()
+            # Меню обновится при следующем открытии; до этого горячие клавиши
+            # должны работать независимо от состояния действий
+            self.undoAction.setEnabled(True)
+            self.redoAction.setEnabled(True)
+            if label is None:
+                self.statusBar().showMessage("Нечего отменять" if undo else "Нечего повторять", 3000)
+                return
+            self.reminder_scheduler.reload()
             self.load_tasks()
-        finally:
-            # Разблокируем сигналы
-            self.ui_manager.taskTable.blockSignals(False)
+            self.statusBar().showMessage(f"{'Отменено' if undo else 'Повторено'}: {label}", 3000)
+        except Exception as e:
+            logger.error(f"Ошибка при {'отмене' if undo else 'повторе'} действия: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось {'отменить' if undo else 'повторить'} действие: {str(e)}")
     
     def clear_tasks(self):
         """Очистка всех задач."""
@@ -369,6 +880,7 @@ class TaskManager(QMainWindow):
             
             if reply == QMessageBox.StandardButton.Yes:
                 self.db_manager.clear_tasks()
+                self.reminder_scheduler.reload()
                 self.load_tasks()
                 self.statusBar().showMessage("Список задач очищен", 3000)
         except Exception as e:
@@ -376,11 +888,362 @@ class TaskManager(QMainWindow):
             logger.error(traceback.format_exc())
             QMessageBox.critical(self, "Ошибка", f"Не удалось очистить список задач: {str(e)}")
     
+    def auto_archive_tasks(self):
+        """Автоматический перенос давно выполненных задач в архив."""
+        try:
+            days = self.settings_manager.load_archive_days()
+            archived = self.archive_manager.archive_completed(days)
+            if archived:
+                self.load_tasks()
+                self.statusBar().showMessage(f"Перенесено в архив задач: {archived}", 3000)
+        except Exception as e:
+            logger.error(f"Ошибка при автоматической архивации: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    @profiled
+    def archive_tasks(self):
+        """Перенос выполненных задач в архив по запросу пользователя."""
+        try:
+            days = self.settings_manager.load_archive_days()
+            reply = QMessageBox.question(
+                self,
+                "Подтверждение",
+                f"Перенести в архив задачи, выполненные более {days} дн. назад?\n"
+                "Задачи с вложениями и задачи, подзадачи которых остаются в списке, не переносятся.",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            
+            if reply == QMessageBox.StandardButton.Yes:
+                archived = self.archive_manager.archive_completed(days)
+                self.load_tasks()
+                self.statusBar().showMessage(f"Перенесено в архив задач: {archived}", 3000)
+        except Exception as e:
+            logger.error(f"Ошибка при архивации задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось архивировать задачи: {str(e)}")
+    
+    def search_archive(self):
+        """Открытие диалога поиска по архиву."""
+        try:
+            dialog = ArchiveSearchDialog(self.archive_manager, self)
+            dialog.exec()
+            dialog.deleteLater()
+        except Exception as e:
+            logger.error(f"Ошибка при поиске в архиве: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось открыть архив: {str(e)}")
+    
+    def find_duplicates(self):
+        """Запуск отчета о похожих задачах в фоновом потоке (сравнение идет в пуле процессов)."""
+        try:
+            if self.duplicates_thread is not None and self.duplicates_thread.is_alive():
+                self.statusBar().showMessage("Поиск похожих задач уже выполняется", 3000)
+                return
+            # Отчет читает индекс из отдельных соединений, поэтому очередь
+            # новых и измененных задач индексируется заранее
+            self.db_manager.refresh_duplicate_index()
+            db_path = self.db_manager.db_path
+            
+            def run():
+                try:
+                    self.duplicates_found.emit(find_duplicate_groups(db_path), db_path, "")
+                except Exception as e:
+                    self.duplicates_found.emit([], db_path, str(e))
+            
+            self.duplicates_thread = threading.Thread(target=run, name="duplicates", daemon=True)
+            self.duplicates_thread.start()
+            self.statusBar().showMessage("Поиск похожих задач...")
+        except Exception as e:
+            logger.error(f"Ошибка при запуске поиска похожих задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось начать поиск похожих задач: {str(e)}")
+    
+    def show_duplicates(self, groups, db_path, error):
+        """Показ отчета о похожих задачах."""
+        try:
+            self.statusBar().clearMessage()
+            if error:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось найти похожие задачи: {error}")
+                return
+            if db_path != self.db_manager.db_path:
+                # Пока шел поиск, открыта другая рабочая область
+                logger.debug(f"Отчет о похожих задачах для {db_path} устарел")
+                return
+            if not groups:
+                QMessageBox.information(self, "Информация", "Похожих задач не найдено")
+                return
+            titles = self.db_manager.get_task_titles([task_id for group in groups for task_id in group])
+            dialog = DuplicatesDialog(groups, titles, self)
+            dialog.task_chosen.connect(self.select_task)
+            dialog.exec()
+            dialog.deleteLater()
+        except Exception as e:
+            logger.error(f"Ошибка при показе похожих задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось показать похожие задачи: {str(e)}")
+    
+    def go_to_task(self):
+        """Переход к задаче по номеру."""
+        try:
+            current_id = self.ui_manager.get_current_task_id()
+            task_id, ok = QInputDialog.getInt(self, "Перейти к задаче", "Номер задачи (ID):",
+                                              current_id or 1, 1, 2**31 - 1)
+            if ok:
+                self.select_task(task_id)
+        except Exception as e:
+            logger.error(f"Ошибка при переходе к задаче: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    def select_task(self, task_id):
+        """Выделение задачи в списке с загрузкой строк вокруг нее."""
+        # Переключение на список сначала: устаревший список при этом перечитывается
+        self.ui_manager.viewTabs.setCurrentWidget(self.ui_manager.taskTable)
+        if not self.ui_manager.jump_to_task(task_id):
+            self.statusBar().showMessage("Задача не показана в списке (фильтр по тегам или удалена)", 3000)
+    
+    def start_backup(self):
+        """Запуск резервного копирования в фоновом потоке."""
+        try:
+            if self.backup_manager.start_backup(self.backup_finished.emit):
+                self.statusBar().showMessage("Создание резервной копии...", 3000)
+        except Exception as e:
+            logger.error(f"Ошибка при запуске резервного копирования: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    def handle_backup_finished(self, path, duration, error):
+        """Обработка завершения резервного копирования."""
+        if error:
+            self.statusBar().showMessage(f"Не удалось создать резервную копию: {error}", 5000)
+        else:
+            self.statusBar().showMessage(f"Резервная копия создана за {duration:.2f} с", 5000)
+    
+    def handle_maintenance_finished(self, summary):
+        """Обработка завершения обслуживания базы."""
+        self.statusBar().showMessage(summary, 5000)
+    
+    @profiled
+    def restore_backup(self):
+        """Восстановление базы данных из выбранной резервной копии."""
+        try:
+            snapshots = self.backup_manager.list_snapshots()
+            if not snapshots:
+                QMessageBox.information(self, "Информация", "Резервных копий нет")
+                return
+            
+            names = [os.path.basename(path) for path in snapshots]
+            name, ok = QInputDialog.getItem(self, "Восстановить из копии", "Копия:", names, 0, False)
+            if not ok:
+                return
+            
+            reply = QMessageBox.question(
+                self,
+                "Подтверждение",
+                f"Заменить все текущие задачи содержимым копии {name}?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            
+            if reply == QMessageBox.StandardButton.Yes:
+                self.backup_manager.restore(snapshots[names.index(name)], self.db_manager.conn)
+                self.db_manager.invalidate_caches()
+                # Копия могла быть создана более старой версией - обновляем структуру
+                self.db_manager.init_db()
+                if self.archive_manager.attached:
+                    self.archive_manager.create_tables()
+                self.reminder_scheduler.reload()
+                self.load_tasks()
+                self.statusBar().showMessage(f"База данных восстановлена из копии {name}", 5000)
+        except Exception as e:
+            logger.error(f"Ошибка при восстановлении из копии: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось восстановить базу данных: {str(e)}")
+    
+    def toggle_watchdog(self, enabled):
+        """Включение или выключение сторожевого таймера зависаний."""
+        if enabled:
+            self.watchdog.start()
+        else:
+            self.watchdog.stop()
+    
+    def toggle_profiler(self, enabled):
+        """Включение или выключение профилирования действий."""
+        profiler.enabled = enabled
+        if enabled:
+            self.statusBar().showMessage("Отчеты профилировщика сохраняются в каталог diagnostics", 5000)
+        logger.debug(f"Профилирование действий {'включено' if enabled else 'выключено'}")
+    
+    def schedule_occurrences(self, created):
+        """Добавление напоминаний для новых повторений задач."""
+        for task_id, title, due_at in created:
+            self.reminder_scheduler.update_task(task_id, title, due_at)
+        if created:
+            self.statusBar().showMessage(f"Создано следующих повторений: {len(created)}", 3000)
+    
+    def show_agenda(self):
+        """Показ сроков задач с повторениями на выбранный период."""
+        try:
+            dialog = AgendaDialog(self.db_manager, self)
+            dialog.exec()
+            dialog.deleteLater()
+        except Exception as e:
+            logger.error(f"Ошибка при показе сроков: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось показать сроки: {str(e)}")
+    
+    @profiled
+    def show_analytics(self):
+        """Показ истории выполнения задач."""
+        try:
+            dialog = AnalyticsDialog(self.db_manager, self)
+            dialog.exec()
+            dialog.deleteLater()
+        except Exception as e:
+            logger.error(f"Ошибка при показе истории: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось показать историю: {str(e)}")
+    
+    @profiled
+    def rebuild_history(self):
+        """Пересчет итогов по дням по задачам и архиву."""
+        try:
+            # С подключенным архивом в историю входят и перенесенные в него задачи
+            self.archive_manager.attach()
+            self.db_manager.rebuild_daily_rollups()
+            self.db_manager.conn.commit()
+            self.statusBar().showMessage("История выполнения пересчитана", 5000)
+        except Exception as e:
+            logger.error(f"Ошибка при пересчете истории: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.db_manager.conn.rollback()
+            QMessageBox.critical(self, "Ошибка", f"Не удалось пересчитать историю: {str(e)}")
+    
+    def ask_sync_rule(self):
+        """Выбор правила разрешения конфликтов синхронизации (None при отмене)."""
+        descriptions = list(SYNC_RULES.values())
+        description, ok = QInputDialog.getItem(self, "Синхронизация", "При одновременном изменении задачи:",
+                                               descriptions, 0, False)
+        if not ok:
+            return None
+        return list(SYNC_RULES)[descriptions.index(description)]
+    
+    @profiled
+    def sync_database(self):
+        """Двусторонняя синхронизация с другим файлом базы задач."""
+        try:
+            path, _ = QFileDialog.getOpenFileName(self, "Синхронизировать с базой", "",
+                                                  "Базы задач (*.db);;Все файлы (*)")
+            if not path:
+                return
+            if os.path.abspath(path) == os.path.abspath(self.db_manager.db_path):
+                QMessageBox.information(self, "Информация", "Выбрана текущая база задач")
+                return
+            # Выбранный файл проверяется только для чтения: при открытии через
+            # DatabaseManager схема базы прежней версии была бы обновлена
+            try:
+                upgrade = database_needs_upgrade(path)
+            except ValueError as e:
+                QMessageBox.warning(self, "Предупреждение", str(e))
+                return
+            if upgrade:
+                reply = QMessageBox.question(
+                    self,
+                    "Подтверждение",
+                    f"База {os.path.basename(path)} создана прежней версией программы.\n"
+                    "Для синхронизации ее схема будет обновлена, после чего прежняя версия "
+                    "может работать с ней неправильно. Продолжить?",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+                )
+                if reply != QMessageBox.StandardButton.Yes:
+                    return
+            rule = self.ask_sync_rule()
+            if rule is None:
+                return
+            
+            other = DatabaseManager(path)
+            try:
+                stats = SyncManager(self.db_manager).sync(other, rule)
+            finally:
+                other.close()
+            self.reminder_scheduler.reload()
+            self.load_tasks()
+            self.statusBar().showMessage(f"Синхронизация завершена: получено изменений {stats['to_local']}, "
+                                         f"передано {stats['to_other']}", 5000)
+        except Exception as e:
+            logger.error(f"Ошибка при синхронизации: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось синхронизировать базы: {str(e)}")
+    
+    def export_changes(self):
+        """Сохранение всех задач и удалений в файл изменений для переноса в другую базу."""
+        try:
+            path, _ = QFileDialog.getSaveFileName(self, "Сохранить файл изменений", "changes.json.gz",
+                                                  "Файлы изменений (*.json.gz)")
+            if not path:
+                return
+            count, _ = SyncManager(self.db_manager).export_changeset(path)
+            self.statusBar().showMessage(f"Сохранено записей в файл изменений: {count}", 5000)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении файла изменений: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл изменений: {str(e)}")
+    
+    @profiled
+    def import_changes(self):
+        """Применение файла изменений, сохраненного в другой базе."""
+        try:
+            path, _ = QFileDialog.getOpenFileName(self, "Применить файл изменений", "",
+                                                  "Файлы изменений (*.json.gz);;Все файлы (*)")
+            if not path:
+                return
+            rule = self.ask_sync_rule()
+            if rule is None:
+                return
+            
+            count, applied = SyncManager(self.db_manager).import_changeset(path, rule)
+            self.reminder_scheduler.reload()
+            self.load_tasks()
+            self.statusBar().showMessage(f"Файл изменений применен: {applied} из {count}", 5000)
+        except Exception as e:
+            logger.error(f"Ошибка при применении файла изменений: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось применить файл изменений: {str(e)}")
+    
+    def show_attachments(self):
+        """Показ вложений текущей задачи."""
+        try:
+            task = self.ui_manager.get_current_task()
+            if not task:
+                QMessageBox.warning(self, "Предупреждение", "Выберите задачу")
+                return
+            dialog = AttachmentsDialog(self.attachment_manager, task.id, task.title, self)
+            dialog.exec()
+            dialog.deleteLater()
+        except Exception as e:
+            logger.error(f"Ошибка при показе вложений: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось показать вложения: {str(e)}")
+    
+    def show_reminder(self, task_id, title):
+        """Показ напоминания о наступлении срока задачи."""
+        try:
+            self.sound_manager.play_click()
+            self.update_stats()
+            self.statusBar().showMessage(f"Наступил срок задачи '{title}'", 10000)
+            QMessageBox.information(self, "Напоминание", f"Наступил срок задачи:\n{title}")
+        except Exception as e:
+            logger.error(f"Ошибка при показе напоминания: {str(e)}")
+            logger.error(traceback.format_exc())
+    
     def closeEvent(self, event):
         """Обработка события закрытия приложения."""
         try:
             self.settings_manager.save_window_geometry(self)
-            self.db_manager.close()
+            self.settings_manager.save_view_state(self.workspace.name, self.ui_manager.get_view_state())
+            self.settings_manager.save_current_workspace(self.workspace.name)
+            self.reminder_scheduler.stop()
+            self.backupTimer.stop()
+            self.maintenance_scheduler.stop()
+            self.watchdog.stop()
+            self.workspace_manager.close_all()
             logger.debug("Приложение закрыто успешно")
             event.accept()
         except Exception as e:
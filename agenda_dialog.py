@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Диалоговое окно со сроками задач на выбранный период.
+Повторения серий разворачиваются только для отображаемого периода
+и не сохраняются в базе данных.
+"""
+
+import logging
+import traceback
+from datetime import datetime, timedelta
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QDateEdit,
+                            QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox)
+from PyQt6.QtGui import QColor
+from PyQt6.QtCore import QDate
+from database import DATETIME_FORMAT
+from recurrence import expand_occurrences, MAX_EXPANDED_OCCURRENCES
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Период по умолчанию в днях
+DEFAULT_AGENDA_DAYS = 7
+
+class AgendaDialog(QDialog):
+    """Диалоговое окно со сроками задач на период."""
+
+    def __init__(self, db_manager, parent=None):
+        """
+        Инициализация диалогового окна.
+
+        Args:
+            db_manager: Менеджер базы данных
+            parent: Родительский виджет
+        """
+        try:
+            logger.debug("Инициализация диалога сроков")
+            super().__init__(parent)
+            self.db_manager = db_manager
+
+            # Настройка окна
+            self.setWindowTitle("Ближайшие сроки")
+            self.setMinimumSize(500, 400)
+
+            # Создание виджетов
+            self.setup_ui()
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Ошибка в инициализации диалога сроков: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса."""
+        try:
+            layout = QVBoxLayout(self)
+
+            # Период
+            period_layout = QHBoxLayout()
+            today = QDate.currentDate()
+            self.startEdit = QDateEdit(today)
+            self.endEdit = QDateEdit(today.addDays(DEFAULT_AGENDA_DAYS))
+            for edit in (self.startEdit, self.endEdit):
+                edit.setCalendarPopup(True)
+                edit.setDisplayFormat("dd.MM.yyyy")
+            period_layout.addWidget(QLabel("С:"))
+            period_layout.addWidget(self.startEdit)
+            period_layout.addWidget(QLabel("по:"))
+            period_layout.addWidget(self.endEdit)
+            period_layout.addStretch()
+            layout.addLayout(period_layout)
+
+            # Таблица сроков
+            self.agendaTable = QTableWidget()
+            self.agendaTable.setColumnCount(2)
+            self.agendaTable.setHorizontalHeaderLabels(["Срок", "Заголовок"])
+            self.agendaTable.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+            self.agendaTable.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            layout.addWidget(self.agendaTable)
+
+            self.startEdit.dateChanged.connect(self.refresh)
+            self.endEdit.dateChanged.connect(self.refresh)
+
+            logger.debug("UI диалога сроков настроен")
+        except Exception as e:
+            logger.error(f"Ошибка при настройке UI: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def refresh(self):
+        """Загрузка сроков за выбранный период."""
+        try:
+            start = datetime.combine(self.startEdit.date().toPyDate(), datetime.min.time())
+            end = datetime.combine(self.endEdit.date().toPyDate(), datetime.min.time()) + timedelta(days=1)
+
+            # Сохраненные задачи, включая текущие повторения серий
+            rows = [(due_at, title, False) for _, title, due_at in self.db_manager.get_upcoming_due(
+                start.strftime(DATETIME_FORMAT), end.strftime(DATETIME_FORMAT))]
+            # Будущие повторения серий вычисляются только для периода
+            occurrences = expand_occurrences(self.db_manager.get_recurring_series(), start, end)
+            rows.extend((due_at, title, True) for due_at, _, title in occurrences)
+            rows.sort()
+            rows = rows[:MAX_EXPANDED_OCCURRENCES]
+
+            self.agendaTable.setRowCount(len(rows))
+            for row, (due_at, title, virtual) in enumerate(rows):
+                due_text = f"{due_at[8:10]}.{due_at[5:7]}.{due_at[0:4]} {due_at[11:16]}"
+                items = (QTableWidgetItem(due_text), QTableWidgetItem(title + (" ↻" if virtual else "")))
+                for col, item in enumerate(items):
+                    if virtual:
+                        item.setForeground(QColor("#808080"))
+                    self.agendaTable.setItem(row, col, item)
+            self.agendaTable.resizeColumnToContents(0)
+            logger.debug(f"Показано сроков: {len(rows)}, из них будущих повторений: {len(occurrences)}")
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке сроков: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить сроки: {str(e)}")
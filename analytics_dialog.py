@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Диалоговое окно истории выполнения задач.
+Все графики строятся по итогам по дням (daily_rollups), поэтому открытие
+окна не зависит от количества задач.
+"""
+
+import logging
+import traceback
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                            QTabWidget, QWidget, QMessageBox)
+from PyQt6.QtGui import QPainter, QColor, QPen
+from PyQt6.QtCore import Qt, QRectF, QPointF
+from database import OPEN_AGE_BANDS, ROLLUP_MOVING_AVERAGE_DAYS
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Цвета приоритетов на графиках (от низкого к высокому)
+PRIORITY_COLORS = {1: "#9e9e9e", 2: "#4a90d9", 3: "#f5a623", 4: "#d0021b"}
+
+# Подписи групп открытых задач по возрасту
+AGE_BAND_LABELS = ([f"до {OPEN_AGE_BANDS[0]} дн."]
+                   + [f"{low + 1}-{high} дн." for low, high in zip(OPEN_AGE_BANDS, OPEN_AGE_BANDS[1:])]
+                   + [f"больше {OPEN_AGE_BANDS[-1]} дн."])
+
+class BarChart(QWidget):
+    """Столбчатая диаграмма с накоплением и необязательной линией."""
+
+    def __init__(self, parent=None):
+        """
+        Инициализация диаграммы.
+
+        Args:
+            parent: Родительский виджет
+        """
+        super().__init__(parent)
+        self.labels = []
+        self.series = []
+        self.line = None
+        self.setMinimumSize(520, 260)
+
+    def set_data(self, labels, series, line=None):
+        """
+        Задание данных диаграммы.
+
+        Args:
+            labels: Подписи столбцов
+            series: Слои столбцов (название, цвет, значения), рисуются снизу вверх
+            line: Линия (название, цвет, значения) или None
+        """
+        self.labels = list(labels)
+        self.series = list(series)
+        self.line = line
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        try:
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            metrics = painter.fontMetrics()
+            area = QRectF(self.rect()).adjusted(metrics.horizontalAdvance("0000") + 8, metrics.height() + 8,
+                                                -8, -(metrics.height() * 2 + 8))
+            if not self.labels or area.width() <= 0 or area.height() <= 0:
+                painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Нет данных")
+                return
+
+            totals = [sum(values[i] for _, _, values in self.series) for i in range(len(self.labels))]
+            maximum = max(totals + (list(self.line[2]) if self.line else []) + [1])
+
+            # Ось значений
+            painter.setPen(QPen(QColor("#c0c0c0")))
+            for step in range(5):
+                y = area.bottom() - area.height() * step / 4
+                painter.drawLine(QPointF(area.left(), y), QPointF(area.right(), y))
+                painter.drawText(QRectF(0, y - metrics.height() / 2, area.left() - 4, metrics.height()),
+                                 Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                                 f"{maximum * step / 4:.0f}")
+
+            # Столбцы
+            slot = area.width() / len(self.labels)
+            bar_width = max(1.0, slot * 0.7)
+            scale = area.height() / maximum
+            painter.setPen(Qt.PenStyle.NoPen)
+            for index in range(len(self.labels)):
+                x = area.left() + slot * index + (slot - bar_width) / 2
+                bottom = area.bottom()
+                for _, color, values in self.series:
+                    height = values[index] * scale
+                    if height > 0:
+                        painter.setBrush(QColor(color))
+                        painter.drawRect(QRectF(x, bottom - height, bar_width, height))
+                        bottom -= height
+
+            # Линия поверх столбцов
+            if self.line:
+                painter.setPen(QPen(QColor(self.line[1]), 2))
+                points = [QPointF(area.left() + slot * (index + 0.5), area.bottom() - value * scale)
+                          for index, value in enumerate(self.line[2])]
+                painter.drawPolyline(points)
+
+            # Подписи столбцов: не чаще, чем помещается текст
+            painter.setPen(QPen(self.palette().color(self.foregroundRole())))
+            label_width = max(metrics.horizontalAdvance(label) for label in self.labels) + 8
+            every = max(1, int(label_width / slot) + 1)
+            for index in range(0, len(self.labels), every):
+                center = area.left() + slot * (index + 0.5)
+                painter.drawText(QRectF(center - label_width / 2, area.bottom() + 4, label_width, metrics.height()),
+                                 Qt.AlignmentFlag.AlignCenter, self.labels[index])
+
+            # Легенда
+            legend = [(name, color) for name, color, _ in self.series]
+            if self.line:
+                legend.append(self.line[:2])
+            x = area.left()
+            y = area.bottom() + metrics.height() + 8
+            for name, color in legend:
+                painter.fillRect(QRectF(x, y + 2, 10, metrics.height() - 4), QColor(color))
+                painter.drawText(QPointF(x + 14, y + metrics.ascent()), name)
+                x += metrics.horizontalAdvance(name) + 30
+        finally:
+            painter.end()
+
+class AnalyticsDialog(QDialog):
+    """Диалоговое окно истории выполнения задач."""
+
+    def __init__(self, db_manager, parent=None):
+        """
+        Инициализация диалогового окна.
+
+        Args:
+            db_manager: Менеджер базы данных
+            parent: Родительский виджет
+        """
+        try:
+            logger.debug("Инициализация диалога истории")
+            super().__init__(parent)
+            self.db_manager = db_manager
+
+            # Настройка окна
+            self.setWindowTitle("История выполнения")
+            self.setMinimumSize(640, 420)
+
+            # Создание виджетов
+            self.setup_ui()
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Ошибка в инициализации диалога истории: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса."""
+        try:
+            layout = QVBoxLayout(self)
+
+            self.tabs = QTabWidget()
+            self.trendChart = BarChart()
+            self.throughputChart = BarChart()
+            self.agingChart = BarChart()
+            self.tabs.addTab(self.trendChart, "Выполнение по дням")
+            self.tabs.addTab(self.throughputChart, "По приоритетам")
+            self.tabs.addTab(self.agingChart, "Возраст открытых")
+            layout.addWidget(self.tabs)
+
+            self.summaryLabel = QLabel()
+            self.summaryLabel.setWordWrap(True)
+            layout.addWidget(self.summaryLabel)
+
+            # Кнопки
+            button_layout = QHBoxLayout()
+            self.closeButton = QPushButton("Закрыть")
+            button_layout.addStretch()
+            button_layout.addWidget(self.closeButton)
+            layout.addLayout(button_layout)
+
+            self.closeButton.clicked.connect(self.accept)
+
+            logger.debug("UI диалога истории настроен")
+        except Exception as e:
+            logger.error(f"Ошибка при настройке UI: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def refresh(self):
+        """Загрузка итогов и обновление графиков."""
+        try:
+            trend = self.db_manager.get_completion_trend()
+            self.trendChart.set_data(
+                [f"{day[8:10]}.{day[5:7]}" for day, *_ in trend],
+                [("Выполнено", "#7ed321", [completed for _, _, completed, _, _ in trend])],
+                (f"Среднее за {ROLLUP_MOVING_AVERAGE_DAYS} дн.", "#417505", [average for *_, average, _ in trend]))
+
+            throughput = self.db_manager.get_priority_throughput()
+            weeks = sorted({week for week, *_ in throughput})
+            done = {(week, priority): count for week, priority, count, _ in throughput}
+            self.throughputChart.set_data(
+                [f"{week[8:10]}.{week[5:7]}" for week in weeks],
+                [(f"Приоритет {priority}", PRIORITY_COLORS[priority],
+                  [done.get((week, priority), 0) for week in weeks]) for priority in PRIORITY_COLORS])
+
+            aging, median_age = self.db_manager.get_open_task_aging()
+            counts = {(band, priority): count for band, priority, count in aging}
+            self.agingChart.set_data(
+                AGE_BAND_LABELS,
+                [(f"Приоритет {priority}", PRIORITY_COLORS[priority],
+                  [counts.get((band, priority), 0) for band in range(len(AGE_BAND_LABELS))])
+                 for priority in PRIORITY_COLORS])
+
+            created = sum(row[1] for row in trend)
+            completed = sum(row[2] for row in trend)
+            summary = (f"За {len(trend)} дн. создано задач: {created}, выполнено: {completed}. "
+                       f"Открыто сейчас: {trend[-1][4] if trend else 0}")
+            if median_age is not None:
+                summary += f", половина открытых задач старше {median_age} дн."
+            self.summaryLabel.setText(summary)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке истории: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить историю: {str(e)}")
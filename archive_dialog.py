@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Диалоговое окно для поиска задач в архиве.
+"""
+
+import logging
+import traceback
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
+                            QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox)
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+class ArchiveSearchDialog(QDialog):
+    """Диалоговое окно для поиска задач в архиве."""
+
+    def __init__(self, archive_manager, parent=None):
+        """
+        Инициализация диалогового окна.
+
+        Args:
+            archive_manager: Менеджер архива задач
+            parent: Родительский виджет
+        """
+        try:
+            logger.debug("Инициализация диалога поиска в архиве")
+            super().__init__(parent)
+            self.archive_manager = archive_manager
+
+            # Настройка окна
+            self.setWindowTitle("Поиск в архиве")
+            self.setMinimumSize(600, 400)
+
+            # Создание виджетов
+            self.setup_ui()
+        except Exception as e:
+            logger.error(f"Ошибка в инициализации диалога архива: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса."""
+        try:
+            layout = QVBoxLayout(self)
+
+            # Строка поиска
+            search_layout = QHBoxLayout()
+            self.searchEdit = QLineEdit()
+            self.searchEdit.setPlaceholderText("Текст для поиска")
+            self.searchButton = QPushButton("Найти")
+            search_layout.addWidget(self.searchEdit)
+            search_layout.addWidget(self.searchButton)
+            layout.addLayout(search_layout)
+
+            # Таблица результатов
+            self.resultTable = QTableWidget()
+            self.resultTable.setColumnCount(5)
+            self.resultTable.setHorizontalHeaderLabels(["Заголовок", "Описание", "Приоритет", "Теги", "В архиве с"])
+            self.resultTable.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+            self.resultTable.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+            self.resultTable.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            layout.addWidget(self.resultTable)
+
+            self.searchButton.clicked.connect(self.search)
+            self.searchEdit.returnPressed.connect(self.search)
+
+            logger.debug("UI диалога архива настроен")
+        except Exception as e:
+            logger.error(f"Ошибка при настройке UI: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def search(self):
+        """Поиск задач в архиве и вывод результатов."""
+        try:
+            text = self.searchEdit.text().strip()
+            results = self.archive_manager.search(text)
+
+            self.resultTable.setRowCount(len(results))
+            for row, (task_id, title, description, priority, updated_at, archived_at, tags) in enumerate(results):
+                self.resultTable.setItem(row, 0, QTableWidgetItem(title))
+                self.resultTable.setItem(row, 1, QTableWidgetItem(description or ""))
+                self.resultTable.setItem(row, 2, QTableWidgetItem(str(priority)))
+                self.resultTable.setItem(row, 3, QTableWidgetItem(", ".join(tags)))
+                self.resultTable.setItem(row, 4, QTableWidgetItem(archived_at))
+            logger.debug(f"Показано результатов поиска в архиве: {len(results)}")
+        except Exception as e:
+            logger.error(f"Ошибка при поиске в архиве: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось выполнить поиск: {str(e)}")
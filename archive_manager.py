@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Менеджер архива задач.
+Переносит давно выполненные задачи из основной базы в архивную
+и выполняет поиск по архиву.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import traceback
+from urllib.request import pathname2url
+from sync_manager import SyncManager
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Количество задач, переносимых в архив за одну транзакцию
+ARCHIVE_BATCH_SIZE = 500
+
+# Условие переноса задачи в архив ({alias} - имя таблицы задач в запросе).
+# В архив не попадают вложения, а удаление задачи удаляет их вместе с файлами,
+# поэтому задачи с вложениями остаются в основной базе. Задача с подзадачами
+# остается, пока они в списке: иначе подзадачи стали бы задачами верхнего
+# уровня. Выполненные подзадачи переносятся раньше, и родитель - следующей пачкой
+ARCHIVE_CONDITION = """
+    {alias}.completed = 1 AND {alias}.completed_at < ?
+    AND NOT EXISTS (SELECT 1 FROM main.attachments AS a WHERE a.task_id = {alias}.id)
+    AND NOT EXISTS (SELECT 1 FROM main.tasks AS c WHERE c.parent_id = {alias}.id)
+"""
+
+# Колонки, добавленные в архив после его появления: (имя, тип, значение для старых строк)
+ARCHIVE_ADDED_COLUMNS = (
+    ('completed_at', 'TIMESTAMP', 'updated_at'),
+    ('parent_id', 'INTEGER', 'NULL'),
+    ('tags', 'TEXT', "'[]'"),
+)
+
+# Максимальное количество результатов поиска по архиву
+ARCHIVE_SEARCH_LIMIT = 200
+
+class ArchiveManager:
+    """Класс для управления архивом выполненных задач."""
+
+    def __init__(self, db_manager, archive_path=None):
+        """
+        Инициализация менеджера архива.
+
+        Args:
+            db_manager: Менеджер основной базы данных
+            archive_path: Путь к файлу архива (по умолчанию рядом с основной базой)
+        """
+        self.db_manager = db_manager
+        if archive_path is None:
+            base, _ = os.path.splitext(db_manager.db_path)
+            archive_path = f"{base}_archive.db"
+        self.archive_path = archive_path
+        self.attached = False
+        self.search_conn = None
+        self.sync_manager = SyncManager(db_manager)
+        logger.debug(f"Менеджер архива инициализирован: {archive_path}")
+
+    def attach(self):
+        """Подключение архивной базы к основному соединению."""
+        try:
+            if self.attached:
+                return
+            self.db_manager.cursor.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+            self.create_tables()
+            self.attached = True
+            logger.debug("Архивная база подключена")
+        except Exception as e:
+            logger.error(f"Ошибка при подключении архива: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def create_tables(self):
+        """Создание таблиц подключенного архива (в том числе после восстановления из копии)."""
+        try:
+            self.db_manager.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS archive.tasks (
+                    archive_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    priority INTEGER DEFAULT 1,
+                    completed BOOLEAN DEFAULT 1,
+                    created_at TIMESTAMP,
+                    updated_at TIMESTAMP,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP,
+                    parent_id INTEGER,
+                    tags TEXT
+                )
+            ''')
+            # Время выполнения в архивах, созданных до его появления, -
+            # время последнего изменения задачи; родитель и теги таких задач неизвестны
+            self.db_manager.cursor.execute("SELECT name FROM pragma_table_info('tasks', 'archive')")
+            columns = [name for (name,) in self.db_manager.cursor.fetchall()]
+            for name, column_type, value in ARCHIVE_ADDED_COLUMNS:
+                if name not in columns:
+                    self.db_manager.cursor.execute(f"ALTER TABLE archive.tasks ADD COLUMN {name} {column_type}")
+                    self.db_manager.cursor.execute(f"UPDATE archive.tasks SET {name} = {value}")
+            self.db_manager.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS archive.idx_archive_updated
+                ON tasks (updated_at)
+            """)
+            self.db_manager.conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка при создании таблиц архива: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def archive_completed(self, days):
+        """
+        Перенос в архив задач, выполненных более указанного числа дней назад
+        (по времени выполнения: перемещение и правка задачи его не меняют).
+        Задачи с вложениями и задачи, подзадачи которых остаются в списке,
+        не переносятся. Архивная запись хранит ID родителя и названия тегов.
+
+        Args:
+            days: Возраст выполненной задачи в днях
+
+        Returns:
+            int: Количество перенесенных задач
+        """
+        try:
+            self.attach()
+            cursor = self.db_manager.cursor
+            cursor.execute("SELECT datetime('now', ?)", (f"-{int(days)} days",))
+            threshold = cursor.fetchone()[0]
+            total = 0
+
+            # Переносим задачи пачками, каждая пачка - отдельная транзакция.
+            # Пачка задается предикатом и верхней границей ID, без списка ID
+            while True:
+                cursor.execute(f"""
+                    SELECT MAX(id) FROM (
+                        SELECT id FROM main.tasks
+                        WHERE {ARCHIVE_CONDITION.format(alias="tasks")}
+                        ORDER BY id
+                        LIMIT ?
+                    )
+                """, (threshold, ARCHIVE_BATCH_SIZE))
+                last_id = cursor.fetchone()[0]
+                if last_id is None:
+                    break
+
+                # В архив переносится полное описание, сжатое распаковывается
+                cursor.execute(f"""
+                    INSERT INTO archive.tasks
+                        (task_id, title, description, priority, completed, created_at, updated_at, completed_at,
+                         parent_id, tags)
+                    SELECT t.id, t.title, IFNULL(decompress_description(z.data), t.description),
+                           t.priority, t.completed, t.created_at, t.updated_at, t.completed_at, t.parent_id,
+                           (SELECT json_group_array(name) FROM (
+                                SELECT g.name FROM main.task_tags AS tt JOIN main.tags AS g ON g.id = tt.tag_id
+                                WHERE tt.task_id = t.id ORDER BY g.name))
+                    FROM main.tasks AS t
+                    LEFT JOIN main.task_descriptions_z AS z ON z.task_id = t.id
+                    WHERE {ARCHIVE_CONDITION.format(alias="t")} AND t.id <= ?
+                """, (threshold, last_id))
+                # Перенесенные задачи остаются в дереве синхронизации, а их
+                # удаление не оставляет надгробий (признак archiving): иначе
+                # синхронизация удалила бы задачи в другой базе
+                cursor.execute(f"""
+                    SELECT uid FROM main.tasks
+                    WHERE {ARCHIVE_CONDITION.format(alias="tasks")} AND id <= ? AND uid IS NOT NULL
+                """, (threshold, last_id))
+                self.sync_manager.keep_archived([uid for (uid,) in cursor.fetchall()])
+                # Перенесенные задачи остаются в итогах по дням
+                cursor.execute("UPDATE journal_state SET value = 1 WHERE key = 'archiving'")
+                cursor.execute(f"""
+                    DELETE FROM main.tasks
+                    WHERE {ARCHIVE_CONDITION.format(alias="tasks")} AND id <= ?
+                """, (threshold, last_id))
+                total += cursor.rowcount
+                cursor.execute("UPDATE journal_state SET value = 0 WHERE key = 'archiving'")
+                # Теги без задач больше не показываются в фильтре
+                cursor.execute("DELETE FROM main.tags WHERE task_count <= 0")
+                self.db_manager.conn.commit()
+
+            # Отмена действий с перенесенными задачами вернула бы их в список повторно
+            if total:
+                self.db_manager.clear_journal()
+                self.db_manager.conn.commit()
+
+            logger.debug(f"В архив перенесено задач: {total}")
+            return total
+        except Exception as e:
+            logger.error(f"Ошибка при архивации задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.db_manager.conn.rollback()
+            raise
+
+    def get_search_connection(self):
+        """Ленивое открытие отдельного соединения для поиска по архиву."""
+        if self.search_conn is None:
+            if not os.path.exists(self.archive_path):
+                return None
+            uri = f"file:{pathname2url(os.path.abspath(self.archive_path))}?mode=ro"
+            self.search_conn = sqlite3.connect(uri, uri=True)
+            logger.debug("Открыто соединение для поиска по архиву")
+        return self.search_conn
+
+    def search(self, text, limit=ARCHIVE_SEARCH_LIMIT):
+        """
+        Поиск задач в архиве по заголовку и описанию.
+
+        Args:
+            text: Искомая подстрока
+            limit: Максимальное количество результатов
+
+        Returns:
+            list: Кортежи (task_id, title, description, priority, updated_at, archived_at, tags),
+                  tags - список названий тегов
+        """
+        try:
+            conn = self.get_search_connection()
+            if conn is None:
+                return []
+            pattern = f"%{text}%"
+            results = conn.execute("""
+                SELECT task_id, title, description, priority, updated_at, archived_at, tags
+                FROM tasks
+                WHERE title LIKE ? OR description LIKE ?
+                ORDER BY updated_at DESC
+                LIMIT ?
+            """, (pattern, pattern, limit)).fetchall()
+            results = [row[:-1] + (json.loads(row[-1] or "[]"),) for row in results]
+            logger.debug(f"Найдено в архиве: {len(results)}")
+            return results
+        except Exception as e:
+            logger.error(f"Ошибка при поиске в архиве: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def close(self):
+        """Закрытие соединения для поиска по архиву."""
+        try:
+            if self.search_conn:
+                self.search_conn.close()
+                self.search_conn = None
+                logger.debug("Соединение с архивом закрыто")
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии соединения с архивом: {str(e)}")
+            logger.error(traceback.format_exc())
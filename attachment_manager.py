@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Менеджер вложений задач.
+Файлы хранятся в базе один раз на содержимое (по SHA-256) и читаются
+и пишутся частями через инкрементальный ввод-вывод BLOB, поэтому файл
+целиком в память не загружается. Миниатюры изображений создаются
+в фоновом потоке и кэшируются в базе.
+"""
+
+import os
+import sqlite3
+import hashlib
+import logging
+import mimetypes
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import Qt, QBuffer, QByteArray, QIODevice, QSize
+from PyQt6.QtGui import QImageReader
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Размер части файла при чтении и записи
+ATTACHMENT_CHUNK_SIZE = 256 * 1024
+
+# Размер стороны миниатюры в пикселях
+THUMBNAIL_SIZE = 96
+
+# Максимальный размер изображения, для которого создается миниатюра
+THUMBNAIL_MAX_SOURCE_SIZE = 32 * 1024 * 1024
+
+# Инкрементальный ввод-вывод BLOB появился в Python 3.11; в более старых
+# версиях данные файла передаются одним значением
+HAS_BLOBOPEN = hasattr(sqlite3.Connection, "blobopen")
+
+def hash_file(path):
+    """
+    Вычисление SHA-256 и размера файла с чтением по частям.
+
+    Returns:
+        tuple: (шестнадцатеричный SHA-256, размер в байтах)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(ATTACHMENT_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def iter_blob(conn, blob_id):
+    """Генератор частей данных файла из attachment_blobs."""
+    if HAS_BLOBOPEN:
+        with conn.blobopen("attachment_blobs", "data", blob_id, readonly=True) as blob:
+            for chunk in iter(lambda: blob.read(ATTACHMENT_CHUNK_SIZE), b""):
+                yield chunk
+    else:
+        row = conn.execute("SELECT data FROM attachment_blobs WHERE id = ?", (blob_id,)).fetchone()
+        if row:
+            yield bytes(row[0])
+
+class AttachmentManager:
+    """Класс для управления вложениями задач."""
+
+    def __init__(self, db_manager):
+        """
+        Инициализация менеджера вложений.
+
+        Args:
+            db_manager: Менеджер базы данных рабочей области
+        """
+        self.db_manager = db_manager
+        # Миниатюры создаются по очереди в одном фоновом потоке со своим соединением
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+        self.worker_conn = None
+        logger.debug("Менеджер вложений инициализирован")
+
+    def list_attachments(self, task_id):
+        """
+        Список вложений задачи.
+
+        Returns:
+            list: Кортежи (ID вложения, имя, MIME-тип, размер, ID данных)
+        """
+        try:
+            self.db_manager.cursor.execute("""
+                SELECT id, name, mime, size, blob_id
+                FROM attachments
+                WHERE task_id = ?
+                ORDER BY id
+            """, (task_id,))
+            return self.db_manager.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка при получении вложений задачи: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def add_file(self, task_id, path):
+        """
+        Добавление файла к задаче.
+
+        Файл читается дважды по частям: для вычисления SHA-256 и, если такого
+        содержимого в базе еще нет, для записи в заранее выделенный BLOB.
+
+        Args:
+            task_id: ID задачи
+            path: Путь к файлу
+
+        Returns:
+            int: ID вложения
+        """
+        db_manager = self.db_manager
+        try:
+            sha256, size = hash_file(path)
+            name = os.path.basename(path)
+            mime = mimetypes.guess_type(name)[0]
+
+            db_manager.begin_change("Добавление вложения")
+            db_manager.cursor.execute("SELECT id FROM attachment_blobs WHERE sha256 = ?", (sha256,))
+            row = db_manager.cursor.fetchone()
+            if row:
+                blob_id = row[0]
+                logger.debug(f"Содержимое файла {name} уже есть в базе, данные не копируются")
+            else:
+                blob_id = self.write_blob(path, sha256, size)
+
+            db_manager.cursor.execute("""
+                INSERT INTO attachments (task_id, blob_id, name, mime, size)
+                VALUES (?, ?, ?, ?, ?)
+            """, (task_id, blob_id, name, mime, size))
+            attachment_id = db_manager.cursor.lastrowid
+            db_manager.end_change()
+            db_manager.conn.commit()
+            logger.debug(f"К задаче {task_id} добавлено вложение {name} ({size} байт)")
+            return attachment_id
+        except Exception as e:
+            logger.error(f"Ошибка при добавлении вложения: {str(e)}")
+            logger.error(traceback.format_exc())
+            db_manager.conn.rollback()
+            raise
+
+    def write_blob(self, path, sha256, size):
+        """Запись данных файла в attachment_blobs по частям (без фиксации транзакции)."""
+        cursor = self.db_manager.cursor
+        if not HAS_BLOBOPEN:
+            with open(path, "rb") as source:
+                cursor.execute("INSERT INTO attachment_blobs (sha256, size, data) VALUES (?, ?, ?)",
+                               (sha256, size, source.read()))
+            return cursor.lastrowid
+
+        cursor.execute("INSERT INTO attachment_blobs (sha256, size, data) VALUES (?, ?, zeroblob(?))",
+                       (sha256, size, size))
+        blob_id = cursor.lastrowid
+        if size:
+            with self.db_manager.conn.blobopen("attachment_blobs", "data", blob_id) as blob, \
+                    open(path, "rb") as source:
+                # Файл мог измениться после вычисления SHA-256 - пишем не больше выделенного
+                written = 0
+                for chunk in iter(lambda: source.read(ATTACHMENT_CHUNK_SIZE), b""):
+                    if written + len(chunk) > size:
+                        raise ValueError("Файл изменился во время добавления")
+                    blob.write(chunk)
+                    written += len(chunk)
+            if written != size:
+                raise ValueError("Файл изменился во время добавления")
+        return blob_id
+
+    def export(self, attachment_id, path):
+        """
+        Сохранение вложения в файл по частям.
+
+        Данные пишутся во временный файл, который переименовывается
+        только после успешной записи.
+        """
+        try:
+            self.db_manager.cursor.execute("SELECT blob_id FROM attachments WHERE id = ?", (attachment_id,))
+            row = self.db_manager.cursor.fetchone()
+            if not row:
+                raise ValueError("Вложение не найдено")
+            part_path = path + ".part"
+            with open(part_path, "wb") as target:
+                for chunk in iter_blob(self.db_manager.conn, row[0]):
+                    target.write(chunk)
+            os.replace(part_path, path)
+            logger.debug(f"Вложение {attachment_id} сохранено в {path}")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении вложения: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def remove(self, attachment_ids):
+        """
+        Удаление вложений.
+
+        Данные файла остаются в базе, пока удаление можно отменить, и
+        удаляются при очистке журнала изменений.
+        """
+        try:
+            self.db_manager.begin_change("Удаление вложений")
+            self.db_manager.cursor.executemany("DELETE FROM attachments WHERE id = ?",
+                                               [(attachment_id,) for attachment_id in attachment_ids])
+            self.db_manager.end_change()
+            self.db_manager.conn.commit()
+            logger.debug(f"Удалено вложений: {len(attachment_ids)}")
+        except Exception as e:
+            logger.error(f"Ошибка при удалении вложений: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.db_manager.conn.rollback()
+            raise
+
+    def request_thumbnail(self, blob_id, on_ready):
+        """
+        Запрос миниатюры изображения в фоновом потоке.
+
+        Args:
+            blob_id: ID данных файла
+            on_ready: Функция on_ready(ID данных, PNG-данные или пустые байты),
+                вызывается из фонового потока
+        """
+        self.executor.submit(self.make_thumbnail, blob_id, on_ready)
+
+    def make_thumbnail(self, blob_id, on_ready):
+        """Получение миниатюры из кэша или ее создание (выполняется в фоновом потоке)."""
+        try:
+            if self.worker_conn is None:
+                self.worker_conn = sqlite3.connect(self.db_manager.db_path)
+            conn = self.worker_conn
+            row = conn.execute("SELECT png FROM attachment_thumbnails WHERE blob_id = ?", (blob_id,)).fetchone()
+            if row:
+                self.deliver(on_ready, blob_id, bytes(row[0] or b""))
+                return
+
+            png = b""
+            row = conn.execute("SELECT size FROM attachment_blobs WHERE id = ?", (blob_id,)).fetchone()
+            if row and row[0] <= THUMBNAIL_MAX_SOURCE_SIZE:
+                data = QByteArray()
+                for chunk in iter_blob(conn, blob_id):
+                    data.append(chunk)
+                png = self.scale_image(data)
+            # Пустое значение тоже кэшируется, чтобы не пытаться снова для не-изображений
+            conn.execute("INSERT OR REPLACE INTO attachment_thumbnails (blob_id, png) VALUES (?, ?)",
+                         (blob_id, png))
+            conn.commit()
+            self.deliver(on_ready, blob_id, png)
+        except Exception as e:
+            logger.error(f"Ошибка при создании миниатюры: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def deliver(self, on_ready, blob_id, png):
+        """Передача миниатюры получателю, который мог быть уже закрыт."""
+        try:
+            on_ready(blob_id, png)
+        except RuntimeError:
+            logger.debug(f"Получатель миниатюры {blob_id} уже закрыт")
+
+    def scale_image(self, data):
+        """Уменьшение изображения до миниатюры в PNG (пустые байты, если это не изображение)."""
+        source = QBuffer(data)
+        source.open(QIODevice.OpenModeFlag.ReadOnly)
+        reader = QImageReader(source)
+        if not reader.canRead():
+            return b""
+        # Для форматов с масштабированием при чтении (JPEG) полное изображение не декодируется
+        size = reader.size()
+        if size.isValid():
+            reader.setScaledSize(size.scaled(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE),
+                                             Qt.AspectRatioMode.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            return b""
+        if image.width() > THUMBNAIL_SIZE or image.height() > THUMBNAIL_SIZE:
+            image = image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        output = QByteArray()
+        target = QBuffer(output)
+        target.open(QIODevice.OpenModeFlag.WriteOnly)
+        image.save(target, "PNG")
+        return bytes(output)
+
+    def close_worker_connection(self):
+        """Закрытие соединения фонового потока (выполняется в этом потоке)."""
+        if self.worker_conn is not None:
+            self.worker_conn.close()
+            self.worker_conn = None
+
+    def close(self):
+        """Остановка фонового потока миниатюр."""
+        try:
+            self.executor.submit(self.close_worker_connection)
+            self.executor.shutdown(wait=True)
+            logger.debug("Менеджер вложений остановлен")
+        except Exception as e:
+            logger.error(f"Ошибка при остановке менеджера вложений: {str(e)}")
+            logger.error(traceback.format_exc())
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Диалоговое окно вложений задачи.
+Миниатюры изображений запрашиваются у менеджера вложений и
+появляются в списке по мере готовности.
+"""
+
+import logging
+import traceback
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem,
+                            QPushButton, QFileDialog, QMessageBox, QListView)
+from PyQt6.QtGui import QIcon, QPixmap, QImage
+from PyQt6.QtCore import Qt, QSize, pyqtSignal
+from attachment_manager import THUMBNAIL_SIZE
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+def format_size(size):
+    """Размер файла для отображения."""
+    for unit in ("Б", "КБ", "МБ"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "Б" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
+class AttachmentsDialog(QDialog):
+    """Диалоговое окно вложений задачи."""
+
+    # Сигнал о готовности миниатюры: (ID данных, PNG-данные)
+    thumbnail_ready = pyqtSignal(int, bytes)
+
+    def __init__(self, attachment_manager, task_id, title, parent=None):
+        """
+        Инициализация диалогового окна.
+
+        Args:
+            attachment_manager: Менеджер вложений
+            task_id: ID задачи
+            title: Заголовок задачи
+            parent: Родительский виджет
+        """
+        try:
+            logger.debug("Инициализация диалога вложений")
+            super().__init__(parent)
+            self.attachment_manager = attachment_manager
+            self.task_id = task_id
+            # Признак изменения вложений (для обновления окна после закрытия)
+            self.changed = False
+
+            # Настройка окна
+            self.setWindowTitle(f"Вложения: {title}")
+            self.setMinimumSize(500, 350)
+
+            # Создание виджетов
+            self.setup_ui()
+            self.thumbnail_ready.connect(self.show_thumbnail)
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Ошибка в инициализации диалога вложений: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса."""
+        try:
+            layout = QVBoxLayout(self)
+
+            # Список вложений с миниатюрами
+            self.attachmentList = QListWidget()
+            self.attachmentList.setViewMode(QListView.ViewMode.IconMode)
+            self.attachmentList.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            self.attachmentList.setGridSize(QSize(THUMBNAIL_SIZE + 48, THUMBNAIL_SIZE + 48))
+            self.attachmentList.setResizeMode(QListView.ResizeMode.Adjust)
+            self.attachmentList.setMovement(QListView.Movement.Static)
+            self.attachmentList.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+            self.attachmentList.setWordWrap(True)
+            layout.addWidget(self.attachmentList)
+
+            # Кнопки
+            button_layout = QHBoxLayout()
+            self.addButton = QPushButton("Добавить...")
+            self.saveButton = QPushButton("Сохранить как...")
+            self.removeButton = QPushButton("Удалить")
+            self.closeButton = QPushButton("Закрыть")
+            button_layout.addWidget(self.addButton)
+            button_layout.addWidget(self.saveButton)
+            button_layout.addWidget(self.removeButton)
+            button_layout.addStretch()
+            button_layout.addWidget(self.closeButton)
+            layout.addLayout(button_layout)
+
+            self.addButton.clicked.connect(self.add_files)
+            self.saveButton.clicked.connect(self.save_attachment)
+            self.removeButton.clicked.connect(self.remove_attachments)
+            self.closeButton.clicked.connect(self.accept)
+            self.attachmentList.itemDoubleClicked.connect(self.save_attachment)
+
+            logger.debug("UI диалога вложений настроен")
+        except Exception as e:
+            logger.error(f"Ошибка при настройке UI: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def refresh(self):
+        """Загрузка списка вложений и запрос миниатюр изображений."""
+        try:
+            self.attachmentList.clear()
+            file_icon = self.style().standardIcon(self.style().StandardPixmap.SP_FileIcon)
+            for attachment_id, name, mime, size, blob_id in self.attachment_manager.list_attachments(self.task_id):
+                item = QListWidgetItem(file_icon, f"{name}\n{format_size(size)}")
+                item.setData(Qt.ItemDataRole.UserRole, attachment_id)
+                item.setData(Qt.ItemDataRole.UserRole + 1, blob_id)
+                item.setToolTip(name)
+                self.attachmentList.addItem(item)
+                if mime and mime.startswith("image/"):
+                    self.attachment_manager.request_thumbnail(blob_id, self.thumbnail_ready.emit)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке вложений: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить вложения: {str(e)}")
+
+    def show_thumbnail(self, blob_id, png):
+        """Замена значка файла миниатюрой изображения."""
+        if not png:
+            return
+        image = QImage.fromData(png, "PNG")
+        if image.isNull():
+            return
+        icon = QIcon(QPixmap.fromImage(image))
+        for row in range(self.attachmentList.count()):
+            item = self.attachmentList.item(row)
+            if item.data(Qt.ItemDataRole.UserRole + 1) == blob_id:
+                item.setIcon(icon)
+
+    def add_files(self):
+        """Добавление выбранных файлов к задаче."""
+        try:
+            paths, _ = QFileDialog.getOpenFileNames(self, "Добавить вложения")
+            if not paths:
+                return
+            for path in paths:
+                self.attachment_manager.add_file(self.task_id, path)
+            self.changed = True
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Ошибка при добавлении вложений: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось добавить вложение: {str(e)}")
+
+    def save_attachment(self):
+        """Сохранение текущего вложения в файл."""
+        try:
+            item = self.attachmentList.currentItem()
+            if item is None:
+                QMessageBox.warning(self, "Предупреждение", "Выберите вложение")
+                return
+            path, _ = QFileDialog.getSaveFileName(self, "Сохранить вложение", item.toolTip())
+            if path:
+                self.attachment_manager.export(item.data(Qt.ItemDataRole.UserRole), path)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении вложения: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить вложение: {str(e)}")
+
+    def remove_attachments(self):
+        """Удаление выбранных вложений."""
+        try:
+            items = self.attachmentList.selectedItems()
+            if not items:
+                QMessageBox.warning(self, "Предупреждение", "Выберите вложения для удаления")
+                return
+            reply = QMessageBox.question(
+                self,
+                "Подтверждение",
+                f"Удалить выбранные вложения ({len(items)})?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if reply == QMessageBox.StandardButton.Yes:
+                self.attachment_manager.remove([item.data(Qt.ItemDataRole.UserRole) for item in items])
+                self.changed = True
+                self.refresh()
+        except Exception as e:
+            logger.error(f"Ошибка при удалении вложений: {str(e)}")
+            logger.error(traceback.format_exc())
+            QMessageBox.critical(self, "Ошибка", f"Не удалось удалить вложения: {str(e)}")
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Менеджер резервных копий.
+Создает онлайн-копии базы данных через backup API SQLite в фоновом потоке
+и восстанавливает базу из выбранной копии. Архив выполненных задач
+копируется и восстанавливается вместе с основной базой (парный файл
+<копия>_archive.db), чтобы задачи не терялись и не дублировались.
+"""
+
+import os
+import re
+import sqlite3
+import logging
+import threading
+import traceback
+from datetime import datetime
+from time import perf_counter
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Количество страниц, копируемых за один шаг
+BACKUP_PAGES_PER_STEP = 64
+
+# Пауза между шагами копирования в секундах: между шагами база свободна
+# для записи из основного потока
+BACKUP_STEP_SLEEP = 0.005
+
+# Количество хранимых копий по умолчанию
+DEFAULT_BACKUP_KEEP = 10
+
+# Количество попыток согласованно скопировать базу и архив: если архивация
+# задач прошла во время копирования, обе копии снимаются заново
+BACKUP_ARCHIVE_ATTEMPTS = 3
+
+def archive_snapshot_path(snapshot_path):
+    """Путь к копии архива, парной копии основной базы."""
+    return os.path.splitext(snapshot_path)[0] + "_archive.db"
+
+class BackupManager:
+    """Класс для управления резервными копиями базы данных."""
+
+    def __init__(self, db_path, backup_dir=None, keep=DEFAULT_BACKUP_KEEP, archive_path=None):
+        """
+        Инициализация менеджера резервных копий.
+
+        Args:
+            db_path: Путь к файлу базы данных
+            backup_dir: Каталог для копий (по умолчанию backups рядом с базой)
+            keep: Количество хранимых копий
+            archive_path: Путь к архиву выполненных задач или None
+        """
+        self.db_path = db_path
+        self.archive_path = archive_path
+        if backup_dir is None:
+            backup_dir = os.path.join(os.path.dirname(os.path.abspath(db_path)), "backups")
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.prefix = os.path.splitext(os.path.basename(db_path))[0] + "-"
+        # Копии всех рабочих областей лежат в одном каталоге, а имена областей
+        # могут содержать "-": копии этой базы отбираются по полному шаблону имени
+        self.snapshot_pattern = re.compile(rf"{re.escape(self.prefix)}\d{{8}}-\d{{6}}\.db")
+        self.thread = None
+        self.last_duration = None
+        logger.debug(f"Менеджер резервных копий инициализирован: {backup_dir}")
+
+    def is_running(self):
+        """Проверка, выполняется ли сейчас копирование."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start_backup(self, on_finished=None):
+        """
+        Запуск создания копии в фоновом потоке.
+
+        Args:
+            on_finished: Функция on_finished(путь к копии, длительность, ошибка),
+                вызывается из фонового потока
+
+        Returns:
+            bool: False, если копирование уже выполняется
+        """
+        if self.is_running():
+            logger.debug("Резервное копирование уже выполняется")
+            return False
+        self.thread = threading.Thread(target=self.run_backup, args=(on_finished,),
+                                       name="backup", daemon=True)
+        self.thread.start()
+        return True
+
+    def run_backup(self, on_finished=None):
+        """
+        Создание копии базы данных.
+
+        Копирование идет по BACKUP_PAGES_PER_STEP страниц с паузами, через
+        отдельное соединение, поэтому основной поток не блокируется.
+        Если база меняется во время копирования, SQLite начинает копию заново.
+
+        Returns:
+            str: Путь к созданной копии
+        """
+        start = perf_counter()
+        path = None
+        error = None
+        try:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            name = f"{self.prefix}{datetime.now():%Y%m%d-%H%M%S}.db"
+            path = os.path.join(self.backup_dir, name)
+            partial_path = path + ".part"
+
+            source = sqlite3.connect(self.db_path)
+            try:
+                if self.archive_path is None:
+                    self.copy_database(source, "main", partial_path)
+                else:
+                    self.copy_with_archive(source, partial_path)
+            finally:
+                source.close()
+            # Парная копия архива появляется раньше основной: копия без пары
+            # в списке не бывает
+            if self.archive_path is not None:
+                os.replace(archive_snapshot_path(partial_path), archive_snapshot_path(path))
+            os.replace(partial_path, path)
+
+            self.last_duration = perf_counter() - start
+            logger.debug(f"Резервная копия создана за {self.last_duration:.3f} с: {path}")
+            self.apply_retention()
+        except Exception as e:
+            error = str(e)
+            path = None
+            logger.error(f"Ошибка при создании резервной копии: {error}")
+            logger.error(traceback.format_exc())
+
+        if on_finished:
+            on_finished(path or "", perf_counter() - start, error or "")
+        return path
+
+    def copy_database(self, source, name, path):
+        """Копирование базы name соединения source в файл path по шагам."""
+        target = sqlite3.connect(path)
+        try:
+            source.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP, name=name)
+        finally:
+            target.close()
+
+    def copy_with_archive(self, source, path):
+        """
+        Копирование основной базы и архива в согласованном состоянии.
+
+        Архивация переносит задачи одной транзакцией в обе базы, поэтому
+        копии согласованы, если архив не менялся, пока снимались обе копии
+        (PRAGMA data_version). Если архива еще нет, парная копия - пустой файл.
+        """
+        archive_path = archive_snapshot_path(path)
+        if not os.path.exists(self.archive_path):
+            self.copy_database(source, "main", path)
+            if not os.path.exists(self.archive_path):
+                open(archive_path, "wb").close()
+                return
+        source.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        for attempt in range(BACKUP_ARCHIVE_ATTEMPTS):
+            version = source.execute("PRAGMA archive.data_version").fetchone()[0]
+            self.copy_database(source, "main", path)
+            self.copy_database(source, "archive", archive_path)
+            if source.execute("PRAGMA archive.data_version").fetchone()[0] == version:
+                return
+            logger.debug("Архив изменился во время копирования, копия снимается заново")
+        logger.warning("Не удалось снять согласованную копию базы и архива: архив менялся при каждой попытке")
+
+    def list_snapshots(self):
+        """
+        Получение списка копий, начиная с самой новой.
+
+        Returns:
+            list: Пути к файлам копий
+        """
+        try:
+            if not os.path.isdir(self.backup_dir):
+                return []
+            names = [name for name in os.listdir(self.backup_dir)
+                     if self.snapshot_pattern.fullmatch(name)]
+            return [os.path.join(self.backup_dir, name) for name in sorted(names, reverse=True)]
+        except Exception as e:
+            logger.error(f"Ошибка при получении списка копий: {str(e)}")
+            logger.error(traceback.format_exc())
+            return []
+
+    def apply_retention(self):
+        """Удаление копий сверх заданного количества."""
+        try:
+            for path in self.list_snapshots()[self.keep:]:
+                os.remove(path)
+                if os.path.exists(archive_snapshot_path(path)):
+                    os.remove(archive_snapshot_path(path))
+                logger.debug(f"Удалена устаревшая копия: {path}")
+        except Exception as e:
+            logger.error(f"Ошибка при удалении устаревших копий: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def restore(self, snapshot_path, conn):
+        """
+        Восстановление базы данных из копии через открытое соединение.
+
+        Архив восстанавливается из парной копии; у копий, созданных без
+        архива, он остается без изменений.
+
+        Args:
+            snapshot_path: Путь к файлу копии
+            conn: Соединение с основной базой данных
+        """
+        try:
+            if self.is_running():
+                self.thread.join()
+            snapshot = sqlite3.connect(snapshot_path)
+            try:
+                snapshot.backup(conn)
+            finally:
+                snapshot.close()
+            archive_path = archive_snapshot_path(snapshot_path)
+            if self.archive_path is not None and os.path.exists(archive_path):
+                snapshot = sqlite3.connect(archive_path)
+                target = sqlite3.connect(self.archive_path)
+                try:
+                    snapshot.backup(target)
+                finally:
+                    target.close()
+                    snapshot.close()
+                logger.debug(f"Архив восстановлен из копии: {archive_path}")
+            logger.debug(f"База данных восстановлена из копии: {snapshot_path}")
+        except Exception as e:
+            logger.error(f"Ошибка при восстановлении из копии: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
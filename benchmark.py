@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+Набор бенчмарков менеджера задач.
+Запускается без графического интерфейса на временной базе данных:
+
+    python benchmark.py --tasks 100000
+"""
+
+import os
+import gc
+import sys
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import statistics
+import tracemalloc
+from time import perf_counter
+
+from database import DatabaseManager, TASK_LIST_QUERY, DESCRIPTION_PREVIEW_LENGTH
+from task import TaskColumnStore
+from backup_manager import BackupManager
+from duplicate_index import find_duplicate_groups
+from sync_manager import SyncManager
+from maintenance_scheduler import DatabaseMaintenance
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+def fill_database(db_manager, count):
+    """Заполнение базы данных тестовыми задачами."""
+    db_manager.cursor.executemany("""
+        INSERT INTO tasks (title, description, priority, completed)
+        VALUES (?, ?, ?, ?)
+    """, ((f"Задача {i}", f"Описание задачи {i}\nВторая строка описания",
+           i % 4 + 1, i % 3 == 0) for i in range(count)))
+    db_manager.conn.commit()
+
+def measure_memory(load):
+    """
+    Измерение памяти, занимаемой результатом функции загрузки.
+
+    Returns:
+        tuple: (результат, занятая память в байтах, время загрузки в секундах)
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = perf_counter()
+    result = load()
+    elapsed = perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+def bench_task_memory(db_manager, count):
+    """
+    Сравнение памяти на задачу для кортежей, записей Task и колоночного
+    хранилища, в котором задачи держит модель списка.
+    """
+    def load_tuples():
+        db_manager.cursor.execute(TASK_LIST_QUERY + " ORDER BY id", (DESCRIPTION_PREVIEW_LENGTH,))
+        return db_manager.cursor.fetchall()
+
+    def load_store():
+        # Как в модели списка: записи Task страницы переносятся в хранилище
+        store = TaskColumnStore()
+        for task in db_manager.get_all_tasks():
+            store.append_task(task)
+        return store
+
+    results = []
+    for name, load in (("Кортежи sqlite3", load_tuples),
+                       ("Записи Task", db_manager.get_all_tasks),
+                       ("Колоночное хранилище", load_store)):
+        tasks, size, elapsed = measure_memory(load)
+        results.append((name, size / count, elapsed))
+        del tasks
+
+    print(f"\nПамять на задачу ({count} задач):")
+    for name, per_task, elapsed in results:
+        print(f"  {name:<20} {per_task:8.1f} байт/задача  загрузка {elapsed * 1000:8.1f} мс")
+    return results
+
+def measure_latency(action, repeat=20):
+    """Медианное время выполнения действия в секундах."""
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        action()
+        timings.append(perf_counter() - start)
+    return statistics.median(timings)
+
+def bench_backup(db_manager, workdir):
+    """Длительность резервного копирования и задержка чтения задач во время копирования."""
+    backup_manager = BackupManager(db_manager.db_path, os.path.join(workdir, "backups"))
+    idle = measure_latency(db_manager.get_all_tasks, repeat=5)
+
+    backup_manager.start_backup()
+    during = measure_latency(db_manager.get_all_tasks, repeat=5)
+    backup_manager.thread.join()
+
+    print("\nРезервное копирование:")
+    for name, value in (("Длительность копии", backup_manager.last_duration),
+                        ("get_all_tasks без копии", idle),
+                        ("get_all_tasks во время копии", during)):
+        print(f"  {name:<30} {value * 1000:8.1f} мс")
+    return backup_manager.last_duration, idle, during
+
+def database_size(db_manager):
+    """Размер файла базы данных после VACUUM в байтах."""
+    db_manager.conn.execute("VACUUM")
+    db_manager.cursor.execute("PRAGMA page_count")
+    page_count = db_manager.cursor.fetchone()[0]
+    db_manager.cursor.execute("PRAGMA page_size")
+    return page_count * db_manager.cursor.fetchone()[0]
+
+def bench_description_compression(workdir, count):
+    """
+    Размер базы и скорость загрузки списка до и после сжатия длинных описаний.
+
+    Каждой десятой задаче дается описание в виде вставленного журнала
+    (около 10 КБ), остальным - короткое.
+    """
+    db_manager = DatabaseManager(os.path.join(workdir, "descriptions.db"))
+    try:
+        log = "\n".join(f"2024-05-01 12:{i // 60 % 60:02d}:{i % 60:02d} INFO worker-{i % 8} "
+                        f"request {i} handled in {i % 97} ms" for i in range(200))
+        db_manager.cursor.executemany("""
+            INSERT INTO tasks (title, description, priority, completed)
+            VALUES (?, ?, ?, ?)
+        """, ((f"Задача {i}", f"{log}\n#{i}" if i % 10 == 0 else f"Описание задачи {i}",
+               i % 4 + 1, 0) for i in range(count)))
+        db_manager.conn.commit()
+        long_ids = list(range(1, count + 1, 10))
+
+        def measure():
+            size = database_size(db_manager)
+            # Кэш описаний не должен влиять на замер распаковки
+            read = lambda: [db_manager.description_cache.clear() or db_manager.get_task_description(task_id)
+                            for task_id in long_ids[:100]]
+            return (size, measure_latency(db_manager.get_all_tasks, repeat=5),
+                    measure_latency(read, repeat=5) / max(1, min(100, len(long_ids))))
+
+        plain = measure()
+        start = perf_counter()
+        compressed_count = db_manager.compress_descriptions()
+        migration = perf_counter() - start
+        compressed = measure()
+        _, raw_size, stored_size = db_manager.get_description_stats()
+
+        print(f"\nСжатие описаний ({count} задач, длинных описаний: {compressed_count}):")
+        print(f"  Перенос старых описаний       {migration * 1000:8.1f} мс")
+        print(f"  Сжатые описания               {raw_size / 2 ** 20:8.1f} МБ -> {stored_size / 2 ** 20:.1f} МБ")
+        for name, before, after, unit, scale in (("Размер базы", plain[0], compressed[0], "МБ", 2 ** -20),
+                                                 ("get_all_tasks", plain[1], compressed[1], "мс", 1000),
+                                                 ("Полное описание", plain[2], compressed[2], "мс", 1000)):
+            print(f"  {name:<30}{before * scale:8.2f} {unit} -> {after * scale:.2f} {unit}")
+        return plain, compressed
+    finally:
+        db_manager.close()
+
+def bench_analytics(db_manager, count):
+    """Открытие истории выполнения по итогам по дням и полный пересчет итогов."""
+    def read():
+        db_manager.get_completion_trend()
+        db_manager.get_priority_throughput()
+        db_manager.get_open_task_aging()
+
+    opening = measure_latency(read)
+    start = perf_counter()
+    db_manager.rebuild_daily_rollups()
+    db_manager.conn.commit()
+    rebuild = perf_counter() - start
+
+    print(f"\nИстория выполнения ({count} задач):")
+    for name, value in (("Чтение графиков из итогов", opening),
+                        ("Пересчет итогов по задачам", rebuild)):
+        print(f"  {name:<30} {value * 1000:8.1f} мс")
+    return opening, rebuild
+
+def bench_type_ahead(db_manager, count):
+    """
+    Переход к задаче по первым буквам заголовка и загрузка страницы списка
+    вокруг найденной задачи.
+    """
+    generator = random.Random(3)
+    timings = []
+    for task_id in generator.sample(range(count), min(200, count)):
+        start = perf_counter()
+        found = db_manager.find_task_by_title(f"задача {task_id}", generator.randint(1, count))
+        db_manager.get_tasks_page(found - 1)
+        timings.append(perf_counter() - start)
+    timings.sort()
+    scan = measure_latency(lambda: db_manager.find_task_by_title("задача", count), repeat=5)
+
+    print(f"\nПереход по заголовку ({count} задач):")
+    print(f"  Поиск и страница p50 / p95    {timings[len(timings) // 2] * 1000:8.2f} мс / "
+          f"{timings[int(len(timings) * 0.95)] * 1000:.2f} мс")
+    print(f"  Общее начало у всех задач     {scan * 1000:8.2f} мс")
+    return timings, scan
+
+def bench_duplicates(workdir, count):
+    """
+    Поиск похожих задач: добавление задач с обновлением индекса триггерами,
+    полное построение индекса, проверка новой задачи и отчет по всей базе.
+
+    Тексты составляются из случайных слов; каждая пятидесятая задача -
+    копия одной из предыдущих с одним измененным словом заголовка.
+    """
+    generator = random.Random(1)
+    letters = "абвгдежзиклмнопрстуфхцчшэюя"
+    words = ["".join(generator.choices(letters, k=generator.randint(3, 9))) for _ in range(5000)]
+    texts = []
+    for i in range(count):
+        if i and i % 50 == 0:
+            title, description = generator.choice(texts)
+            title = title.split()
+            title[generator.randrange(len(title))] = generator.choice(words)
+            title = " ".join(title)
+        else:
+            title = " ".join(generator.sample(words, generator.randint(4, 8)))
+            description = " ".join(generator.sample(words, 6))
+        texts.append((title, description))
+
+    db_manager = DatabaseManager(os.path.join(workdir, "duplicates.db"))
+    try:
+        start = perf_counter()
+        db_manager.cursor.executemany("INSERT INTO tasks (title, description) VALUES (?, ?)", texts)
+        db_manager.conn.commit()
+        insert = perf_counter() - start
+
+        start = perf_counter()
+        db_manager.build_duplicate_index()
+        db_manager.conn.commit()
+        build = perf_counter() - start
+
+        timings = []
+        for title, description in generator.sample(texts, min(200, count)):
+            start = perf_counter()
+            db_manager.find_duplicates(title + " новое", description)
+            timings.append(perf_counter() - start)
+        timings.sort()
+
+        start = perf_counter()
+        groups = find_duplicate_groups(db_manager.db_path)
+        report = perf_counter() - start
+
+        print(f"\nПохожие задачи ({count} задач):")
+        print(f"  Добавление с индексом         {count / insert:8.0f} задач/с")
+        print(f"  Построение индекса            {build * 1000:8.1f} мс")
+        print(f"  Проверка задачи p50 / p95     {timings[len(timings) // 2] * 1000:8.2f} мс / "
+              f"{timings[int(len(timings) * 0.95)] * 1000:.2f} мс")
+        print(f"  Отчет по базе                 {report * 1000:8.1f} мс (групп: {len(groups)})")
+        return insert, build, timings, report
+    finally:
+        db_manager.close()
+
+def bench_sync(db_manager, workdir, count, changes=5):
+    """
+    Синхронизация двух копий базы, в каждой из которых изменено и удалено
+    несколько задач, и повторная синхронизация одинаковых баз.
+    """
+    db_manager.conn.commit()
+    other_path = os.path.join(workdir, "sync_other.db")
+    shutil.copy(db_manager.db_path, other_path)
+    start = perf_counter()
+    other = DatabaseManager(other_path)
+    opening = perf_counter() - start
+    try:
+        generator = random.Random(2)
+        task_ids = generator.sample(range(1, count + 1), changes * 4)
+        for task_id in task_ids[:changes]:
+            db_manager.update_task_field(task_id, 'title', f"Изменено в первой базе {task_id}")
+        for task_id in task_ids[changes:changes * 2]:
+            other.update_task_field(task_id, 'priority', 4)
+        db_manager.delete_tasks(task_ids[changes * 2:changes * 3])
+        other.toggle_task_status(task_ids[changes * 3:], True)
+        other.add_task("Новая задача второй базы", "")
+
+        sync_manager = SyncManager(db_manager)
+        start = perf_counter()
+        stats = sync_manager.sync(other, 'field')
+        sync = perf_counter() - start
+        start = perf_counter()
+        sync_manager.sync(other, 'field')
+        check = perf_counter() - start
+
+        print(f"\nСинхронизация ({count} задач, различий: {stats['differing']}):")
+        print(f"  Открытие второй базы          {opening * 1000:8.1f} мс")
+        print(f"  Синхронизация                 {sync * 1000:8.1f} мс (узлов: {stats['compared']})")
+        print(f"  Проверка одинаковых баз       {check * 1000:8.1f} мс")
+        return sync, check
+    finally:
+        other.close()
+
+def bench_maintenance(db_manager, workdir, count):
+    """
+    Обслуживание базы после удаления трети задач: полный проход и задержка
+    прерывания прохода, начатого на копии базы.
+    """
+    db_manager.cursor.execute("DELETE FROM tasks WHERE id > ?", (count * 2 // 3,))
+    db_manager.conn.commit()
+    copy_path = os.path.join(workdir, "maintenance.db")
+    shutil.copy(db_manager.db_path, copy_path)
+
+    maintenance = DatabaseMaintenance(db_manager.db_path)
+    start = perf_counter()
+    maintenance.run()
+    full = perf_counter() - start
+
+    latencies = []
+    for delay in (0.01, 0.05, 0.2, 0.5, 1.0):
+        shutil.copy(copy_path, db_manager.db_path + ".maintenance")
+        maintenance_copy = DatabaseMaintenance(db_manager.db_path + ".maintenance")
+        thread = threading.Thread(target=maintenance_copy.run)
+        thread.start()
+        thread.join(delay)
+        start = perf_counter()
+        maintenance_copy.interrupt()
+        thread.join()
+        latencies.append(perf_counter() - start)
+
+    print(f"\nОбслуживание базы ({count} задач, удалена треть):")
+    print(f"  Полный проход                 {full * 1000:8.1f} мс (освобождено {maintenance.freed_bytes // 1024} КБ)")
+    print(f"  Прерывание прохода, макс.     {max(latencies) * 1000:8.1f} мс")
+    return full, latencies
+
+def main():
+    """Запуск бенчмарков."""
+    parser = argparse.ArgumentParser(description="Бенчмарки менеджера задач")
+    parser.add_argument("--tasks", type=int, default=100000, help="Количество задач в тестовой базе")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="taskmanager-bench-")
+    db_manager = DatabaseManager(os.path.join(workdir, "tasks.db"))
+    try:
+        fill_database(db_manager, args.tasks)
+        bench_task_memory(db_manager, args.tasks)
+        bench_backup(db_manager, workdir)
+        bench_analytics(db_manager, args.tasks)
+        bench_type_ahead(db_manager, args.tasks)
+        bench_sync(db_manager, workdir, args.tasks)
+        bench_maintenance(db_manager, workdir, args.tasks)
+        bench_description_compression(workdir, min(args.tasks, 50000))
+        bench_duplicates(workdir, args.tasks)
+    finally:
+        db_manager.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
@@ -4,70 +4,2159 @@
 Управляет операциями с базой данных SQLite.
 """
 
+import os
+import json
+import zlib
 import sqlite3
 import logging
+import threading
 import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from task import TaskSelection, TASK_PREDICATES, DATETIME_FORMAT, task_row_factory
+from recurrence import RecurrenceRule
+from duplicate_index import (lsh_buckets, index_rows, shingles, similarity, normalize_text,
+                             DUPLICATE_DESCRIPTION_LENGTH, DUPLICATE_THRESHOLD, DUPLICATE_CANDIDATE_LIMIT)
+from sync_manager import (sync_row_hash, legacy_task_uid, SYNC_PREFIX_LENGTHS, SYNC_FIELDS, SYNC_TASK_COLUMNS,
+                          SYNC_CLOCK, SYNC_REFRESH_MAX_LEAVES)
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+# Ключи счетчиков в таблице task_stats
+TASK_STAT_KEYS = ('total', 'open', 'done', 'p1', 'p2', 'p3', 'p4')
+
+# Максимальная длина превью описания в списке задач
+DESCRIPTION_PREVIEW_LENGTH = 200
+
+# Размер страницы результатов фильтра по тегам
+TAG_FILTER_PAGE_SIZE = 500
+
+# Размер страницы дочерних задач при раскрытии узла дерева
+TREE_PAGE_SIZE = 500
+
+# Размер страницы задач, подгружаемой в список при прокрутке
+LIST_PAGE_SIZE = 500
+
+# Количество задач после текущей, просматриваемых по порядку ID перед поиском
+# по индексу заголовков при переходе по первым буквам (частые начала
+# находятся сразу, редкие - по индексу)
+TYPE_AHEAD_PROBE_ROWS = 2000
+
+# Количество полных описаний, хранящихся в кэше
+DESCRIPTION_CACHE_SIZE = 32
+
+# Описания от этого размера (байт UTF-8) хранятся сжатыми в task_descriptions_z
+DESCRIPTION_COMPRESS_THRESHOLD = 2048
+
+# Сжатое описание хранится, только если оно меньше исходного хотя бы на эту долю
+DESCRIPTION_MIN_SAVING = 0.1
+
+# Длина начала сжатого описания, остающегося в tasks.description: превью
+# строится без распаковки и остается признак обрезанного описания
+DESCRIPTION_STORED_PREFIX = DESCRIPTION_PREVIEW_LENGTH + 1
+
+# Количество описаний, сжимаемых за одну транзакцию при переносе старых данных
+DESCRIPTION_MIGRATION_BATCH = 200
+
+# Количество задач, индексируемых за один шаг при построении индекса похожих задач
+DUPLICATE_INDEX_BATCH = 5000
+
+# Начиная с этого количества задач индекс строится в пуле процессов
+DUPLICATE_INDEX_POOL_THRESHOLD = 20000
+
+# Период графика выполнения задач в днях
+ROLLUP_TREND_DAYS = 90
+
+# Окно скользящего среднего выполненных задач в днях
+ROLLUP_MOVING_AVERAGE_DAYS = 7
+
+# Период графика выполнения по приоритетам в неделях
+ROLLUP_THROUGHPUT_WEEKS = 12
+
+# Границы групп открытых задач по возрасту в днях (последняя группа - старше)
+OPEN_AGE_BANDS = (7, 30, 90)
+
+# Количество последних действий, которые можно отменить
+JOURNAL_MAX_TXNS = 100
+
+# Максимальное количество записей журнала изменений
+JOURNAL_MAX_CHANGES = 200000
+
+# Количество записей журнала, удаляемых за один шаг фонового сжатия
+JOURNAL_COMPACT_BATCH = 1000
+
+# Начиная с этого количества подряд идущих изменений задач отмена и повтор
+# применяют их одним запросом (begin_bulk_update), а не по одному
+BULK_UPDATE_MIN_ROWS = 100
+
+# Триггеры, текст которых изменился в данной версии схемы базы (PRAGMA
+# user_version): при открытии базы прежней версии они удаляются и создаются заново
+SCHEMA_TRIGGER_CHANGES = {
+    1: ('trg_sync_tasks_insert', 'trg_sync_tasks_delete', 'trg_sync_tombstones_insert'),
+    2: ('trg_tasks_insert_title_norm', 'trg_tasks_update_title_norm'),
+    3: ('trg_tasks_insert_lsh', 'trg_tasks_update_lsh', 'trg_tasks_delete_lsh'),
+    4: ('trg_sync_tasks_insert', 'trg_sync_tasks_update', 'trg_sync_tasks_apply', 'trg_sync_tasks_delete',
+        'trg_sync_tombstones_insert', 'trg_sync_tombstones_update', 'trg_sync_tombstones_delete',
+        'trg_sync_archived_insert', 'trg_sync_archived_update', 'trg_sync_archived_delete',
+        'trg_sync_task_tags_insert', 'trg_sync_task_tags_delete', 'trg_sync_description_insert',
+        'trg_sync_description_update', 'trg_sync_description_delete'),
+    5: ('trg_task_stats_update', 'trg_journal_tasks_update', 'trg_daily_rollups_update', 'trg_sync_tasks_update'),
+}
+
+# Текущая версия схемы базы
+SCHEMA_VERSION = max(SCHEMA_TRIGGER_CHANGES)
+
+# Колонки задачи, изменения которых записываются в журнал
+JOURNAL_TASK_COLUMNS = ('title', 'description', 'priority', 'completed', 'due_at', 'parent_id')
+
+# Колонки строки задачи, сохраняемые в журнале при добавлении и удалении
+JOURNAL_TASK_ROW_COLUMNS = ('id', 'uid', 'created_at', 'updated_at', 'completed_at') + JOURNAL_TASK_COLUMNS
+
+# Колонки правила повторения, сохраняемые в журнале
+JOURNAL_RECURRENCE_COLUMNS = ('task_id', 'unit', 'interval', 'anchor_at')
+
+# Колонки сжатого описания, сохраняемые в журнале (данные - в шестнадцатеричном виде)
+JOURNAL_DESCRIPTION_COLUMNS = ('task_id', 'raw_size', 'data')
+
+# Колонки вложения, сохраняемые в журнале (сами данные файла остаются в attachment_blobs)
+JOURNAL_ATTACHMENT_COLUMNS = ('id', 'task_id', 'blob_id', 'name', 'mime', 'size', 'created_at')
+
+# Удаление данных файлов, на которые не ссылаются ни вложения, ни журнал изменений
+# (данные удаленного вложения нужны, пока его удаление можно отменить)
+ATTACHMENT_PRUNE_QUERY = """
+    DELETE FROM attachment_blobs
+    WHERE id NOT IN (SELECT blob_id FROM attachments)
+      AND id NOT IN (
+          SELECT json_extract(IFNULL(old_values, new_values), '$.blob_id')
+          FROM task_changes
+          WHERE table_name = 'attachments'
+      )
+"""
+
+# Поля задачи, которые можно изменить по одному при редактировании в таблице
+EDITABLE_TASK_FIELDS = ('title', 'description', 'priority', 'completed')
+
+# Рекурсивный запрос поддерева задачи (сама задача и все ее потомки),
+# параметр - ID корня поддерева
+SUBTREE_CTE = """
+    WITH RECURSIVE subtree(id) AS (
+        SELECT ?
+        UNION ALL
+        SELECT tasks.id FROM tasks JOIN subtree ON tasks.parent_id = subtree.id
+    )
+"""
+
+# Запрос списка задач: вместо полного описания выбирается превью
+# (первая строка, не длиннее DESCRIPTION_PREVIEW_LENGTH символов),
+# признак того, что описание обрезано, и признак повторяющейся задачи
+TASK_LIST_QUERY = """
+    SELECT id, title, preview AS description, priority, completed, created_at, updated_at,
+           due_at, length(description) > length(preview) AS description_truncated,
+           EXISTS (SELECT 1 FROM task_recurrence AS r WHERE r.task_id = id) AS recurring
+    FROM (
+        SELECT *,
+               rtrim(CASE WHEN instr(head, char(10)) > 0
+                          THEN substr(head, 1, instr(head, char(10)) - 1)
+                          ELSE head
+                     END, char(13)) AS preview
+        FROM (SELECT *, substr(IFNULL(description, ''), 1, ?) AS head FROM tasks)
+    )
+"""
+
+def split_description(description):
+    """
+    Разделение описания на значение колонки tasks.description и сжатые данные.
+    
+    Args:
+        description: Полное описание задачи
+    
+    Returns:
+        tuple: (значение колонки, сжатые данные или None, размер в байтах)
+    """
+    raw = (description or "").encode("utf-8")
+    if len(raw) >= DESCRIPTION_COMPRESS_THRESHOLD:
+        data = zlib.compress(raw)
+        if len(data) <= len(raw) * (1 - DESCRIPTION_MIN_SAVING):
+            return description[:DESCRIPTION_STORED_PREFIX], data, len(raw)
+    return description, None, len(raw)
+
+def tag_filter_query(names, match_all, task_condition="1", condition_params=(), order=None, limit=None):
+    """
+    Подзапрос ID задач с тегами из names.
+    
+    В режиме И задачи берутся из диапазона индекса idx_task_tags_tag для
+    самого редкого тега фильтра (по tags.task_count), а остальные теги
+    проверяются коррелированными EXISTS по первичному ключу task_tags.
+    Если какого-то тега нет, диапазон не выбирается и подзапрос пуст.
+    Со страницей (order и limit) и условием task_id > ? (или < ?)
+    просматривается только часть диапазона после последней показанной задачи.
+    
+    Args:
+        names: Список названий тегов
+        match_all: True - задача должна иметь все теги (И), False - любой из них (ИЛИ)
+        task_condition: Дополнительное условие на task_id
+        condition_params: Параметры дополнительного условия
+        order: Порядок ID страницы ("ASC" или "DESC"), None - без страницы
+        limit: Размер страницы
+    
+    Returns:
+        tuple: (текст подзапроса, параметры)
+    """
+    names = list(dict.fromkeys(names))
+    if match_all:
+        query = f"""
+            SELECT task_id FROM task_tags
+            WHERE tag_id = (SELECT id FROM tags WHERE name IN (SELECT value FROM json_each(?))
+                              AND (SELECT COUNT(*) FROM tags WHERE name IN (SELECT value FROM json_each(?))) = ?
+                            ORDER BY task_count LIMIT 1)
+              AND {task_condition}
+        """ + "".join("""
+              AND EXISTS (SELECT 1 FROM task_tags AS other
+                          WHERE other.task_id = task_tags.task_id
+                            AND other.tag_id = (SELECT id FROM tags WHERE name = ?))
+        """ for _ in names)
+        params = (json.dumps(names), json.dumps(names), len(names)) + tuple(condition_params) + tuple(names)
+    else:
+        query = f"""
+            SELECT DISTINCT task_id FROM task_tags
+            WHERE tag_id IN (SELECT id FROM tags WHERE name IN (SELECT value FROM json_each(?)))
+              AND {task_condition}
+        """
+        params = (json.dumps(names),) + tuple(condition_params)
+    if order is not None:
+        query += f" ORDER BY task_id {order} LIMIT ?"
+        params += (limit,)
+    return query, params
+
+def columns_differ(columns, old="OLD", new="NEW"):
+    """Условие SQL: значение хотя бы одной из колонок в строках old и new различается."""
+    return " OR ".join(f"{old}.{c} IS NOT {new}.{c}" for c in columns)
+
+def journal_row_json(prefix, columns):
+    """Выражение SQL: JSON с колонками columns строки prefix."""
+    return "json_object(" + ", ".join(f"'{c}', {prefix}.{c}" for c in columns) + ")"
+
+def journal_changed_json(prefix, old="OLD", new="NEW"):
+    """Выражение SQL: JSON с колонками задачи строки prefix, измененными между строками old и new."""
+    # Из полного набора полей удаляются неизмененные
+    removed = ", ".join(f"CASE WHEN {old}.{c} IS {new}.{c} THEN '$.{c}' ELSE '$._' END"
+                        for c in JOURNAL_TASK_COLUMNS)
+    return f"json_remove({journal_row_json(prefix, JOURNAL_TASK_COLUMNS)}, {removed})"
+
+def sync_next_version(prefix):
+    """Выражение SQL: следующая версия строки prefix для синхронизации."""
+    return f"MAX({SYNC_CLOCK}, IFNULL({prefix}.version, 0) + 1)"
+
+def sync_stored_field_version(prefix, field):
+    """Выражение SQL: версия поля задачи строки prefix."""
+    # Поле без отдельной версии не менялось с записи версии задачи
+    return f"IFNULL(json_extract({prefix}.field_versions, '$.{field}'), {prefix}.version)"
+
+def sync_field_versions(old="OLD", new="NEW"):
+    """Выражение SQL: версии полей задачи после изменения строки old на значения строки new."""
+    return ("json_object(" + ", ".join(
+        f"'{f}', " + (f"CASE WHEN {old}.{f} IS NOT {new}.{f} THEN {sync_next_version(old)} "
+                      f"ELSE {sync_stored_field_version(old, f)} END" if f in SYNC_TASK_COLUMNS
+                      else sync_stored_field_version(old, f))
+        for f in SYNC_FIELDS) + ")")
+
+def decompress_description(data):
+    """Распаковка сжатого описания (None для None, чтобы работать в SQL с LEFT JOIN)."""
+    if data is None:
+        return None
+    return zlib.decompress(data).decode("utf-8")
+
+def database_needs_upgrade(db_path):
+    """
+    Проверка схемы файла базы задач без его изменения (соединение только для чтения).
+    
+    Args:
+        db_path: Путь к файлу базы данных
+    
+    Returns:
+        bool: True, если DatabaseManager при открытии обновит схему базы
+    
+    Raises:
+        ValueError: Файл не является базой задач или создан более новой версией программы
+    """
+    if not os.path.isfile(db_path):
+        raise ValueError(f"Файл {db_path} не найден")
+    try:
+        conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM pragma_table_info('tasks')")
+            columns = {name for (name,) in cursor.fetchall()}
+            cursor.execute("PRAGMA user_version")
+            version = cursor.fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"Файл {db_path} не является базой данных SQLite: {str(e)}")
+    if not columns:
+        raise ValueError(f"В файле {db_path} нет таблицы задач")
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"База {db_path} создана более новой версией программы (схема {version}, "
+                         f"поддерживается {SCHEMA_VERSION})")
+    return version < SCHEMA_VERSION or 'uid' not in columns
+
 class DatabaseManager:
     """Класс для управления базой данных."""
     
-    def __init__(self):
-        """Инициализация менеджера базы данных."""
+    def __init__(self, db_path="tasks.db"):
+        """
+        Инициализация менеджера базы данных.
+        
+        Args:
+            db_path: Путь к файлу базы данных
+        """
+        try:
+            logger.debug(f"Подключение к базе данных {db_path}")
+            self.db_path = db_path
+            self.description_cache = OrderedDict()
+            self.conn = sqlite3.connect(db_path)
+            self.cursor = self.conn.cursor()
+            self.init_db()
+            logger.debug("База данных инициализирована")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации базы данных: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def init_db(self):
+        """Инициализация структуры базы данных."""
+        try:
+            # Новые базы создаются с возвратом свободных страниц по шагам
+            # (PRAGMA incremental_vacuum при обслуживании в простое); для
+            # существующей базы прагма ничего не меняет, ее один раз
+            # перестраивает обслуживание (MaintenanceScheduler, шаг convert)
+            self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            
+            # Создаем таблицу tasks если она не существует
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    priority INTEGER DEFAULT 1,
+                    completed BOOLEAN DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    due_at TIMESTAMP
+                )
+            ''')
+            
+            # Проверяем наличие колонок
+            self.cursor.execute("PRAGMA table_info(tasks)")
+            columns = [column[1] for column in self.cursor.fetchall()]
+            if 'priority' not in columns:
+                self.cursor.execute("ALTER TABLE tasks ADD COLUMN priority INTEGER DEFAULT 1")
+            if 'completed' not in columns:
+                self.cursor.execute("ALTER TABLE tasks ADD COLUMN completed BOOLEAN DEFAULT 0")
+            if 'due_at' not in columns:
+                self.cursor.execute("ALTER TABLE tasks ADD COLUMN due_at TIMESTAMP")
+            if 'parent_id' not in columns:
+                self.cursor.execute("ALTER TABLE tasks ADD COLUMN parent_id INTEGER")
+            if 'completed_at' not in columns:
+                # Время выполнения задается триггером итогов по дням; для уже
+                # выполненных задач лучшая оценка - время последнего изменения
+                self.cursor.execute("ALTER TABLE tasks ADD COLUMN completed_at TIMESTAMP")
+                self.cursor.execute("UPDATE tasks SET completed_at = updated_at WHERE completed != 0")
+                # Триггеры журнала пересоздаются с новой колонкой строки задачи
+                self.cursor.execute("DROP TRIGGER IF EXISTS trg_journal_tasks_insert")
+                self.cursor.execute("DROP TRIGGER IF EXISTS trg_journal_tasks_delete")
+            if 'uid' not in columns:
+                # Постоянный идентификатор и версия задачи для синхронизации.
+                # Идентификатор существующей задачи вычисляется из ID и времени
+                # создания, версия - из времени последнего изменения, поэтому
+                # копии одного файла получают одинаковые значения
+                self.conn.create_function("legacy_task_uid", 2, legacy_task_uid, deterministic=True)
+                self.cursor.execute("ALTER TABLE tasks ADD COLUMN uid TEXT")
+                self.cursor.execute("ALTER TABLE tasks ADD COLUMN version INTEGER")
+                self.cursor.execute("ALTER TABLE tasks ADD COLUMN field_versions TEXT")
+                self.cursor.execute("""
+                    UPDATE tasks
+                    SET uid = legacy_task_uid(id, created_at),
+                        version = IFNULL(CAST((julianday(IFNULL(updated_at, created_at)) - 2440587.5) * 86400000
+                                              AS INTEGER), 0)
+                """)
+                # Триггеры журнала и итогов по дням пересоздаются: строка задачи
+                # журнала хранит uid, а синхронизация задает время выполнения сама
+                self.cursor.execute("DROP TRIGGER IF EXISTS trg_journal_tasks_insert")
+                self.cursor.execute("DROP TRIGGER IF EXISTS trg_journal_tasks_delete")
+                self.cursor.execute("DROP TRIGGER IF EXISTS trg_daily_rollups_update")
+            if 'title_norm' not in columns:
+                # Заголовок в нижнем регистре без знаков препинания для перехода
+                # к задаче по первым буквам
+                self.cursor.execute("ALTER TABLE tasks ADD COLUMN title_norm TEXT")
+                self.refresh_title_norms()
+            
+            # Триггеры создаются с IF NOT EXISTS, поэтому измененные после
+            # версии схемы базы триггеры удаляются и создаются заново ниже
+            self.cursor.execute("PRAGMA user_version")
+            schema_version = self.cursor.fetchone()[0]
+            for version, triggers in SCHEMA_TRIGGER_CHANGES.items():
+                if version > schema_version:
+                    for name in triggers:
+                        self.cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            
+            # Индекс для выборки давно выполненных задач при архивации (по
+            # времени выполнения; прежний индекс по времени изменения не нужен)
+            self.cursor.execute("DROP INDEX IF EXISTS idx_tasks_completed_updated")
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tasks_completed_at
+                ON tasks (completed, completed_at)
+            """)
+            
+            # Индекс сроков для планировщика напоминаний и подсчета просроченных задач
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tasks_completed_due
+                ON tasks (completed, due_at)
+            """)
+            
+            # Индекс нормализованных заголовков для перехода к задаче по первым буквам.
+            # Нормализация выполняется в Python, а триггеры не вызывают функций
+            # Python, чтобы базу можно было менять и без DatabaseManager (например,
+            # программой sqlite3). Поэтому у новой задачи title_norm пуст, триггер
+            # сбрасывает его при изменении заголовка, и пустые значения заполняет
+            # refresh_title_norms перед поиском
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tasks_title_norm
+                ON tasks (title_norm)
+            """)
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_tasks_update_title_norm
+                AFTER UPDATE OF title ON tasks
+                WHEN OLD.title IS NOT NEW.title
+                BEGIN
+                    UPDATE tasks SET title_norm = NULL WHERE id = NEW.id;
+                END
+            ''')
+            
+            # Индекс дочерних задач для дерева и рекурсивных запросов поддерева
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tasks_parent
+                ON tasks (parent_id, id)
+            """)
+            # При удалении задачи ее подзадачи становятся задачами верхнего уровня
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_children
+                AFTER DELETE ON tasks
+                BEGIN
+                    UPDATE tasks SET parent_id = NULL WHERE parent_id = OLD.id;
+                END
+            ''')
+            
+            # Счетчики для строки состояния
+            self.init_task_stats()
+            
+            # Теги задач
+            self.init_tags()
+            
+            # Правила повторения задач
+            self.init_recurrence()
+            
+            # Сжатые длинные описания
+            self.init_description_store()
+            
+            # Вложения задач
+            self.init_attachments()
+            
+            # Индекс похожих задач
+            self.init_duplicate_index()
+            
+            # Журнал изменений для отмены и повтора действий
+            self.init_journal()
+            
+            # Итоги по дням для истории выполнения задач
+            self.init_daily_rollups()
+            
+            # Дерево хешей и версии задач для синхронизации с другими базами
+            self.init_sync()
+            
+            self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.conn.commit()
+            
+            # Сжатие длинных описаний, сохраненных до появления сжатия
+            self.compress_descriptions()
+            
+            # Данные файлов удаленных вложений, удаление которых уже нельзя отменить
+            self.cursor.execute(ATTACHMENT_PRUNE_QUERY)
+            self.conn.commit()
+            logger.debug("Структура базы данных проверена")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации структуры БД: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def init_task_stats(self):
+        """Создание таблицы счетчиков задач и поддерживающих ее триггеров."""
+        try:
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS task_stats (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            # Каждый триггер меняет только строки затронутых счетчиков
+            bulk = "(SELECT value FROM journal_state WHERE key = 'bulk')"
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_task_stats_insert
+                AFTER INSERT ON tasks
+                BEGIN
+                    UPDATE task_stats
+                    SET value = value + (key = 'total')
+                                      + (key = 'open' AND IFNULL(NEW.completed, 0) = 0)
+                                      + (key = 'done' AND IFNULL(NEW.completed, 0) != 0)
+                                      + (key = 'p' || NEW.priority)
+                    WHERE key IN ('total', 'open', 'done', 'p' || NEW.priority);
+                END
+            ''')
+            # Изменения многих задач одним запросом учитываются в end_bulk_update
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_task_stats_update
+                AFTER UPDATE OF priority, completed ON tasks
+                WHEN {bulk} = 0
+                BEGIN
+                    UPDATE task_stats
+                    SET value = value + (key = 'open' AND IFNULL(NEW.completed, 0) = 0)
+                                      + (key = 'done' AND IFNULL(NEW.completed, 0) != 0)
+                                      + (key = 'p' || NEW.priority)
+                                      - (key = 'open' AND IFNULL(OLD.completed, 0) = 0)
+                                      - (key = 'done' AND IFNULL(OLD.completed, 0) != 0)
+                                      - (key = 'p' || OLD.priority)
+                    WHERE key IN ('open', 'done', 'p' || NEW.priority, 'p' || OLD.priority);
+                END
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_task_stats_delete
+                AFTER DELETE ON tasks
+                BEGIN
+                    UPDATE task_stats
+                    SET value = value - (key = 'total')
+                                      - (key = 'open' AND IFNULL(OLD.completed, 0) = 0)
+                                      - (key = 'done' AND IFNULL(OLD.completed, 0) != 0)
+                                      - (key = 'p' || OLD.priority)
+                    WHERE key IN ('total', 'open', 'done', 'p' || OLD.priority);
+                END
+            ''')
+            
+            # Для новой таблицы счетчиков заполняем значения по текущим задачам
+            self.cursor.execute("SELECT COUNT(*) FROM task_stats")
+            if self.cursor.fetchone()[0] != len(TASK_STAT_KEYS):
+                self.write_task_stats(self.count_task_stats())
+            logger.debug("Счетчики задач проверены")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации счетчиков задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def init_tags(self):
+        """Создание таблиц тегов и триггеров, поддерживающих счетчики задач по тегам."""
+        try:
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS tags (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL UNIQUE,
+                    task_count INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS task_tags (
+                    task_id INTEGER NOT NULL,
+                    tag_id INTEGER NOT NULL,
+                    PRIMARY KEY (task_id, tag_id)
+                ) WITHOUT ROWID
+            ''')
+            # Обратный индекс для выборки задач по тегу
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_task_tags_tag
+                ON task_tags (tag_id, task_id)
+            """)
+            
+            # Счетчики задач по тегам для боковой панели фильтра
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_task_tags_insert
+                AFTER INSERT ON task_tags
+                BEGIN
+                    UPDATE tags SET task_count = task_count + 1 WHERE id = NEW.tag_id;
+                END
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_task_tags_delete
+                AFTER DELETE ON task_tags
+                BEGIN
+                    UPDATE tags SET task_count = task_count - 1 WHERE id = OLD.tag_id;
+                END
+            ''')
+            # При удалении задачи удаляются и ее связи с тегами
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_tags
+                AFTER DELETE ON tasks
+                BEGIN
+                    DELETE FROM task_tags WHERE task_id = OLD.id;
+                END
+            ''')
+            logger.debug("Таблицы тегов проверены")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации тегов: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def init_recurrence(self):
+        """Создание таблицы правил повторения задач."""
+        try:
+            # Правило хранится у текущего (невыполненного) повторения серии
+            # и переходит к следующему повторению при выполнении
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS task_recurrence (
+                    task_id INTEGER PRIMARY KEY,
+                    unit TEXT NOT NULL,
+                    interval INTEGER NOT NULL DEFAULT 1,
+                    anchor_at TIMESTAMP NOT NULL
+                )
+            ''')
+            # При удалении задачи серия заканчивается
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_recurrence
+                AFTER DELETE ON tasks
+                BEGIN
+                    DELETE FROM task_recurrence WHERE task_id = OLD.id;
+                END
+            ''')
+            logger.debug("Таблица правил повторения проверена")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации правил повторения: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def init_description_store(self):
+        """
+        Создание таблицы сжатых описаний.
+        
+        Для сжатого описания в tasks.description остается только начало
+        (для превью в списке), полный текст распаковывается при запросе.
+        """
+        try:
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS task_descriptions_z (
+                    task_id INTEGER PRIMARY KEY,
+                    raw_size INTEGER NOT NULL,
+                    data BLOB NOT NULL
+                )
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_description
+                AFTER DELETE ON tasks
+                BEGIN
+                    DELETE FROM task_descriptions_z WHERE task_id = OLD.id;
+                END
+            ''')
+            # Функция нужна запросам, переносящим полный текст (архивация)
+            self.conn.create_function("decompress_description", 1, decompress_description, deterministic=True)
+            logger.debug("Таблица сжатых описаний проверена")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации сжатых описаний: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def init_attachments(self):
+        """
+        Создание таблиц вложений.
+        
+        Данные файлов хранятся один раз на содержимое (по SHA-256) в
+        attachment_blobs и читаются и пишутся частями; списки задач
+        к таблицам вложений не обращаются.
+        """
+        try:
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attachment_blobs (
+                    id INTEGER PRIMARY KEY,
+                    sha256 TEXT NOT NULL UNIQUE,
+                    size INTEGER NOT NULL,
+                    data BLOB NOT NULL
+                )
+            ''')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attachments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id INTEGER NOT NULL,
+                    blob_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    mime TEXT,
+                    size INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_attachments_task
+                ON attachments (task_id, id)
+            """)
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_attachments_blob
+                ON attachments (blob_id)
+            """)
+            # Кэш миниатюр изображений (PNG), создаваемых в фоновом потоке
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attachment_thumbnails (
+                    blob_id INTEGER PRIMARY KEY,
+                    png BLOB
+                )
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_attachments
+                AFTER DELETE ON tasks
+                BEGIN
+                    DELETE FROM attachments WHERE task_id = OLD.id;
+                END
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_attachment_blobs_delete
+                AFTER DELETE ON attachment_blobs
+                BEGIN
+                    DELETE FROM attachment_thumbnails WHERE blob_id = OLD.id;
+                END
+            ''')
+            logger.debug("Таблицы вложений проверены")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации вложений: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def write_description_data(self, task_id, data, raw_size):
+        """Сохранение или удаление сжатого описания задачи (без фиксации транзакции)."""
+        if data is None:
+            self.cursor.execute("DELETE FROM task_descriptions_z WHERE task_id = ?", (task_id,))
+        else:
+            # Замена существующего описания записывается как изменение строки,
+            # чтобы журнал и версии полей видели старое значение
+            self.cursor.execute("""
+                INSERT INTO task_descriptions_z (task_id, raw_size, data)
+                VALUES (?, ?, ?)
+                ON CONFLICT (task_id) DO UPDATE SET raw_size = excluded.raw_size, data = excluded.data
+            """, (task_id, raw_size, data))
+    
+    def write_description(self, task_id, description):
+        """Сохранение полного описания задачи со сжатием длинного текста (без фиксации транзакции)."""
+        stored, data, raw_size = split_description(description)
+        self.cursor.execute("UPDATE tasks SET description = ? WHERE id = ?", (stored, task_id))
+        self.write_description_data(task_id, data, raw_size)
+        self.description_cache.pop(task_id, None)
+    
+    def compress_descriptions(self, batch_size=DESCRIPTION_MIGRATION_BATCH):
+        """
+        Сжатие длинных описаний, сохраненных без сжатия, пачками по batch_size.
+        
+        Каждая пачка - отдельная транзакция. Изменения не записываются в журнал,
+        поэтому после сжатия журнал очищается: отмена старых изменений описания
+        вернула бы в tasks.description полный текст рядом со сжатым.
+        
+        Returns:
+            int: Количество сжатых описаний
+        """
+        try:
+            total = 0
+            last_id = 0
+            while True:
+                self.cursor.execute("""
+                    SELECT id, description FROM tasks
+                    WHERE id > ? AND length(description) > ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (last_id, DESCRIPTION_STORED_PREFIX, batch_size))
+                rows = self.cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                
+                # Текст задачи не меняется, поэтому версии для синхронизации не увеличиваются
+                self.cursor.execute("UPDATE journal_state SET value = 1 WHERE key = 'sync_apply'")
+                for task_id, description in rows:
+                    stored, data, raw_size = split_description(description)
+                    if data is None:
+                        continue
+                    self.cursor.execute("UPDATE tasks SET description = ? WHERE id = ?", (stored, task_id))
+                    self.write_description_data(task_id, data, raw_size)
+                    total += 1
+                self.cursor.execute("UPDATE journal_state SET value = 0 WHERE key = 'sync_apply'")
+                self.conn.commit()
+            
+            if total:
+                self.clear_journal()
+                self.conn.commit()
+                self.description_cache.clear()
+                logger.debug(f"Сжато описаний: {total}")
+            return total
+        except Exception as e:
+            logger.error(f"Ошибка при сжатии описаний: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def get_description_stats(self):
+        """
+        Статистика сжатых описаний.
+        
+        Returns:
+            tuple: (количество, исходный размер, сжатый размер) в байтах
+        """
+        self.cursor.execute("SELECT COUNT(*), IFNULL(SUM(raw_size), 0), IFNULL(SUM(length(data)), 0) FROM task_descriptions_z")
+        return self.cursor.fetchone()
+    
+    def init_duplicate_index(self):
+        """
+        Создание индекса похожих задач (корзины LSH по MinHash-подписи текста).
+        
+        Подписи считаются в Python, а триггеры не вызывают функций Python,
+        чтобы базу можно было менять и без DatabaseManager. Поэтому триггеры
+        только удаляют ключи старого текста и ставят новую или измененную
+        задачу в очередь task_lsh_pending, а ключи для очереди вычисляет
+        refresh_duplicate_index перед поиском. Если триггеров еще нет, индекс
+        строится по всем задачам в той же транзакции, в которой создаются триггеры.
+        """
+        try:
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS task_lsh_buckets (
+                    bucket INTEGER NOT NULL,
+                    task_id INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, task_id)
+                ) WITHOUT ROWID
+            ''')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS task_lsh_pending (
+                    task_id INTEGER PRIMARY KEY
+                )
+            ''')
+            # Индекс ключей задачи для их удаления при изменении и удалении задачи
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_task_lsh_buckets_task
+                ON task_lsh_buckets (task_id)
+            """)
+            self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_tasks_insert_lsh'")
+            if self.cursor.fetchone():
+                return
+            
+            self.build_duplicate_index()
+            self.cursor.execute('''
+                CREATE TRIGGER trg_tasks_insert_lsh
+                AFTER INSERT ON tasks
+                BEGIN
+                    INSERT OR IGNORE INTO task_lsh_pending (task_id) VALUES (NEW.id);
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER trg_tasks_update_lsh
+                AFTER UPDATE OF title, description ON tasks
+                WHEN OLD.title IS NOT NEW.title
+                  OR substr(IFNULL(OLD.description, ''), 1, {DUPLICATE_DESCRIPTION_LENGTH})
+                     IS NOT substr(IFNULL(NEW.description, ''), 1, {DUPLICATE_DESCRIPTION_LENGTH})
+                BEGIN
+                    DELETE FROM task_lsh_buckets WHERE task_id = OLD.id;
+                    INSERT OR IGNORE INTO task_lsh_pending (task_id) VALUES (NEW.id);
+                END
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER trg_tasks_delete_lsh
+                AFTER DELETE ON tasks
+                BEGIN
+                    DELETE FROM task_lsh_buckets WHERE task_id = OLD.id;
+                    DELETE FROM task_lsh_pending WHERE task_id = OLD.id;
+                END
+            ''')
+            logger.debug("Индекс похожих задач создан")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации индекса похожих задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def build_duplicate_index(self):
+        """
+        Построение индекса похожих задач по всем задачам (без фиксации транзакции).
+        
+        Для больших баз подписи вычисляются в пуле процессов пачками по
+        DUPLICATE_INDEX_BATCH задач.
+        
+        Returns:
+            int: Количество проиндексированных задач
+        """
+        self.cursor.execute("DELETE FROM task_lsh_buckets")
+        self.cursor.execute("DELETE FROM task_lsh_pending")
+        self.cursor.execute("SELECT COUNT(*) FROM tasks")
+        count = self.cursor.fetchone()[0]
+        if not count:
+            return 0
+        
+        reader = self.conn.cursor()
+        reader.execute("SELECT id, title, substr(IFNULL(description, ''), 1, ?) FROM tasks",
+                       (DUPLICATE_DESCRIPTION_LENGTH,))
+        self.index_duplicate_rows(reader, count)
+        logger.debug(f"Проиндексировано задач для поиска похожих: {count}")
+        return count
+    
+    def refresh_duplicate_index(self):
+        """
+        Индексирование задач из очереди task_lsh_pending (новых и измененных
+        после предыдущего поиска похожих задач).
+        
+        Returns:
+            int: Количество проиндексированных задач
+        """
+        try:
+            self.cursor.execute("SELECT COUNT(*) FROM task_lsh_pending")
+            count = self.cursor.fetchone()[0]
+            if not count:
+                return 0
+            reader = self.conn.cursor()
+            reader.execute("""
+                SELECT t.id, t.title, substr(IFNULL(t.description, ''), 1, ?)
+                FROM task_lsh_pending AS p
+                JOIN tasks AS t ON t.id = p.task_id
+            """, (DUPLICATE_DESCRIPTION_LENGTH,))
+            self.index_duplicate_rows(reader, count)
+            self.cursor.execute("DELETE FROM task_lsh_pending")
+            self.conn.commit()
+            logger.debug(f"Проиндексировано задач из очереди поиска похожих: {count}")
+            return count
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении индекса похожих задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def index_duplicate_rows(self, reader, count):
+        """
+        Запись ключей корзин LSH для строк (ID, заголовок, начало описания)
+        курсора reader (без фиксации транзакции).
+        
+        Для большого количества строк подписи вычисляются в пуле процессов
+        пачками по DUPLICATE_INDEX_BATCH задач.
+        """
+        batches = iter(lambda: reader.fetchmany(DUPLICATE_INDEX_BATCH), [])
+        insert = lambda rows: self.cursor.executemany(
+            "INSERT OR IGNORE INTO task_lsh_buckets (bucket, task_id) VALUES (?, ?)", rows)
+        if count < DUPLICATE_INDEX_POOL_THRESHOLD:
+            for batch in batches:
+                insert(index_rows(batch))
+        else:
+            with ProcessPoolExecutor() as executor:
+                # Ограничиваем очередь, чтобы не читать в память всю таблицу
+                window = (os.cpu_count() or 1) * 2
+                pending = deque()
+                for batch in batches:
+                    pending.append(executor.submit(index_rows, batch))
+                    if len(pending) >= window:
+                        insert(pending.popleft().result())
+                while pending:
+                    insert(pending.popleft().result())
+    
+    def find_duplicates(self, title, description, exclude_id=None, limit=5, threshold=DUPLICATE_THRESHOLD):
+        """
+        Поиск задач, похожих на задачу с заданным текстом.
+        
+        Кандидаты - задачи с общими корзинами LSH (несколько обращений к
+        первичному ключу task_lsh_buckets), сходство проверяется точно только
+        для них, поэтому время поиска почти не зависит от количества задач.
+        
+        Args:
+            title: Заголовок задачи
+            description: Описание задачи
+            exclude_id: ID задачи, которую не нужно считать дубликатом (при редактировании)
+            limit: Максимальное количество результатов
+            threshold: Порог сходства
+        
+        Returns:
+            list: Кортежи (ID задачи, заголовок, сходство) по убыванию сходства
+        """
+        try:
+            buckets = lsh_buckets(title, description)
+            if not buckets:
+                return []
+            self.refresh_duplicate_index()
+            self.cursor.execute("""
+                SELECT id, title, substr(IFNULL(description, ''), 1, ?)
+                FROM tasks
+                WHERE id IN (
+                    SELECT task_id
+                    FROM task_lsh_buckets
+                    WHERE bucket IN (SELECT value FROM json_each(?))
+                    GROUP BY task_id
+                    ORDER BY COUNT(*) DESC
+                    LIMIT ?
+                )
+            """, (DUPLICATE_DESCRIPTION_LENGTH, json.dumps(buckets), DUPLICATE_CANDIDATE_LIMIT + 1))
+            current = shingles(title, description)
+            matches = []
+            for task_id, other_title, other_description in self.cursor.fetchall():
+                if task_id == exclude_id:
+                    continue
+                score = similarity(current, shingles(other_title, other_description))
+                if score >= threshold:
+                    matches.append((task_id, other_title, score))
+            matches.sort(key=lambda match: -match[2])
+            return matches[:limit]
+        except Exception as e:
+            logger.error(f"Ошибка при поиске похожих задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_task_titles(self, task_ids):
+        """
+        Получение заголовков задач по списку ID.
+        
+        Returns:
+            dict: ID задачи -> заголовок
+        """
+        try:
+            self.cursor.execute("""
+                SELECT id, title FROM tasks
+                WHERE id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(list(task_ids)),))
+            return dict(self.cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Ошибка при получении заголовков задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def init_journal(self):
+        """
+        Создание журнала изменений и записывающих его триггеров.
+        
+        Триггеры пишут в task_changes только измененные поля со старыми и новыми
+        значениями в той же транзакции, что и само изменение. Запись ведется,
+        пока в journal_state задан номер текущего действия (begin_change).
+        """
+        try:
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_txns (
+                    txn INTEGER PRIMARY KEY AUTOINCREMENT,
+                    label TEXT NOT NULL,
+                    undone INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS task_changes (
+                    id INTEGER PRIMARY KEY,
+                    txn INTEGER NOT NULL,
+                    table_name TEXT NOT NULL,
+                    op TEXT NOT NULL,
+                    old_values TEXT,
+                    new_values TEXT
+                )
+            ''')
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_task_changes_txn
+                ON task_changes (txn, id)
+            """)
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS journal_state (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+            # Вне действий номер равен 0, и изменения (архивация, восстановление,
+            # повтор из журнала) не записываются
+            self.cursor.execute("INSERT OR IGNORE INTO journal_state (key, value) VALUES ('txn', 0)")
+            self.cursor.execute("UPDATE journal_state SET value = 0 WHERE key = 'txn'")
+            # Признак изменения многих задач одним запросом (begin_bulk_update):
+            # построчные триггеры изменения задач при нем не работают
+            self.cursor.execute("INSERT OR IGNORE INTO journal_state (key, value) VALUES ('bulk', 0)")
+            self.cursor.execute("UPDATE journal_state SET value = 0 WHERE key = 'bulk'")
+            
+            current_txn = "(SELECT value FROM journal_state WHERE key = 'txn')"
+            bulk = "(SELECT value FROM journal_state WHERE key = 'bulk')"
+            
+            def tag_json(prefix):
+                # Тег сохраняется по названию: строка тега может быть удалена позже
+                return (f"json_object('task_id', {prefix}.task_id, "
+                        f"'tag', (SELECT name FROM tags WHERE id = {prefix}.tag_id))")
+            
+            def description_json(prefix):
+                # JSON не хранит двоичные данные, поэтому сжатое описание пишется в hex
+                return (f"json_object('task_id', {prefix}.task_id, 'raw_size', {prefix}.raw_size, "
+                        f"'data', hex({prefix}.data))")
+            
+            triggers = {
+                'trg_journal_tasks_insert': ("AFTER INSERT ON tasks", "'tasks', 'insert', NULL",
+                                             journal_row_json("NEW", JOURNAL_TASK_ROW_COLUMNS)),
+                'trg_journal_tasks_update': (
+                    "AFTER UPDATE OF " + ", ".join(JOURNAL_TASK_COLUMNS) + " ON tasks",
+                    f"'tasks', 'update', json_set({journal_changed_json('OLD')}, '$.id', OLD.id)",
+                    journal_changed_json("NEW")),
+                'trg_journal_tasks_delete': ("AFTER DELETE ON tasks",
+                                             f"'tasks', 'delete', {journal_row_json('OLD', JOURNAL_TASK_ROW_COLUMNS)}",
+                                             "NULL"),
+                'trg_journal_task_tags_insert': ("AFTER INSERT ON task_tags", "'task_tags', 'insert', NULL",
+                                                 tag_json("NEW")),
+                'trg_journal_task_tags_delete': ("AFTER DELETE ON task_tags",
+                                                 f"'task_tags', 'delete', {tag_json('OLD')}", "NULL"),
+                'trg_journal_recurrence_insert': ("AFTER INSERT ON task_recurrence",
+                                                  "'task_recurrence', 'insert', NULL",
+                                                  journal_row_json("NEW", JOURNAL_RECURRENCE_COLUMNS)),
+                'trg_journal_recurrence_update': ("AFTER UPDATE ON task_recurrence",
+                                                  f"'task_recurrence', 'update', "
+                                                  f"{journal_row_json('OLD', JOURNAL_RECURRENCE_COLUMNS)}",
+                                                  journal_row_json("NEW", JOURNAL_RECURRENCE_COLUMNS)),
+                'trg_journal_recurrence_delete': ("AFTER DELETE ON task_recurrence",
+                                                  f"'task_recurrence', 'delete', "
+                                                  f"{journal_row_json('OLD', JOURNAL_RECURRENCE_COLUMNS)}", "NULL"),
+                'trg_journal_description_insert': ("AFTER INSERT ON task_descriptions_z",
+                                                   "'task_descriptions_z', 'insert', NULL",
+                                                   description_json("NEW")),
+                'trg_journal_description_update': ("AFTER UPDATE ON task_descriptions_z",
+                                                   f"'task_descriptions_z', 'update', {description_json('OLD')}",
+                                                   description_json("NEW")),
+                'trg_journal_description_delete': ("AFTER DELETE ON task_descriptions_z",
+                                                   f"'task_descriptions_z', 'delete', {description_json('OLD')}",
+                                                   "NULL"),
+                'trg_journal_attachments_insert': ("AFTER INSERT ON attachments",
+                                                   "'attachments', 'insert', NULL",
+                                                   journal_row_json("NEW", JOURNAL_ATTACHMENT_COLUMNS)),
+                'trg_journal_attachments_delete': ("AFTER DELETE ON attachments",
+                                                   f"'attachments', 'delete', "
+                                                   f"{journal_row_json('OLD', JOURNAL_ATTACHMENT_COLUMNS)}", "NULL"),
+            }
+            for name, (event, head, new_values) in triggers.items():
+                condition = f"{current_txn} != 0"
+                if name == 'trg_journal_tasks_update':
+                    # Изменение только updated_at не записывается
+                    condition += f" AND {bulk} = 0 AND ({columns_differ(JOURNAL_TASK_COLUMNS)})"
+                self.cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {name}
+                    {event}
+                    WHEN {condition}
+                    BEGIN
+                        INSERT INTO task_changes (txn, table_name, op, old_values, new_values)
+                        VALUES ({current_txn}, {head}, {new_values});
+                    END
+                ''')
+            logger.debug("Журнал изменений проверен")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации журнала изменений: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def init_daily_rollups(self):
+        """
+        Создание таблицы итогов по дням и поддерживающих ее триггеров.
+        
+        Строка итогов (день, приоритет) хранит количество задач, созданных и
+        выполненных в этот день, и количество созданных в этот день задач,
+        которые еще не выполнены. Каждый триггер вычитает вклад старой строки
+        задачи и добавляет вклад новой, поэтому итоги всегда совпадают с
+        пересчетом rebuild_daily_rollups, в том числе после отмены действий.
+        Задачи, перенесенные в архив, из итогов не вычитаются.
+        """
+        try:
+            self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_rollups'")
+            created = self.cursor.fetchone() is None
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS daily_rollups (
+                    day TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    created INTEGER NOT NULL DEFAULT 0,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    open INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, priority)
+                ) WITHOUT ROWID
+            ''')
+            # Признак переноса задач в архив: удаление не меняет историю
+            self.cursor.execute("INSERT OR IGNORE INTO journal_state (key, value) VALUES ('archiving', 0)")
+            self.cursor.execute("UPDATE journal_state SET value = 0 WHERE key = 'archiving'")
+            
+            def contribution(prefix, sign, completed_at):
+                # Вклад строки задачи: день создания и, для выполненной, день выполнения
+                upsert = '''
+                    INSERT INTO daily_rollups (day, priority, created, completed, open)
+                    SELECT date(IFNULL({day}, CURRENT_TIMESTAMP), 'localtime'), IFNULL({p}.priority, 1),
+                           {created}, {completed}, {open}
+                    WHERE {condition}
+                    ON CONFLICT (day, priority) DO UPDATE
+                    SET created = created + excluded.created,
+                        completed = completed + excluded.completed,
+                        open = open + excluded.open;
+                '''
+                done = f"IFNULL({prefix}.completed, 0) != 0"
+                return (upsert.format(day=f"{prefix}.created_at", p=prefix, created=sign, completed=0,
+                                      open=f"{sign} * (IFNULL({prefix}.completed, 0) = 0)", condition="1")
+                        + upsert.format(day=completed_at, p=prefix, created=0, completed=sign, open=0,
+                                        condition=done))
+            
+            current_completed_at = "(SELECT completed_at FROM tasks WHERE id = NEW.id)"
+            bulk = "(SELECT value FROM journal_state WHERE key = 'bulk')"
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_daily_rollups_insert
+                AFTER INSERT ON tasks
+                BEGIN
+                    UPDATE tasks SET completed_at = IFNULL(NEW.updated_at, CURRENT_TIMESTAMP)
+                    WHERE id = NEW.id AND IFNULL(NEW.completed, 0) != 0 AND NEW.completed_at IS NULL;
+                    {contribution("NEW", 1, current_completed_at)}
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_daily_rollups_update
+                AFTER UPDATE OF priority, completed, completed_at ON tasks
+                WHEN {bulk} = 0
+                 AND (OLD.priority IS NOT NEW.priority OR IFNULL(OLD.completed, 0) != IFNULL(NEW.completed, 0)
+                      OR OLD.completed_at IS NOT NEW.completed_at)
+                BEGIN
+                    {contribution("OLD", -1, "OLD.completed_at")}
+                    UPDATE tasks
+                    SET completed_at = CASE WHEN OLD.completed_at IS NOT NEW.completed_at THEN NEW.completed_at
+                                            WHEN IFNULL(NEW.completed, 0) != 0 THEN CURRENT_TIMESTAMP END
+                    WHERE id = NEW.id AND IFNULL(OLD.completed, 0) != IFNULL(NEW.completed, 0);
+                    {contribution("NEW", 1, current_completed_at)}
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_daily_rollups_delete
+                AFTER DELETE ON tasks
+                WHEN (SELECT value FROM journal_state WHERE key = 'archiving') = 0
+                BEGIN
+                    {contribution("OLD", -1, "OLD.completed_at")}
+                END
+            ''')
+            
+            # Для новой таблицы итогов заполняем историю по текущим задачам
+            if created:
+                self.rebuild_daily_rollups()
+            logger.debug("Итоги по дням проверены")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации итогов по дням: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def rebuild_daily_rollups(self):
+        """
+        Пересчет итогов по дням по всем задачам (без фиксации транзакции).
+        
+        Если подключена архивная база, в историю входят и перенесенные в
+        архив задачи (временем выполнения считается время последнего изменения).
+        
+        Returns:
+            int: Количество строк итогов
+        """
+        self.cursor.execute("SELECT 1 FROM pragma_database_list WHERE name = 'archive'")
+        archive = ""
+        if self.cursor.fetchone():
+            archive = """
+                UNION ALL
+                SELECT created_at, priority, 1, 0, 0 FROM archive.tasks
+                UNION ALL
+                SELECT IFNULL(completed_at, updated_at), priority, 0, 1, 0 FROM archive.tasks
+            """
+        self.cursor.execute("DELETE FROM daily_rollups")
+        self.cursor.execute(f"""
+            INSERT INTO daily_rollups (day, priority, created, completed, open)
+            SELECT date(IFNULL(moment, CURRENT_TIMESTAMP), 'localtime') AS day, IFNULL(priority, 1) AS p,
+                   SUM(created), SUM(completed), SUM(open)
+            FROM (
+                SELECT created_at AS moment, priority, 1 AS created, 0 AS completed,
+                       IFNULL(completed, 0) = 0 AS open
+                FROM tasks
+                UNION ALL
+                SELECT completed_at, priority, 0, 1, 0 FROM tasks WHERE IFNULL(completed, 0) != 0
+                {archive}
+            )
+            GROUP BY day, p
+        """)
+        count = self.cursor.rowcount
+        logger.debug(f"Итоги по дням пересчитаны: {count} строк")
+        return count
+    
+    def get_completion_trend(self, days=ROLLUP_TREND_DAYS):
+        """
+        Создание и выполнение задач по дням за последние days дней.
+        
+        Читаются только строки итогов за период и счетчик открытых задач:
+        количество открытых задач на конец дня получается вычитанием из
+        текущего количества итогов следующих дней (оконной суммой).
+        
+        Returns:
+            list: Кортежи (день, создано, выполнено, скользящее среднее выполненных,
+                открыто на конец дня)
+        """
+        try:
+            window = ROLLUP_MOVING_AVERAGE_DAYS - 1
+            self.cursor.execute(f"""
+                WITH RECURSIVE calendar(day) AS (
+                    SELECT date('now', 'localtime', ?)
+                    UNION ALL
+                    SELECT date(day, '+1 day') FROM calendar WHERE day < date('now', 'localtime')
+                ),
+                totals AS (
+                    SELECT day, SUM(created) AS created, SUM(completed) AS completed
+                    FROM daily_rollups
+                    WHERE day >= (SELECT MIN(day) FROM calendar)
+                    GROUP BY day
+                ),
+                series AS (
+                    SELECT c.day, IFNULL(t.created, 0) AS created, IFNULL(t.completed, 0) AS completed,
+                           AVG(IFNULL(t.completed, 0)) OVER (
+                               ORDER BY c.day ROWS BETWEEN {window} PRECEDING AND CURRENT ROW
+                           ) AS average,
+                           (SELECT value FROM task_stats WHERE key = 'open') - IFNULL(SUM(
+                               IFNULL(t.created, 0) - IFNULL(t.completed, 0)
+                           ) OVER (
+                               ORDER BY c.day ROWS BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING
+                           ), 0) AS open
+                    FROM calendar AS c
+                    LEFT JOIN totals AS t ON t.day = c.day
+                )
+                SELECT day, created, completed, average, open
+                FROM series
+                WHERE day > date('now', 'localtime', ?)
+                ORDER BY day
+            """, (f"-{days - 1 + window} days", f"-{days} days"))
+            return self.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка при получении истории выполнения: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_priority_throughput(self, weeks=ROLLUP_THROUGHPUT_WEEKS):
+        """
+        Выполненные задачи по неделям и приоритетам за последние weeks недель.
+        
+        Returns:
+            list: Кортежи (понедельник недели, приоритет, выполнено, доля в неделе)
+        """
+        try:
+            self.cursor.execute("""
+                SELECT date(day, '-6 days', 'weekday 1') AS week, priority, SUM(completed) AS done,
+                       SUM(completed) * 1.0 / NULLIF(SUM(SUM(completed)) OVER (
+                           PARTITION BY date(day, '-6 days', 'weekday 1')
+                       ), 0) AS share
+                FROM daily_rollups
+                WHERE day >= date('now', 'localtime', '-6 days', 'weekday 1', ?)
+                GROUP BY week, priority
+                ORDER BY week, priority
+            """, (f"-{(weeks - 1) * 7} days",))
+            return self.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка при получении выполнения по приоритетам: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_open_task_aging(self):
+        """
+        Открытые задачи по возрасту (группы OPEN_AGE_BANDS) и приоритетам.
+        
+        Returns:
+            tuple: (список кортежей (номер группы, приоритет, количество),
+                медианный возраст открытой задачи в днях или None)
+        """
+        try:
+            bands = " ".join(f"WHEN age <= {limit} THEN {number}" for number, limit in enumerate(OPEN_AGE_BANDS))
+            ages = """
+                WITH ages AS (
+                    SELECT CAST(julianday('now', 'localtime') - julianday(day) AS INTEGER) AS age,
+                           priority, open
+                    FROM daily_rollups
+                    WHERE open > 0
+                )
+            """
+            self.cursor.execute(f"""
+                {ages}
+                SELECT CASE {bands} ELSE {len(OPEN_AGE_BANDS)} END AS band, priority, SUM(open)
+                FROM ages
+                GROUP BY band, priority
+                ORDER BY band, priority
+            """)
+            rows = self.cursor.fetchall()
+            # Медиана: первый возраст, на котором накопленная сумма достигает половины
+            self.cursor.execute(f"""
+                {ages}
+                SELECT age FROM (
+                    SELECT age, SUM(open) OVER (ORDER BY age ROWS UNBOUNDED PRECEDING) AS running,
+                           SUM(open) OVER () AS total
+                    FROM ages
+                )
+                WHERE running * 2 >= total
+                ORDER BY age
+                LIMIT 1
+            """)
+            row = self.cursor.fetchone()
+            return rows, row[0] if row else None
+        except Exception as e:
+            logger.error(f"Ошибка при получении возраста открытых задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def init_sync(self):
+        """
+        Создание таблиц и триггеров синхронизации.
+        
+        Любое изменение синхронизируемых полей увеличивает версию задачи и
+        версию измененного поля, удаление оставляет надгробие с версией
+        удаления. Хеш (uid, версия) каждой задачи и надгробия сложен (XOR) во
+        все узлы дерева sync_buckets на пути к листу по префиксам uid. Хеши
+        считаются в Python, а триггеры не вызывают функций Python, чтобы базу
+        можно было менять и без DatabaseManager: они только отмечают лист
+        измененной строки в sync_dirty, а refresh_sync_buckets пересчитывает
+        отмеченные листья и узлы над ними перед сравнением баз. Пока в journal_state
+        задан признак sync_apply, версии не увеличиваются: так записываются
+        изменения из другой базы и изменения, не меняющие текст задачи.
+        
+        Задача, перенесенная в архив, не оставляет надгробия: ее последняя
+        запись хранится в sync_archived и остается в дереве хешей, поэтому
+        синхронизация не удаляет задачу в другой базе и не возвращает ее в
+        эту. Изменение или удаление задачи в другой базе заменяет эту запись.
+        """
+        try:
+            self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sync_buckets'")
+            created = self.cursor.fetchone() is None
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_buckets (
+                    level INTEGER NOT NULL,
+                    prefix TEXT NOT NULL,
+                    hash INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (level, prefix)
+                ) WITHOUT ROWID
+            ''')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_tombstones (
+                    uid TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_dirty (
+                    prefix TEXT PRIMARY KEY
+                ) WITHOUT ROWID
+            ''')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_archived (
+                    uid TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    record TEXT NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_uid ON tasks (uid)")
+            # Индекс версий для выгрузки изменений после предыдущего экспорта
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_version ON tasks (version)")
+            self.cursor.execute("INSERT OR IGNORE INTO journal_state (key, value) VALUES ('sync_apply', 0)")
+            self.cursor.execute("UPDATE journal_state SET value = 0 WHERE key = 'sync_apply'")
+            
+            applying = "(SELECT value FROM journal_state WHERE key = 'sync_apply')"
+            archiving = "(SELECT value FROM journal_state WHERE key = 'archiving')"
+            bulk = "(SELECT value FROM journal_state WHERE key = 'bulk')"
+            
+            def mark_dirty(uid):
+                # Лист дерева с измененной строкой пересчитывается перед сравнением баз
+                return f'''
+                    INSERT OR IGNORE INTO sync_dirty (prefix)
+                    SELECT substr({uid}, 1, {SYNC_PREFIX_LENGTHS[-1]}) WHERE {uid} IS NOT NULL;
+                '''
+            
+            def bump_field(task_id, field):
+                # Изменение поля, хранящегося вне строки задачи (теги, сжатое описание)
+                field_versions = ("json_object(" + ", ".join(
+                    f"'{f}', " + (sync_next_version("tasks") if f == field else sync_stored_field_version("tasks", f))
+                    for f in SYNC_FIELDS) + ")")
+                return f'''
+                    UPDATE tasks SET version = {sync_next_version("tasks")}, field_versions = {field_versions}
+                    WHERE id = {task_id};
+                    {mark_dirty(f"(SELECT uid FROM tasks WHERE id = {task_id})")}
+                '''
+            
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_sync_tasks_insert
+                AFTER INSERT ON tasks
+                BEGIN
+                    UPDATE tasks
+                    SET uid = IFNULL(NEW.uid, lower(hex(randomblob(16)))),
+                        version = CASE WHEN {applying} = 1 AND NEW.version IS NOT NULL THEN NEW.version
+                                       ELSE MAX({SYNC_CLOCK}, IFNULL(NEW.version, 0) + 1,
+                                                IFNULL((SELECT version FROM sync_tombstones WHERE uid = NEW.uid), 0) + 1)
+                                  END,
+                        field_versions = CASE WHEN {applying} = 1 THEN NEW.field_versions END
+                    WHERE id = NEW.id;
+                    DELETE FROM sync_tombstones WHERE uid = (SELECT uid FROM tasks WHERE id = NEW.id);
+                    DELETE FROM sync_archived WHERE uid = (SELECT uid FROM tasks WHERE id = NEW.id);
+                    {mark_dirty("(SELECT uid FROM tasks WHERE id = NEW.id)")}
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_sync_tasks_update
+                AFTER UPDATE OF {", ".join(SYNC_TASK_COLUMNS)} ON tasks
+                WHEN {applying} = 0 AND {bulk} = 0 AND ({columns_differ(SYNC_TASK_COLUMNS)})
+                BEGIN
+                    UPDATE tasks SET version = {sync_next_version("OLD")}, field_versions = {sync_field_versions()}
+                    WHERE id = NEW.id;
+                    {mark_dirty("NEW.uid")}
+                END
+            ''')
+            # Запись задачи из другой базы: версия задана явно
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_sync_tasks_apply
+                AFTER UPDATE OF uid, version ON tasks
+                WHEN {applying} = 1 AND OLD.uid IS NOT NULL AND OLD.version IS NOT NULL
+                 AND (OLD.uid IS NOT NEW.uid OR OLD.version IS NOT NEW.version)
+                BEGIN
+                    {mark_dirty("OLD.uid")}
+                    {mark_dirty("NEW.uid")}
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_sync_tasks_delete
+                AFTER DELETE ON tasks
+                BEGIN
+                    {mark_dirty("OLD.uid")}
+                    INSERT INTO sync_tombstones (uid, version)
+                    SELECT OLD.uid, {sync_next_version("OLD")}
+                    WHERE OLD.uid IS NOT NULL AND {applying} = 0 AND {archiving} = 0
+                    ON CONFLICT (uid) DO UPDATE SET version = excluded.version;
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_sync_tombstones_insert
+                AFTER INSERT ON sync_tombstones
+                BEGIN
+                    DELETE FROM sync_archived WHERE uid = NEW.uid;
+                    {mark_dirty("NEW.uid")}
+                END
+            ''')
+            # Записи задач, перенесенных в архив, входят в дерево как задачи
+            for table in ('sync_tombstones', 'sync_archived'):
+                self.cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_update
+                    AFTER UPDATE ON {table}
+                    BEGIN
+                        {mark_dirty("OLD.uid")}
+                        {mark_dirty("NEW.uid")}
+                    END
+                ''')
+                self.cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_delete
+                    AFTER DELETE ON {table}
+                    BEGIN
+                        {mark_dirty("OLD.uid")}
+                    END
+                ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_sync_archived_insert
+                AFTER INSERT ON sync_archived
+                BEGIN
+                    {mark_dirty("NEW.uid")}
+                END
+            ''')
+            # Теги и полный текст длинного описания хранятся вне строки задачи
+            for name, event, prefix, field, condition in (
+                    ('trg_sync_task_tags_insert', "AFTER INSERT ON task_tags", "NEW", 'tags', ""),
+                    ('trg_sync_task_tags_delete', "AFTER DELETE ON task_tags", "OLD", 'tags', ""),
+                    ('trg_sync_description_insert', "AFTER INSERT ON task_descriptions_z", "NEW", 'description', ""),
+                    ('trg_sync_description_update', "AFTER UPDATE ON task_descriptions_z", "NEW", 'description',
+                     " AND OLD.data IS NOT NEW.data"),
+                    ('trg_sync_description_delete', "AFTER DELETE ON task_descriptions_z", "OLD", 'description', "")):
+                self.cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {name}
+                    {event}
+                    WHEN {applying} = 0{condition}
+                    BEGIN
+                        {bump_field(f"{prefix}.task_id", field)}
+                    END
+                ''')
+            
+            # Для новой базы (или базы до появления синхронизации) строим дерево хешей
+            if created:
+                self.rebuild_sync_buckets()
+            logger.debug("Таблицы синхронизации проверены")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации синхронизации: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def rebuild_sync_buckets(self):
+        """
+        Пересчет дерева хешей синхронизации по задачам, надгробиям и
+        задачам, перенесенным в архив (без фиксации транзакции).
+        
+        Returns:
+            int: Количество узлов дерева
+        """
+        leaf_length = SYNC_PREFIX_LENGTHS[-1]
+        nodes = {}
+        self.cursor.execute("""
+            SELECT uid, version, 0 FROM tasks WHERE uid IS NOT NULL
+            UNION ALL
+            SELECT uid, version, 1 FROM sync_tombstones
+            UNION ALL
+            SELECT uid, version, 0 FROM sync_archived
+        """)
+        for uid, version, deleted in self.cursor.fetchall():
+            node = nodes.setdefault((leaf_length, uid[:leaf_length]), [0, 0])
+            node[0] ^= sync_row_hash(uid, version, deleted)
+            node[1] += 1
+        # Узлы верхних уровней складываются из узлов уровня ниже
+        for length in reversed(SYNC_PREFIX_LENGTHS[:-1]):
+            for (level, prefix), (row_hash, count) in list(nodes.items()):
+                if level == length + 1:
+                    node = nodes.setdefault((length, prefix[:length]), [0, 0])
+                    node[0] ^= row_hash
+                    node[1] += count
+        self.cursor.execute("DELETE FROM sync_buckets")
+        self.cursor.executemany("INSERT INTO sync_buckets (level, prefix, hash, count) VALUES (?, ?, ?, ?)",
+                                [(level, prefix, row_hash, count) for (level, prefix), (row_hash, count) in nodes.items()])
+        self.cursor.execute("DELETE FROM sync_dirty")
+        logger.debug(f"Дерево хешей синхронизации построено: {len(nodes)} узлов")
+        return len(nodes)
+    
+    def refresh_sync_buckets(self):
+        """
+        Пересчет листьев дерева хешей синхронизации, отмеченных в sync_dirty,
+        и узлов над ними.
+        
+        После массовых действий, отметивших больше SYNC_REFRESH_MAX_LEAVES
+        листьев, дерево строится заново одним проходом по задачам.
+        
+        Returns:
+            int: Количество пересчитанных листьев
+        """
         try:
-            logger.debug("Подключение к базе данных")
-            self.conn = sqlite3.connect("tasks.db")
-            self.cursor = self.conn.cursor()
-            self.init_db()
-            logger.debug("База данных инициализирована")
+            self.cursor.execute("SELECT prefix FROM sync_dirty")
+            prefixes = [prefix for (prefix,) in self.cursor.fetchall()]
+            if not prefixes:
+                return 0
+            if len(prefixes) > SYNC_REFRESH_MAX_LEAVES:
+                self.rebuild_sync_buckets()
+                self.conn.commit()
+                return len(prefixes)
+            
+            upsert = """
+                INSERT INTO sync_buckets (level, prefix, hash, count) VALUES (?, ?, ?, ?)
+                ON CONFLICT (level, prefix) DO UPDATE SET hash = excluded.hash, count = excluded.count
+            """
+            for prefix in prefixes:
+                self.cursor.execute("""
+                    SELECT uid, version, 0 FROM tasks WHERE uid >= ?1 AND uid < ?2
+                    UNION ALL
+                    SELECT uid, version, 1 FROM sync_tombstones WHERE uid >= ?1 AND uid < ?2
+                    UNION ALL
+                    SELECT uid, version, 0 FROM sync_archived WHERE uid >= ?1 AND uid < ?2
+                """, (prefix, prefix + "g"))
+                row_hash, count = 0, 0
+                for uid, version, deleted in self.cursor.fetchall():
+                    row_hash ^= sync_row_hash(uid, version, deleted)
+                    count += 1
+                self.cursor.execute(upsert, (SYNC_PREFIX_LENGTHS[-1], prefix, row_hash, count))
+            # Узел верхнего уровня складывается из узлов уровня ниже
+            for depth in reversed(range(len(SYNC_PREFIX_LENGTHS) - 1)):
+                length = SYNC_PREFIX_LENGTHS[depth]
+                prefixes = {prefix[:length] for prefix in prefixes}
+                for prefix in prefixes:
+                    self.cursor.execute("""
+                        SELECT hash, count FROM sync_buckets
+                        WHERE level = ? AND prefix >= ? AND prefix < ?
+                    """, (SYNC_PREFIX_LENGTHS[depth + 1], prefix, prefix + "g"))
+                    row_hash, count = 0, 0
+                    for child_hash, child_count in self.cursor.fetchall():
+                        row_hash ^= child_hash
+                        count += child_count
+                    self.cursor.execute(upsert, (length, prefix, row_hash, count))
+            self.cursor.execute("DELETE FROM sync_buckets WHERE count = 0")
+            self.cursor.execute("DELETE FROM sync_dirty")
+            self.conn.commit()
+            logger.debug("Дерево хешей синхронизации обновлено")
+            return len(prefixes)
         except Exception as e:
-            logger.error(f"Ошибка при инициализации базы данных: {str(e)}")
+            logger.error(f"Ошибка при обновлении дерева хешей синхронизации: {str(e)}")
             logger.error(traceback.format_exc())
+            self.conn.rollback()
             raise
     
-    def init_db(self):
-        """Инициализация структуры базы данных."""
+    def begin_change(self, label):
+        """
+        Начало записи действия в журнал (без фиксации транзакции).
+        
+        Отмененные действия после нового изменения повторить уже нельзя,
+        поэтому их записи удаляются.
+        """
+        self.cursor.execute("""
+            DELETE FROM task_changes
+            WHERE txn IN (SELECT txn FROM change_txns WHERE undone = 1)
+        """)
+        self.cursor.execute("DELETE FROM change_txns WHERE undone = 1")
+        self.cursor.execute("INSERT INTO change_txns (label) VALUES (?)", (label,))
+        txn = self.cursor.lastrowid
+        self.cursor.execute("UPDATE journal_state SET value = ? WHERE key = 'txn'", (txn,))
+        
+        # Старые действия удаляются в фоне, когда их накопилось заметно больше предела
+        self.cursor.execute("SELECT MIN(txn) FROM change_txns")
+        if txn - self.cursor.fetchone()[0] >= JOURNAL_MAX_TXNS * 1.5:
+            self.start_journal_compaction()
+    
+    def end_change(self):
+        """Окончание записи действия в журнал (перед фиксацией транзакции)."""
+        self.cursor.execute("UPDATE journal_state SET value = 0 WHERE key = 'txn'")
+    
+    def begin_bulk_update(self, condition, params=()):
+        """
+        Начало изменения многих задач одним запросом (без фиксации транзакции).
+        
+        Задачи по условию копируются во временную таблицу bulk_tasks, а
+        построчные триггеры изменения задач (счетчики, итоги по дням, журнал,
+        синхронизация) отключаются признаком bulk в journal_state. Изменение
+        должно затрагивать только задачи из bulk_tasks.
+        
+        Args:
+            condition: Условие SQL на строки tasks
+            params: Параметры условия
+        """
+        self.cursor.execute("DROP TABLE IF EXISTS temp.bulk_tasks")
+        self.cursor.execute(f"CREATE TEMP TABLE bulk_tasks AS SELECT * FROM tasks WHERE {condition}", params)
+        self.cursor.execute("UPDATE journal_state SET value = 1 WHERE key = 'bulk'")
+    
+    def end_bulk_update(self):
+        """
+        Окончание изменения многих задач: работа отключенных триггеров
+        выполняется для всех измененных задач несколькими запросами.
+        """
+        joined = "temp.bulk_tasks AS o JOIN tasks AS n ON n.id = o.id"
+        
+        # Время выполнения задач, у которых изменился статус (trg_daily_rollups_update),
+        # версии для синхронизации (trg_sync_tasks_update) - одним проходом по задачам
+        toggled = ("IFNULL(o.completed, 0) != IFNULL(tasks.completed, 0) "
+                   "AND o.completed_at IS tasks.completed_at")
+        synced = columns_differ(SYNC_TASK_COLUMNS, 'o', 'tasks')
+        self.cursor.execute(f"""
+            UPDATE tasks
+            SET completed_at = CASE WHEN {toggled}
+                                    THEN CASE WHEN IFNULL(tasks.completed, 0) != 0 THEN CURRENT_TIMESTAMP END
+                                    ELSE tasks.completed_at END,
+                version = CASE WHEN {synced} THEN {sync_next_version('o')} ELSE tasks.version END,
+                field_versions = CASE WHEN {synced} THEN {sync_field_versions('o', 'tasks')}
+                                      ELSE tasks.field_versions END
+            FROM temp.bulk_tasks AS o
+            WHERE o.id = tasks.id AND ({toggled} OR {synced})
+        """)
+        self.cursor.execute(f"""
+            INSERT OR IGNORE INTO sync_dirty (prefix)
+            SELECT DISTINCT substr(n.uid, 1, {SYNC_PREFIX_LENGTHS[-1]})
+            FROM {joined}
+            WHERE n.uid IS NOT NULL AND ({columns_differ(SYNC_TASK_COLUMNS, 'o', 'n')})
+        """)
+        
+        # Счетчики задач (trg_task_stats_update) и итоги по дням (trg_daily_rollups_update)
+        # считаются по строкам, в которых изменились приоритет, статус или время выполнения
+        changed = f"""
+            WITH changed AS MATERIALIZED (
+                SELECT o.priority AS old_priority, IFNULL(o.completed, 0) != 0 AS old_done,
+                       o.completed_at AS old_completed_at, n.priority AS new_priority,
+                       IFNULL(n.completed, 0) != 0 AS new_done, n.completed_at AS new_completed_at,
+                       o.created_at
+                FROM {joined}
+                WHERE o.priority IS NOT n.priority OR IFNULL(o.completed, 0) != IFNULL(n.completed, 0)
+                   OR o.completed_at IS NOT n.completed_at
+            )
+        """
+        self.cursor.execute(changed + """
+            SELECT key, SUM(delta) FROM (
+                SELECT 'open' AS key, old_done - new_done AS delta FROM changed
+                UNION ALL
+                SELECT 'done', new_done - old_done FROM changed
+                UNION ALL
+                SELECT 'p' || new_priority, 1 FROM changed
+                UNION ALL
+                SELECT 'p' || old_priority, -1 FROM changed
+            )
+            GROUP BY key
+            HAVING SUM(delta) != 0
+        """)
+        self.cursor.executemany("UPDATE task_stats SET value = value + ? WHERE key = ?",
+                                [(delta, key) for key, delta in self.cursor.fetchall()])
+        # Вклад старых строк вычитается, вклад новых добавляется
+        contributions = " UNION ALL ".join(f"""
+            SELECT date(IFNULL(created_at, CURRENT_TIMESTAMP), 'localtime') AS day,
+                   IFNULL({p}_priority, 1) AS priority, {sign} AS created, 0 AS completed,
+                   {sign} * (NOT {p}_done) AS open
+            FROM changed
+            UNION ALL
+            SELECT date(IFNULL({p}_completed_at, CURRENT_TIMESTAMP), 'localtime'), IFNULL({p}_priority, 1),
+                   0, {sign}, 0
+            FROM changed WHERE {p}_done
+        """ for p, sign in (("old", -1), ("new", 1)))
+        self.cursor.execute(changed + f"""
+            INSERT INTO daily_rollups (day, priority, created, completed, open)
+            SELECT day, priority, SUM(created), SUM(completed), SUM(open)
+            FROM ({contributions})
+            GROUP BY day, priority
+            ON CONFLICT (day, priority) DO UPDATE
+            SET created = created + excluded.created,
+                completed = completed + excluded.completed,
+                open = open + excluded.open
+        """)
+        
+        # Журнал изменений (trg_journal_tasks_update)
+        self.cursor.execute("SELECT value FROM journal_state WHERE key = 'txn'")
+        txn = self.cursor.fetchone()[0]
+        if txn:
+            self.cursor.execute(f"""
+                INSERT INTO task_changes (txn, table_name, op, old_values, new_values)
+                SELECT ?, 'tasks', 'update', json_set({journal_changed_json('o', 'o', 'n')}, '$.id', o.id),
+                       {journal_changed_json('n', 'o', 'n')}
+                FROM {joined}
+                WHERE {columns_differ(JOURNAL_TASK_COLUMNS, 'o', 'n')}
+                ORDER BY o.id
+            """, (txn,))
+        
+        self.cursor.execute("UPDATE journal_state SET value = 0 WHERE key = 'bulk'")
+        self.cursor.execute("DROP TABLE temp.bulk_tasks")
+    
+    def get_undo_label(self):
+        """Название действия, которое будет отменено, или None."""
+        self.cursor.execute("SELECT label FROM change_txns WHERE undone = 0 ORDER BY txn DESC LIMIT 1")
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    
+    def get_redo_label(self):
+        """Название действия, которое будет повторено, или None."""
+        self.cursor.execute("SELECT label FROM change_txns WHERE undone = 1 ORDER BY txn LIMIT 1")
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    
+    def undo(self):
+        """
+        Отмена последнего действия: обратные изменения из журнала
+        применяются в обратном порядке одной транзакцией.
+        
+        Returns:
+            str: Название отмененного действия или None
+        """
+        return self.replay_change(undo=True)
+    
+    def redo(self):
+        """
+        Повтор последнего отмененного действия одной транзакцией.
+        
+        Returns:
+            str: Название повторенного действия или None
+        """
+        return self.replay_change(undo=False)
+    
+    def replay_change(self, undo):
+        """Применение записей журнала одного действия в прямом или обратном порядке."""
         try:
-            # Создаем таблицу tasks если она не существует
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    priority INTEGER DEFAULT 1,
-                    completed BOOLEAN DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            if undo:
+                self.cursor.execute("""
+                    SELECT txn, label FROM change_txns WHERE undone = 0 ORDER BY txn DESC LIMIT 1
+                """)
+            else:
+                self.cursor.execute("""
+                    SELECT txn, label FROM change_txns WHERE undone = 1 ORDER BY txn LIMIT 1
+                """)
+            row = self.cursor.fetchone()
+            if not row:
+                return None
+            txn, label = row
             
-            # Проверяем наличие колонок
-            self.cursor.execute("PRAGMA table_info(tasks)")
-            columns = [column[1] for column in self.cursor.fetchall()]
-            if 'priority' not in columns:
-                self.cursor.execute("ALTER TABLE tasks ADD COLUMN priority INTEGER DEFAULT 1")
-            if 'completed' not in columns:
-                self.cursor.execute("ALTER TABLE tasks ADD COLUMN completed BOOLEAN DEFAULT 0")
+            self.cursor.execute(f"""
+                SELECT table_name, op, old_values, new_values,
+                       CASE WHEN table_name = 'tasks' AND op = 'update' THEN json_extract(old_values, '$.id') END
+                FROM task_changes
+                WHERE txn = ?
+                ORDER BY id {'DESC' if undo else 'ASC'}
+            """, (txn,))
+            changes = self.cursor.fetchall()
+            # Подряд идущие изменения разных задач собираются для применения одним
+            # запросом, их значения передаются в SQL без разбора в Python
+            updates = {}
+            for table_name, op, old_values, new_values, task_id in changes:
+                if undo:
+                    # Обратное изменение: добавление <-> удаление, новые значения -> старые
+                    op = {'insert': 'delete', 'delete': 'insert'}.get(op, op)
+                    old_values, new_values = new_values, old_values
+                if task_id is not None and task_id not in updates:
+                    updates[task_id] = new_values
+                    continue
+                self.apply_task_updates(updates)
+                updates = {}
+                self.apply_journal_change(table_name, op, json.loads(old_values) if old_values else None,
+                                          json.loads(new_values) if new_values else None)
+            self.apply_task_updates(updates)
             
+            self.cursor.execute("UPDATE change_txns SET undone = ? WHERE txn = ?", (1 if undo else 0, txn))
             self.conn.commit()
-            logger.debug("Структура базы данных проверена")
+            self.invalidate_caches()
+            logger.debug(f"{'Отменено' if undo else 'Повторено'} действие {txn} '{label}': {len(changes)} изменений")
+            return label
         except Exception as e:
-            logger.error(f"Ошибка при инициализации структуры БД: {str(e)}")
+            logger.error(f"Ошибка при {'отмене' if undo else 'повторе'} действия: {str(e)}")
             logger.error(traceback.format_exc())
+            self.conn.rollback()
             raise
     
-    def get_all_tasks(self):
-        """Получение всех задач из базы данных."""
+    def apply_task_updates(self, updates):
+        """
+        Применение изменений задач из журнала.
+        
+        Args:
+            updates: Словарь {ID задачи: новые значения колонок в JSON}
+        """
+        if len(updates) < BULK_UPDATE_MIN_ROWS:
+            for task_id, values in updates.items():
+                self.apply_journal_change('tasks', 'update', {'id': task_id}, json.loads(values))
+            return
+        
+        self.cursor.execute("DROP TABLE IF EXISTS temp.bulk_values")
+        self.cursor.execute("CREATE TEMP TABLE bulk_values (id INTEGER PRIMARY KEY, task_values TEXT NOT NULL)")
+        self.cursor.executemany("INSERT INTO temp.bulk_values (id, task_values) VALUES (?, ?)",
+                                list(updates.items()))
+        # Меняются только колонки, записанные в журнале хотя бы для одной задачи,
+        # колонка без значения в записи задачи остается прежней
+        self.cursor.execute("""
+            SELECT DISTINCT j.key FROM temp.bulk_values AS v, json_each(v.task_values) AS j
+        """)
+        recorded = {key for (key,) in self.cursor.fetchall()}
+        assignments = ", ".join(f"{c} = CASE WHEN json_type(v.task_values, '$.{c}') IS NULL THEN tasks.{c} "
+                                f"ELSE json_extract(v.task_values, '$.{c}') END"
+                                for c in JOURNAL_TASK_COLUMNS if c in recorded)
+        if not assignments:
+            self.cursor.execute("DROP TABLE temp.bulk_values")
+            return
+        self.begin_bulk_update("id IN (SELECT id FROM temp.bulk_values)")
+        self.cursor.execute(f"""
+            UPDATE tasks SET {assignments}
+            FROM temp.bulk_values AS v
+            WHERE v.id = tasks.id
+        """)
+        self.end_bulk_update()
+        self.cursor.execute("DROP TABLE temp.bulk_values")
+    
+    def apply_journal_change(self, table_name, op, old_values, new_values):
+        """
+        Применение одного изменения из журнала.
+        
+        Args:
+            table_name: Таблица изменения
+            op: Операция (insert, update, delete)
+            old_values: Значения до изменения (для delete и update)
+            new_values: Значения после изменения (для insert и update)
+        """
+        if table_name == 'tasks':
+            if op == 'insert':
+                columns = [c for c in JOURNAL_TASK_ROW_COLUMNS if c in new_values]
+                self.cursor.execute(f"""
+                    INSERT OR IGNORE INTO tasks ({", ".join(columns)})
+                    VALUES ({", ".join("?" for _ in columns)})
+                """, [new_values[c] for c in columns])
+            elif op == 'delete':
+                self.cursor.execute("DELETE FROM tasks WHERE id = ?", (old_values['id'],))
+            else:
+                columns = [c for c in JOURNAL_TASK_COLUMNS if c in new_values]
+                if columns:
+                    self.cursor.execute(f"""
+                        UPDATE tasks SET {", ".join(f"{c} = ?" for c in columns)}
+                        WHERE id = ?
+                    """, [new_values[c] for c in columns] + [old_values['id'] if 'id' in old_values
+                                                              else new_values['id']])
+        elif table_name == 'task_tags':
+            values = new_values if op == 'insert' else old_values
+            if op == 'insert':
+                self.cursor.execute("INSERT OR IGNORE INTO tags (name) VALUES (?)", (values['tag'],))
+                self.cursor.execute("""
+                    INSERT OR IGNORE INTO task_tags (task_id, tag_id)
+                    SELECT ?, id FROM tags WHERE name = ?
+                """, (values['task_id'], values['tag']))
+            else:
+                self.cursor.execute("""
+                    DELETE FROM task_tags
+                    WHERE task_id = ? AND tag_id = (SELECT id FROM tags WHERE name = ?)
+                """, (values['task_id'], values['tag']))
+        elif table_name == 'task_descriptions_z':
+            if op in ('delete', 'update'):
+                self.cursor.execute("DELETE FROM task_descriptions_z WHERE task_id = ?", (old_values['task_id'],))
+            if op in ('insert', 'update'):
+                self.write_description_data(new_values['task_id'], bytes.fromhex(new_values['data']),
+                                            new_values['raw_size'])
+        elif table_name == 'attachments':
+            if op == 'insert':
+                self.cursor.execute(f"""
+                    INSERT OR IGNORE INTO attachments ({", ".join(JOURNAL_ATTACHMENT_COLUMNS)})
+                    VALUES ({", ".join("?" for _ in JOURNAL_ATTACHMENT_COLUMNS)})
+                """, [new_values[c] for c in JOURNAL_ATTACHMENT_COLUMNS])
+            else:
+                self.cursor.execute("DELETE FROM attachments WHERE id = ?", (old_values['id'],))
+        elif table_name == 'task_recurrence':
+            # Правило меняет ключ при переходе к следующему повторению,
+            # поэтому изменение применяется как удаление и добавление
+            if op in ('delete', 'update'):
+                self.cursor.execute("DELETE FROM task_recurrence WHERE task_id = ?", (old_values['task_id'],))
+            if op in ('insert', 'update'):
+                self.cursor.execute("""
+                    INSERT OR REPLACE INTO task_recurrence (task_id, unit, interval, anchor_at)
+                    VALUES (?, ?, ?, ?)
+                """, [new_values[c] for c in JOURNAL_RECURRENCE_COLUMNS])
+    
+    def clear_journal(self):
+        """
+        Очистка журнала изменений (без фиксации транзакции).
+        
+        Вызывается после изменений, которые не записываются в журнал и после
+        которых записанные действия нельзя корректно отменить (архивация).
+        """
+        self.cursor.execute("DELETE FROM task_changes")
+        self.cursor.execute("DELETE FROM change_txns")
+    
+    def start_journal_compaction(self):
+        """Запуск фонового удаления старых записей журнала."""
+        thread = getattr(self, 'compaction_thread', None)
+        if thread is not None and thread.is_alive():
+            return
+        self.compaction_thread = threading.Thread(target=self.compact_journal, name="journal-compaction",
+                                                  daemon=True)
+        self.compaction_thread.start()
+    
+    def compact_journal(self):
+        """
+        Удаление старых действий из журнала через отдельное соединение.
+        
+        Сохраняются последние JOURNAL_MAX_TXNS действий, но не больше
+        JOURNAL_MAX_CHANGES записей. Записи удаляются небольшими пакетами,
+        чтобы не задерживать запись из основного потока.
+        """
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("SELECT txn FROM change_txns ORDER BY txn DESC LIMIT 1 OFFSET ?", (JOURNAL_MAX_TXNS,))
+            row = cursor.fetchone()
+            cutoff = row[0] if row else 0
+            cursor.execute("SELECT txn FROM task_changes ORDER BY id DESC LIMIT 1 OFFSET ?", (JOURNAL_MAX_CHANGES,))
+            row = cursor.fetchone()
+            if row:
+                # Последнее действие сохраняется даже если оно больше предела
+                cursor.execute("SELECT MAX(txn) FROM change_txns")
+                cutoff = max(cutoff, min(row[0], cursor.fetchone()[0] - 1))
+            if not cutoff:
+                return
+            
+            # Сначала удаляются сами действия, чтобы их нельзя было отменить частично
+            cursor.execute("DELETE FROM change_txns WHERE txn <= ?", (cutoff,))
+            conn.commit()
+            removed = 0
+            while True:
+                cursor.execute("""
+                    DELETE FROM task_changes
+                    WHERE id IN (SELECT id FROM task_changes WHERE txn <= ? LIMIT ?)
+                """, (cutoff, JOURNAL_COMPACT_BATCH))
+                conn.commit()
+                removed += cursor.rowcount
+                if cursor.rowcount < JOURNAL_COMPACT_BATCH:
+                    break
+            cursor.execute(ATTACHMENT_PRUNE_QUERY)
+            conn.commit()
+            logger.debug(f"Журнал изменений сжат до действия {cutoff}, удалено записей: {removed}")
+        except Exception as e:
+            logger.error(f"Ошибка при сжатии журнала изменений: {str(e)}")
+            logger.error(traceback.format_exc())
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    def count_task_stats(self):
+        """
+        Подсчет значений счетчиков полным просмотром таблицы задач.
+        
+        Returns:
+            dict: Значения счетчиков по ключам TASK_STAT_KEYS
+        """
         try:
             self.cursor.execute("""
-                SELECT id, title, description, priority, completed, created_at, updated_at
-                FROM tasks 
-                ORDER BY id
+                SELECT COUNT(*),
+                       COALESCE(SUM(IFNULL(completed, 0) = 0), 0),
+                       COALESCE(SUM(IFNULL(completed, 0) != 0), 0),
+                       COALESCE(SUM(priority = 1), 0),
+                       COALESCE(SUM(priority = 2), 0),
+                       COALESCE(SUM(priority = 3), 0),
+                       COALESCE(SUM(priority = 4), 0)
+                FROM tasks
             """)
-            tasks = self.cursor.fetchall()
+            return dict(zip(TASK_STAT_KEYS, self.cursor.fetchone()))
+        except Exception as e:
+            logger.error(f"Ошибка при подсчете счетчиков задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def write_task_stats(self, stats):
+        """Запись значений счетчиков в таблицу task_stats."""
+        try:
+            self.cursor.executemany("""
+                INSERT OR REPLACE INTO task_stats (key, value)
+                VALUES (?, ?)
+            """, list(stats.items()))
+            logger.debug(f"Счетчики задач записаны: {stats}")
+        except Exception as e:
+            logger.error(f"Ошибка при записи счетчиков задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_task_stats(self):
+        """
+        Получение счетчиков задач, поддерживаемых триггерами.
+        
+        Returns:
+            dict: Значения счетчиков по ключам TASK_STAT_KEYS
+        """
+        try:
+            self.cursor.execute("SELECT key, value FROM task_stats")
+            stats = dict.fromkeys(TASK_STAT_KEYS, 0)
+            stats.update(self.cursor.fetchall())
+            return stats
+        except Exception as e:
+            logger.error(f"Ошибка при получении счетчиков задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def check_task_stats(self):
+        """
+        Проверка счетчиков: пересчет с нуля, сравнение и исправление расхождений.
+        
+        Returns:
+            dict: Расхождения в виде {ключ: (сохраненное значение, фактическое значение)}
+        """
+        try:
+            stored = self.get_task_stats()
+            actual = self.count_task_stats()
+            mismatches = {key: (stored[key], actual[key])
+                          for key in TASK_STAT_KEYS if stored[key] != actual[key]}
+            if mismatches:
+                logger.warning(f"Расхождения в счетчиках задач: {mismatches}")
+                self.write_task_stats(actual)
+                self.conn.commit()
+            else:
+                logger.debug("Счетчики задач совпадают с фактическими значениями")
+            return mismatches
+        except Exception as e:
+            logger.error(f"Ошибка при проверке счетчиков задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def task_cursor(self):
+        """Создание курсора, возвращающего строки в виде записей Task."""
+        cursor = self.conn.cursor()
+        cursor.row_factory = task_row_factory
+        return cursor
+    
+    def get_all_tasks(self):
+        """
+        Получение всех задач из базы данных.
+        
+        Вместо полного описания записи содержат превью и признак
+        description_truncated. Полное описание загружается через get_task_description.
+        
+        Returns:
+            list: Записи Task
+        """
+        try:
+            cursor = self.task_cursor()
+            cursor.execute(TASK_LIST_QUERY + " ORDER BY id", (DESCRIPTION_PREVIEW_LENGTH,))
+            tasks = cursor.fetchall()
             logger.debug(f"Получено {len(tasks)} задач")
             return tasks
         except Exception as e:
@@ -75,82 +2164,778 @@ class DatabaseManager:
             logger.error(traceback.format_exc())
             raise
     
-    def add_task(self, title, description):
-        """Добавление новой задачи."""
+    def get_tasks_page(self, after_id=0, limit=LIST_PAGE_SIZE, before_id=None):
+        """
+        Получение страницы задач по возрастанию ID для постепенной загрузки списка.
+        
+        Args:
+            after_id: ID последней задачи предыдущей страницы
+            limit: Размер страницы
+            before_id: ID первой задачи следующей страницы - для страницы перед
+                ней при прокрутке вверх (after_id тогда не учитывается)
+        
+        Returns:
+            list: Записи Task в порядке ID
+        """
+        try:
+            cursor = self.task_cursor()
+            if before_id is not None:
+                cursor.execute(TASK_LIST_QUERY + " WHERE id < ? ORDER BY id DESC LIMIT ?",
+                               (DESCRIPTION_PREVIEW_LENGTH, before_id, limit))
+                tasks = cursor.fetchall()[::-1]
+                logger.debug(f"Получена страница задач перед {before_id}: {len(tasks)}")
+                return tasks
+            cursor.execute(TASK_LIST_QUERY + " WHERE id > ? ORDER BY id LIMIT ?",
+                           (DESCRIPTION_PREVIEW_LENGTH, after_id, limit))
+            tasks = cursor.fetchall()
+            logger.debug(f"Получена страница задач после {after_id}: {len(tasks)}")
+            return tasks
+        except Exception as e:
+            logger.error(f"Ошибка при получении страницы задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_task_preview(self, task_id):
+        """
+        Получение одной задачи в виде строки списка (с превью описания).
+        
+        Args:
+            task_id: ID задачи
+        
+        Returns:
+            Task: Запись задачи или None, если задача не найдена
+        """
+        try:
+            cursor = self.task_cursor()
+            cursor.execute(TASK_LIST_QUERY + " WHERE id = ?", (DESCRIPTION_PREVIEW_LENGTH, task_id))
+            return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Ошибка при получении задачи: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_task(self, task_id):
+        """
+        Получение задачи с полным описанием.
+        
+        Args:
+            task_id: ID задачи
+        
+        Returns:
+            Task: Запись задачи или None, если задача не найдена
+        """
+        try:
+            cursor = self.task_cursor()
+            cursor.execute("""
+                SELECT id, title, priority, completed, created_at, updated_at, due_at
+                FROM tasks
+                WHERE id = ?
+            """, (task_id,))
+            task = cursor.fetchone()
+            if task:
+                task.description = self.get_task_description(task_id)
+            return task
+        except Exception as e:
+            logger.error(f"Ошибка при получении задачи: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_tags(self):
+        """
+        Получение тегов со счетчиками задач.
+        
+        Returns:
+            list: Кортежи (name, task_count) в алфавитном порядке
+        """
+        try:
+            self.cursor.execute("SELECT name, task_count FROM tags ORDER BY name")
+            return self.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка при получении тегов: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def add_tags(self, task_ids, names):
+        """
+        Добавление тегов к группе задач одной операцией.
+        
+        Args:
+            task_ids: TaskSelection или список ID задач
+            names: Список названий тегов
+        """
+        try:
+            self.begin_change("Добавление тегов")
+            self.cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)",
+                                    [(name,) for name in names])
+            condition, params = self.selection_filter(task_ids)
+            self.cursor.execute(f"""
+                INSERT OR IGNORE INTO task_tags (task_id, tag_id)
+                SELECT tasks.id, tags.id
+                FROM tasks
+                JOIN tags ON tags.name IN (SELECT value FROM json_each(?))
+                WHERE {condition}
+            """, (json.dumps(names),) + params)
+            self.end_change()
+            self.conn.commit()
+            logger.debug(f"Теги {names} добавлены к {len(task_ids)} задачам")
+        except Exception as e:
+            logger.error(f"Ошибка при добавлении тегов: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def remove_tags(self, task_ids, names):
+        """
+        Удаление тегов у группы задач одной операцией.
+        
+        Args:
+            task_ids: TaskSelection или список ID задач
+            names: Список названий тегов
+        """
+        try:
+            self.begin_change("Удаление тегов")
+            condition, params = self.selection_filter(task_ids)
+            self.cursor.execute(f"""
+                DELETE FROM task_tags
+                WHERE tag_id IN (SELECT id FROM tags WHERE name IN (SELECT value FROM json_each(?)))
+                  AND task_id IN (SELECT tasks.id FROM tasks WHERE {condition})
+            """, (json.dumps(names),) + params)
+            # Теги без задач больше не показываются в фильтре
+            self.cursor.execute("DELETE FROM tags WHERE task_count <= 0")
+            self.end_change()
+            self.conn.commit()
+            logger.debug(f"Теги {names} удалены у {len(task_ids)} задач")
+        except Exception as e:
+            logger.error(f"Ошибка при удалении тегов: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def filter_tasks_by_tags(self, names, match_all=True, after_id=0, limit=TAG_FILTER_PAGE_SIZE, before_id=None):
+        """
+        Получение страницы задач, отфильтрованных по тегам.
+        
+        Args:
+            names: Список названий тегов
+            match_all: True - задача должна иметь все теги (И), False - любой из них (ИЛИ)
+            after_id: ID последней задачи предыдущей страницы
+            limit: Размер страницы
+            before_id: ID первой задачи следующей страницы - для страницы перед
+                ней при прокрутке вверх (after_id тогда не учитывается)
+        
+        Returns:
+            list: Записи Task в порядке ID
+        """
+        try:
+            # Страница выбирается по ID после последней показанной задачи
+            # прямо в подзапросе по тегам
+            if before_id is None:
+                order = "ASC"
+                matching_ids, params = tag_filter_query(names, match_all, "task_id > ?", (after_id,), order, limit)
+            else:
+                order = "DESC"
+                matching_ids, params = tag_filter_query(names, match_all, "task_id < ?", (before_id,), order, limit)
+            
+            cursor = self.task_cursor()
+            cursor.execute(TASK_LIST_QUERY + f" WHERE id IN ({matching_ids}) ORDER BY id {order} LIMIT ?",
+                           (DESCRIPTION_PREVIEW_LENGTH,) + params + (limit,))
+            tasks = cursor.fetchall()
+            if before_id is not None:
+                tasks.reverse()
+            logger.debug(f"По тегам {names} найдено задач на странице: {len(tasks)}")
+            return tasks
+        except Exception as e:
+            logger.error(f"Ошибка при фильтрации задач по тегам: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def refresh_title_norms(self):
+        """
+        Заполнение нормализованных заголовков новых и переименованных задач
+        (пустые title_norm находятся по индексу заголовков, без фиксации транзакции).
+        
+        Returns:
+            int: Количество обновленных задач
+        """
+        self.cursor.execute("SELECT id, title FROM tasks WHERE title_norm IS NULL")
+        rows = [(normalize_text(title), task_id) for task_id, title in self.cursor.fetchall()]
+        self.cursor.executemany("UPDATE tasks SET title_norm = ? WHERE id = ?", rows)
+        if rows:
+            logger.debug(f"Обновлено нормализованных заголовков: {len(rows)}")
+        return len(rows)
+    
+    def find_task_by_title(self, prefix, from_id=0, names=(), match_all=True):
+        """
+        Поиск задачи по первым буквам заголовка (без учета регистра и знаков препинания).
+        
+        Просматриваются только записи индекса с подходящими заголовками,
+        поэтому время не зависит от количества задач в списке.
+        
+        Args:
+            prefix: Введенное начало заголовка
+            from_id: ID задачи, с которой начинается поиск; после последней
+                подходящей задачи поиск продолжается с начала списка
+            names: Теги фильтра списка (пустой список - все задачи)
+            match_all: True - задача должна иметь все теги, False - любой из них
+        
+        Returns:
+            int: ID найденной задачи или None
+        """
+        try:
+            prefix = normalize_text(prefix)
+            if not prefix:
+                return None
+            if self.refresh_title_norms():
+                self.conn.commit()
+            # Все строки с началом prefix лежат в индексе между prefix и prefix
+            # с максимальным символом Юникода
+            params = (prefix, prefix + "\U0010ffff")
+            tag_condition = ""
+            tag_params = ()
+            if names:
+                matching_ids, tag_params = tag_filter_query(names, match_all)
+                tag_condition = f" AND id IN ({matching_ids})"
+            
+            # Сначала ближайшие задачи по ID ("+title_norm" не дает использовать
+            # индекс заголовков): так быстро находится начало, общее для многих задач
+            self.cursor.execute(f"""
+                SELECT MIN(id) FROM tasks
+                WHERE id >= ? AND id < ? AND +title_norm >= ? AND +title_norm < ?{tag_condition}
+            """, (from_id, from_id + TYPE_AHEAD_PROBE_ROWS) + params + tag_params)
+            task_id = self.cursor.fetchone()[0]
+            if task_id is None:
+                # Затем по индексу заголовков; "+id" не дает планировщику заменить
+                # поиск по индексу просмотром задач по ID
+                condition = f"title_norm >= ? AND title_norm < ?{tag_condition}"
+                params += tag_params
+                self.cursor.execute(f"""
+                    SELECT IFNULL((SELECT MIN(id) FROM tasks WHERE {condition} AND +id >= ?),
+                                  (SELECT MIN(id) FROM tasks WHERE {condition}))
+                """, params + (from_id,) + params)
+                task_id = self.cursor.fetchone()[0]
+            logger.debug(f"Поиск задачи по началу заголовка '{prefix}' с {from_id}: {task_id}")
+            return task_id
+        except Exception as e:
+            logger.error(f"Ошибка при поиске задачи по заголовку: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def get_task_description(self, task_id):
+        """
+        Получение полного описания задачи через кэш недавно просмотренных описаний.
+        
+        Args:
+            task_id: ID задачи
+        
+        Returns:
+            str: Полное описание задачи
+        """
+        try:
+            if task_id in self.description_cache:
+                self.description_cache.move_to_end(task_id)
+                return self.description_cache[task_id]
+            
+            self.cursor.execute("""
+                SELECT t.description, z.data
+                FROM tasks AS t
+                LEFT JOIN task_descriptions_z AS z ON z.task_id = t.id
+                WHERE t.id = ?
+            """, (task_id,))
+            row = self.cursor.fetchone()
+            if row and row[1] is not None:
+                description = decompress_description(row[1])
+            else:
+                description = (row[0] if row else None) or ""
+            
+            self.description_cache[task_id] = description
+            if len(self.description_cache) > DESCRIPTION_CACHE_SIZE:
+                self.description_cache.popitem(last=False)
+            logger.debug(f"Загружено описание задачи {task_id}: {len(description)} символов")
+            return description
+        except Exception as e:
+            logger.error(f"Ошибка при получении описания задачи: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_upcoming_due(self, start, end):
+        """
+        Получение невыполненных задач со сроком в заданном интервале.
+        
+        Args:
+            start: Начало интервала (строка в формате DATETIME_FORMAT, включительно)
+            end: Конец интервала (строка в формате DATETIME_FORMAT, не включительно)
+        
+        Returns:
+            list: Кортежи (id, title, due_at) в порядке сроков
+        """
         try:
             self.cursor.execute("""
-                INSERT INTO tasks (title, description, priority, completed, created_at, updated_at)
-                VALUES (?, ?, 1, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """, (title, description))
+                SELECT id, title, due_at
+                FROM tasks
+                WHERE completed = 0 AND due_at >= ? AND due_at < ?
+                ORDER BY due_at
+            """, (start, end))
+            return self.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка при получении сроков задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def count_overdue(self):
+        """Подсчет просроченных невыполненных задач по индексу сроков."""
+        try:
+            now = datetime.now().strftime(DATETIME_FORMAT)
+            self.cursor.execute("""
+                SELECT COUNT(*) FROM tasks
+                WHERE completed = 0 AND due_at < ?
+            """, (now,))
+            return self.cursor.fetchone()[0]
+        except Exception as e:
+            logger.error(f"Ошибка при подсчете просроченных задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def add_task(self, title, description, due_at=None, recurrence=None, parent_id=None):
+        """
+        Добавление новой задачи.
+        
+        Args:
+            title: Заголовок задачи
+            description: Описание задачи
+            due_at: Срок выполнения или None
+            recurrence: RecurrenceRule для повторяющейся задачи или None
+            parent_id: ID родительской задачи для подзадачи или None
+        
+        Returns:
+            int: ID добавленной задачи
+        """
+        try:
+            self.begin_change("Добавление задачи")
+            stored, data, raw_size = split_description(description)
+            self.cursor.execute("""
+                INSERT INTO tasks (title, description, priority, completed, created_at, updated_at, due_at, parent_id)
+                VALUES (?, ?, 1, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?)
+            """, (title, stored, due_at, parent_id))
+            task_id = self.cursor.lastrowid
+            if data is not None:
+                self.write_description_data(task_id, data, raw_size)
+            if recurrence:
+                self.write_recurrence(task_id, recurrence)
+            self.end_change()
             self.conn.commit()
             logger.debug(f"Добавлена задача: {title}")
+            return task_id
         except Exception as e:
             logger.error(f"Ошибка при добавлении задачи: {str(e)}")
             logger.error(traceback.format_exc())
+            self.conn.rollback()
             raise
     
-    def update_task(self, task_id, title, description):
-        """Обновление существующей задачи."""
+    def update_task(self, task_id, title, description, due_at=None, recurrence=None):
+        """
+        Обновление существующей задачи.
+        
+        Args:
+            task_id: ID задачи
+            title: Заголовок задачи
+            description: Описание задачи
+            due_at: Срок выполнения или None
+            recurrence: RecurrenceRule или None, если задача не повторяется
+        """
         try:
+            self.begin_change("Изменение задачи")
+            stored, data, raw_size = split_description(description)
             self.cursor.execute("""
                 UPDATE tasks 
-                SET title=?, description=?, updated_at=CURRENT_TIMESTAMP 
+                SET title=?, description=?, due_at=?, updated_at=CURRENT_TIMESTAMP 
                 WHERE id=?
-            """, (title, description, task_id))
+            """, (title, stored, due_at, task_id))
+            self.write_description_data(task_id, data, raw_size)
+            if recurrence:
+                self.write_recurrence(task_id, recurrence)
+            else:
+                self.cursor.execute("DELETE FROM task_recurrence WHERE task_id = ?", (task_id,))
+            self.end_change()
             self.conn.commit()
+            self.description_cache.pop(task_id, None)
             logger.debug(f"Обновлена задача {task_id}: {title}")
         except Exception as e:
             logger.error(f"Ошибка при обновлении задачи: {str(e)}")
             logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def update_task_field(self, task_id, field, value):
+        """
+        Изменение одного поля одной задачи.
+        
+        Args:
+            task_id: ID задачи
+            field: Название поля из EDITABLE_TASK_FIELDS
+            value: Новое значение
+        
+        Returns:
+            list: Новые повторения повторяющихся задач (ID, заголовок, срок)
+        """
+        try:
+            if field not in EDITABLE_TASK_FIELDS:
+                raise ValueError(f"Поле {field} нельзя изменять")
+            self.begin_change("Изменение задачи")
+            if field == 'description':
+                value, data, raw_size = split_description(value)
+                self.write_description_data(task_id, data, raw_size)
+            self.cursor.execute(f"""
+                UPDATE tasks
+                SET {field}=?, updated_at=CURRENT_TIMESTAMP
+                WHERE id=?
+            """, (value, task_id))
+            created = self.advance_recurrences() if field == 'completed' and value else []
+            self.end_change()
+            self.conn.commit()
+            if field == 'description':
+                self.description_cache.pop(task_id, None)
+            logger.debug(f"Обновлено поле {field} задачи {task_id}")
+            return created
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении поля задачи: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def write_recurrence(self, task_id, rule):
+        """Сохранение правила повторения задачи (без фиксации транзакции)."""
+        self.cursor.execute("""
+            INSERT OR REPLACE INTO task_recurrence (task_id, unit, interval, anchor_at)
+            VALUES (?, ?, ?, ?)
+        """, (task_id, rule.unit, rule.interval, rule.anchor_at))
+    
+    def get_recurrence(self, task_id):
+        """
+        Получение правила повторения задачи.
+        
+        Returns:
+            RecurrenceRule: Правило или None, если задача не повторяется
+        """
+        try:
+            self.cursor.execute("""
+                SELECT unit, interval, anchor_at FROM task_recurrence WHERE task_id = ?
+            """, (task_id,))
+            row = self.cursor.fetchone()
+            return RecurrenceRule(*row) if row else None
+        except Exception as e:
+            logger.error(f"Ошибка при получении правила повторения: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_recurring_series(self):
+        """
+        Получение текущих повторений всех серий для разворачивания по датам.
+        
+        Returns:
+            list: Кортежи (ID задачи, заголовок, текущий срок, RecurrenceRule)
+        """
+        try:
+            self.cursor.execute("""
+                SELECT t.id, t.title, t.due_at, r.unit, r.interval, r.anchor_at
+                FROM task_recurrence AS r
+                JOIN tasks AS t ON t.id = r.task_id
+                WHERE t.completed = 0 AND t.due_at IS NOT NULL
+            """)
+            return [(task_id, title, due_at, RecurrenceRule(unit, interval, anchor_at))
+                    for task_id, title, due_at, unit, interval, anchor_at in self.cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка при получении повторяющихся задач: {str(e)}")
+            logger.error(traceback.format_exc())
             raise
     
+    def advance_recurrences(self):
+        """
+        Создание следующего повторения для выполненных повторяющихся задач
+        (без фиксации транзакции).
+        
+        Создается только одно следующее повторение серии, правило переходит
+        к нему, выполненная задача остается в истории. Пропущенные повторения
+        не создаются: следующий срок берется не раньше текущего момента.
+        
+        Returns:
+            list: Кортежи (ID новой задачи, заголовок, срок)
+        """
+        self.cursor.execute("""
+            SELECT t.id, t.title, t.due_at, r.unit, r.interval, r.anchor_at
+            FROM task_recurrence AS r
+            JOIN tasks AS t ON t.id = r.task_id
+            WHERE t.completed != 0
+        """)
+        created = []
+        now = datetime.now()
+        for task_id, title, due_at, unit, interval, anchor_at in self.cursor.fetchall():
+            rule = RecurrenceRule(unit, interval, anchor_at)
+            current = datetime.strptime(due_at or anchor_at, DATETIME_FORMAT)
+            next_due = rule.next_after(max(current, now))
+            self.cursor.execute("""
+                INSERT INTO tasks (title, description, priority, completed, created_at, updated_at, due_at, parent_id)
+                SELECT title, description, priority, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, parent_id
+                FROM tasks WHERE id = ?
+            """, (next_due, task_id))
+            new_id = self.cursor.lastrowid
+            self.cursor.execute("""
+                INSERT INTO task_descriptions_z (task_id, raw_size, data)
+                SELECT ?, raw_size, data FROM task_descriptions_z WHERE task_id = ?
+            """, (new_id, task_id))
+            self.cursor.execute("""
+                INSERT INTO task_tags (task_id, tag_id)
+                SELECT ?, tag_id FROM task_tags WHERE task_id = ?
+            """, (new_id, task_id))
+            self.cursor.execute("UPDATE task_recurrence SET task_id = ? WHERE task_id = ?", (new_id, task_id))
+            created.append((new_id, title, next_due))
+            logger.debug(f"Создано следующее повторение задачи {task_id}: {new_id} на {next_due}")
+        return created
+    
+    def selection_filter(self, selection):
+        """
+        Построение условия SQL для выделения задач без ограничения на число параметров.
+        
+        Args:
+            selection: TaskSelection или список ID задач
+        
+        Returns:
+            tuple: (условие по tasks.id, параметры)
+        """
+        if isinstance(selection, TaskSelection):
+            if selection.predicate is not None:
+                return TASK_PREDICATES[selection.predicate][0], ()
+            # Диапазоны передаются одним параметром и разворачиваются поиском по первичному ключу
+            return """tasks.id IN (
+                SELECT t.id FROM json_each(?) AS r
+                JOIN tasks AS t ON t.id BETWEEN json_extract(r.value, '$[0]') AND json_extract(r.value, '$[1]')
+            )""", (json.dumps(selection.id_ranges),)
+        return "tasks.id IN (SELECT value FROM json_each(?))", (json.dumps(list(selection)),)
+    
     def delete_tasks(self, task_ids):
-        """Удаление задач по их ID."""
+        """
+        Удаление задач.
+        
+        Args:
+            task_ids: TaskSelection или список ID задач
+        """
         try:
-            placeholders = ",".join("?" * len(task_ids))
+            self.begin_change("Удаление задач")
+            condition, params = self.selection_filter(task_ids)
             self.cursor.execute(f"""
                 DELETE FROM tasks 
-                WHERE id IN ({placeholders})
-            """, task_ids)
+                WHERE {condition}
+            """, params)
+            deleted = self.cursor.rowcount
+            # Теги без задач больше не показываются в фильтре
+            self.cursor.execute("DELETE FROM tags WHERE task_count <= 0")
+            self.end_change()
             self.conn.commit()
-            logger.debug(f"Удалено задач: {len(task_ids)}")
+            self.description_cache.clear()
+            logger.debug(f"Удалено задач: {deleted}")
         except Exception as e:
             logger.error(f"Ошибка при удалении задач: {str(e)}")
             logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def get_children(self, parent_id, after_id=0, limit=TREE_PAGE_SIZE):
+        """
+        Получение страницы дочерних задач по индексу idx_tasks_parent.
+        
+        Args:
+            parent_id: ID родительской задачи или None для задач верхнего уровня
+            after_id: ID последней задачи предыдущей страницы
+            limit: Размер страницы
+        
+        Returns:
+            list: Кортежи (id, title, priority, completed, has_children) по возрастанию ID
+        """
+        try:
+            self.cursor.execute("""
+                SELECT id, title, priority, completed,
+                       EXISTS (SELECT 1 FROM tasks AS c WHERE c.parent_id = tasks.id) AS has_children
+                FROM tasks
+                WHERE parent_id IS ? AND id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (parent_id, after_id, limit))
+            return self.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка при получении подзадач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def get_subtree_progress(self, task_id):
+        """
+        Подсчет выполненных потомков задачи рекурсивным запросом.
+        
+        Returns:
+            tuple: (выполнено, всего потомков)
+        """
+        try:
+            self.cursor.execute(SUBTREE_CTE + """
+                SELECT IFNULL(SUM(tasks.completed != 0), 0), COUNT(*)
+                FROM subtree JOIN tasks ON tasks.id = subtree.id
+                WHERE subtree.id != ?
+            """, (task_id, task_id))
+            return self.cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Ошибка при подсчете прогресса поддерева: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def complete_subtree(self, task_id, completed=True):
+        """
+        Изменение статуса задачи и всех ее потомков.
+        
+        Returns:
+            list: Новые повторения повторяющихся задач (ID, заголовок, срок)
+        """
+        try:
+            self.begin_change("Изменение статуса ветки")
+            self.begin_bulk_update(f"id IN ({SUBTREE_CTE} SELECT id FROM subtree) AND completed != ?",
+                                   (task_id, completed))
+            self.cursor.execute("""
+                UPDATE tasks
+                SET completed = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id IN (SELECT id FROM temp.bulk_tasks)
+            """, (completed,))
+            logger.debug(f"Изменен статус {self.cursor.rowcount} задач поддерева {task_id}")
+            self.end_bulk_update()
+            created = self.advance_recurrences() if completed else []
+            self.end_change()
+            self.conn.commit()
+            return created
+        except Exception as e:
+            logger.error(f"Ошибка при изменении статуса поддерева: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def delete_subtree(self, task_id):
+        """
+        Удаление задачи вместе со всеми потомками.
+        
+        Returns:
+            int: Количество удаленных задач
+        """
+        try:
+            self.begin_change("Удаление ветки")
+            self.cursor.execute(SUBTREE_CTE + """
+                DELETE FROM tasks WHERE id IN (SELECT id FROM subtree)
+            """, (task_id,))
+            # rowcount не заполняется для запросов, начинающихся с WITH
+            self.cursor.execute("SELECT changes()")
+            deleted = self.cursor.fetchone()[0]
+            self.cursor.execute("DELETE FROM tags WHERE task_count <= 0")
+            self.end_change()
+            self.conn.commit()
+            self.description_cache.clear()
+            logger.debug(f"Удалено задач поддерева {task_id}: {deleted}")
+            return deleted
+        except Exception as e:
+            logger.error(f"Ошибка при удалении поддерева: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
+            raise
+    
+    def move_task(self, task_id, new_parent_id):
+        """
+        Перенос задачи вместе с поддеревом к другой родительской задаче.
+        
+        Args:
+            task_id: ID переносимой задачи
+            new_parent_id: ID новой родительской задачи или None для верхнего уровня
+        """
+        try:
+            if new_parent_id is not None:
+                self.cursor.execute("SELECT 1 FROM tasks WHERE id = ?", (new_parent_id,))
+                if not self.cursor.fetchone():
+                    raise ValueError(f"Задача {new_parent_id} не найдена")
+                # Задачу нельзя перенести внутрь ее собственного поддерева
+                self.cursor.execute(SUBTREE_CTE + """
+                    SELECT 1 FROM subtree WHERE id = ?
+                """, (task_id, new_parent_id))
+                if self.cursor.fetchone():
+                    raise ValueError("Нельзя перенести задачу в ее собственную подзадачу")
+            self.begin_change("Перенос задачи")
+            self.cursor.execute("""
+                UPDATE tasks SET parent_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+            """, (new_parent_id, task_id))
+            self.end_change()
+            self.conn.commit()
+            logger.debug(f"Задача {task_id} перенесена к {new_parent_id}")
+        except Exception as e:
+            logger.error(f"Ошибка при переносе задачи: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.conn.rollback()
             raise
     
     def update_task_priority(self, task_ids, new_priority):
-        """Изменение приоритета задач."""
+        """
+        Изменение приоритета задач.
+        
+        Args:
+            task_ids: TaskSelection или список ID задач
+            new_priority: Новый приоритет
+        """
         try:
-            placeholders = ",".join("?" * len(task_ids))
-            self.cursor.execute(f"""
+            self.begin_change("Изменение приоритета")
+            condition, params = self.selection_filter(task_ids)
+            self.begin_bulk_update(condition, params)
+            self.cursor.execute("""
                 UPDATE tasks 
                 SET priority = ?, updated_at = CURRENT_TIMESTAMP 
-                WHERE id IN ({placeholders})
-            """, [new_priority] + task_ids)
+                WHERE id IN (SELECT id FROM temp.bulk_tasks)
+            """, (new_priority,))
+            logger.debug(f"Обновлен приоритет {self.cursor.rowcount} задач")
+            self.end_bulk_update()
+            self.end_change()
             self.conn.commit()
-            logger.debug(f"Обновлен приоритет {len(task_ids)} задач")
         except Exception as e:
             logger.error(f"Ошибка при изменении приоритета задач: {str(e)}")
             logger.error(traceback.format_exc())
+            self.conn.rollback()
             raise
     
     def toggle_task_status(self, task_ids, new_status):
-        """Изменение статуса выполнения задач."""
+        """
+        Изменение статуса выполнения задач.
+        
+        Args:
+            task_ids: TaskSelection или список ID задач
+            new_status: Новый статус выполнения
+        
+        Returns:
+            list: Новые повторения повторяющихся задач (ID, заголовок, срок)
+        """
         try:
-            placeholders = ",".join("?" * len(task_ids))
-            self.cursor.execute(f"""
+            self.begin_change("Изменение статуса")
+            condition, params = self.selection_filter(task_ids)
+            self.begin_bulk_update(condition, params)
+            self.cursor.execute("""
                 UPDATE tasks 
                 SET completed = ?, updated_at = CURRENT_TIMESTAMP 
-                WHERE id IN ({placeholders})
-            """, [new_status] + task_ids)
+                WHERE id IN (SELECT id FROM temp.bulk_tasks)
+            """, (new_status,))
+            logger.debug(f"Обновлен статус {self.cursor.rowcount} задач")
+            self.end_bulk_update()
+            created = self.advance_recurrences() if new_status else []
+            self.end_change()
             self.conn.commit()
-            logger.debug(f"Обновлен статус {len(task_ids)} задач")
+            return created
         except Exception as e:
             logger.error(f"Ошибка при изменении статуса задач: {str(e)}")
             logger.error(traceback.format_exc())
+            self.conn.rollback()
             raise
     
+    def invalidate_caches(self):
+        """Сброс кэшей после замены содержимого базы (например, при восстановлении или отмене)."""
+        self.description_cache.clear()
+        logger.debug("Кэши базы данных сброшены")
+    
     def close(self):
         """Закрытие соединения с базой данных."""
         try:
@@ -165,44 +2950,19 @@ class DatabaseManager:
     def clear_tasks(self):
         """Очистка всех задач из базы данных."""
         try:
+            self.begin_change("Очистка списка")
             # Удаляем все задачи
             self.cursor.execute("DELETE FROM tasks")
             
             # Сбрасываем автоинкремент ID
             self.cursor.execute("DELETE FROM sqlite_sequence WHERE name='tasks'")
             
+            self.end_change()
             self.conn.commit()
+            self.description_cache.clear()
             logger.debug("Все задачи удалены, счетчик ID сброшен")
         except Exception as e:
             logger.error(f"Ошибка при очистке задач: {str(e)}")
             logger.error(traceback.format_exc())
             self.conn.rollback()
-            raise 
-    
-    def reorder_tasks(self, tasks):
-        """Обновление порядка задач в базе данных."""
-        try:
-            # Начинаем транзакцию
-            self.conn.execute("BEGIN TRANSACTION")
-            
-            # Обновляем данные для каждой задачи
-            for task in tasks:
-                self.cursor.execute("""
-                    UPDATE tasks 
-                    SET title = ?,
-                        description = ?,
-                        priority = ?,
-                        completed = ?,
-                        updated_at = CURRENT_TIMESTAMP 
-                    WHERE id = ?
-                """, (task[1], task[2], task[3], task[4], task[0]))
-            
-            # Завершаем транзакцию
-            self.conn.commit()
-            logger.debug("Порядок и данные задач обновлены")
-            
-        except Exception as e:
-            logger.error(f"Ошибка при обновлении порядка задач: {str(e)}")
-            logger.error(traceback.format_exc())
-            self.conn.rollback()
-            raise 
\ No newline at end of file
+            raise
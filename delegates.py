@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Делегаты для редактирования задач прямо в таблице.
+Каждый делегат проверяет введенное значение и сообщает об изменении
+одного поля одной задачи; в модель таблицы значение не записывается,
+строка обновляется из базы после сохранения.
+"""
+
+import logging
+import traceback
+from PyQt6.QtWidgets import QStyledItemDelegate, QLineEdit, QPlainTextEdit, QSpinBox, QComboBox
+from PyQt6.QtCore import Qt, pyqtSignal
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Количество строк, видимых в редакторе описания
+DESCRIPTION_EDITOR_LINES = 5
+
+# Подписи статусов задачи
+STATUS_LABELS = ("В работе", "Выполнено")
+
+class TaskFieldDelegate(QStyledItemDelegate):
+    """Базовый делегат для редактирования одного поля задачи."""
+
+    # Сигнал об изменении поля: (строка, ID задачи, поле, новое значение)
+    task_edited = pyqtSignal(int, int, str, object)
+
+    # Поле задачи, которое редактирует делегат
+    field = None
+
+    def __init__(self, db_manager, parent=None):
+        """
+        Инициализация делегата.
+
+        Args:
+            db_manager: Менеджер базы данных
+            parent: Родительский объект
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+
+    def task_id(self, index):
+        """ID задачи строки (хранится в данных первой ячейки)."""
+        return index.sibling(index.row(), 0).data(Qt.ItemDataRole.UserRole)
+
+    def current_value(self, index):
+        """Текущее значение поля задачи."""
+        return index.data()
+
+    def user_property(self, editor):
+        """Имя USER-свойства редактора (text у QLineEdit, plainText у QPlainTextEdit, value у QSpinBox)."""
+        prop = editor.metaObject().userProperty()
+        if not prop.isValid():
+            raise TypeError(f"У редактора {type(editor).__name__} нет USER-свойства")
+        return prop.name()
+
+    def set_editor_value(self, editor, value):
+        """Заполнение редактора значением (по умолчанию, как в QItemDelegate, через USER-свойство)."""
+        editor.setProperty(self.user_property(editor), value)
+
+    def editor_value(self, editor):
+        """Значение, введенное в редакторе (по умолчанию - значение USER-свойства)."""
+        return editor.property(self.user_property(editor))
+
+    def validate(self, value):
+        """
+        Проверка введенного значения.
+
+        Returns:
+            Нормализованное значение или None, если значение недопустимо
+        """
+        return value
+
+    def setEditorData(self, editor, index):
+        """Заполнение редактора текущим значением поля."""
+        try:
+            editor.original_value = self.current_value(index)
+            self.set_editor_value(editor, editor.original_value)
+        except Exception as e:
+            logger.error(f"Ошибка при заполнении редактора: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def setModelData(self, editor, model, index):
+        """Проверка значения и сообщение об изменении поля задачи."""
+        try:
+            value = self.validate(self.editor_value(editor))
+            if value is None:
+                logger.debug(f"Недопустимое значение поля {self.field} отклонено")
+                return
+            if value == editor.original_value:
+                return
+            self.task_edited.emit(index.row(), self.task_id(index), self.field, value)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении значения редактора: {str(e)}")
+            logger.error(traceback.format_exc())
+
+class TitleDelegate(TaskFieldDelegate):
+    """Делегат для редактирования заголовка задачи."""
+
+    field = 'title'
+
+    def createEditor(self, parent, option, index):
+        return QLineEdit(parent)
+
+    def validate(self, value):
+        # Заголовок задачи не может быть пустым
+        value = value.strip()
+        return value or None
+
+class DescriptionDelegate(TaskFieldDelegate):
+    """Делегат для многострочного редактирования описания задачи."""
+
+    field = 'description'
+
+    def createEditor(self, parent, option, index):
+        editor = QPlainTextEdit(parent)
+        editor.setTabChangesFocus(True)
+        return editor
+
+    def current_value(self, index):
+        # В таблице только превью, поэтому редактируется полное описание из базы
+        return self.db_manager.get_task_description(self.task_id(index))
+
+    def validate(self, value):
+        return value.strip()
+
+    def updateEditorGeometry(self, editor, option, index):
+        """Редактор описания выше строки таблицы, чтобы было видно несколько строк."""
+        rect = option.rect
+        height = editor.fontMetrics().lineSpacing() * DESCRIPTION_EDITOR_LINES + 2 * editor.frameWidth() + 8
+        rect.setHeight(max(rect.height(), height))
+        editor.setGeometry(rect)
+
+class PriorityDelegate(TaskFieldDelegate):
+    """Делегат для редактирования приоритета задачи."""
+
+    field = 'priority'
+
+    def createEditor(self, parent, option, index):
+        editor = QSpinBox(parent)
+        editor.setRange(1, 4)
+        return editor
+
+    def current_value(self, index):
+        return int(index.data())
+
+    def set_editor_value(self, editor, value):
+        editor.setValue(value)
+
+    def editor_value(self, editor):
+        editor.interpretText()
+        return editor.value()
+
+    def validate(self, value):
+        return value if 1 <= value <= 4 else None
+
+class StatusDelegate(TaskFieldDelegate):
+    """Делегат для изменения статуса задачи."""
+
+    field = 'completed'
+
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        editor.addItems(STATUS_LABELS)
+        return editor
+
+    def current_value(self, index):
+        return index.data() == STATUS_LABELS[1]
+
+    def set_editor_value(self, editor, value):
+        editor.setCurrentIndex(1 if value else 0)
+
+    def editor_value(self, editor):
+        return editor.currentIndex() == 1
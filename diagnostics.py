@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Средства диагностики производительности.
+Сторожевой таймер зависаний интерфейса и профилировщик действий пользователя.
+Включаются переменными окружения TASKMANAGER_WATCHDOG и TASKMANAGER_PROFILE
+или из меню "Сервис"; в выключенном состоянии почти ничего не стоят.
+"""
+
+import os
+import sys
+import inspect
+import logging
+import cProfile
+import pstats
+import threading
+import traceback
+import tracemalloc
+from io import StringIO
+from datetime import datetime
+from functools import wraps
+from time import monotonic, perf_counter
+from PyQt6.QtCore import QObject, QTimer
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Каталог для отчетов диагностики
+DIAGNOSTICS_DIR = "diagnostics"
+
+# Интервал проверочного таймера в цикле событий, мс
+HEARTBEAT_INTERVAL = 100
+
+# Порог, после которого интерфейс считается зависшим, с
+STALL_THRESHOLD = 0.5
+
+# Количество строк в отчете профилировщика
+PROFILE_REPORT_LINES = 40
+
+def env_flag(name):
+    """Проверка, что переменная окружения включает флаг."""
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+def report_path(name):
+    """Путь к новому файлу отчета в каталоге диагностики."""
+    os.makedirs(DIAGNOSTICS_DIR, exist_ok=True)
+    return os.path.join(DIAGNOSTICS_DIR, f"{name}-{datetime.now():%Y%m%d-%H%M%S-%f}.txt")
+
+class StallWatchdog(QObject):
+    """
+    Сторожевой таймер зависаний интерфейса.
+
+    Таймер в цикле событий отмечает время каждого срабатывания, а фоновый
+    поток проверяет, давно ли была отметка. Если основной поток занят дольше
+    порога, фоновый поток снимает его стек и сохраняет в журнал.
+    """
+
+    def __init__(self, parent=None, threshold=STALL_THRESHOLD):
+        """
+        Инициализация сторожевого таймера.
+
+        Args:
+            parent: Родительский объект
+            threshold: Порог зависания в секундах
+        """
+        super().__init__(parent)
+        self.threshold = threshold
+        self.last_beat = monotonic()
+        self.max_latency = 0.0
+        self.stall_count = 0
+        self.reported = False
+        self.main_thread_id = threading.main_thread().ident
+        self.stop_event = None
+        self.thread = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(HEARTBEAT_INTERVAL)
+        self.timer.timeout.connect(self.heartbeat)
+
+    def is_running(self):
+        """Проверка, включен ли сторожевой таймер."""
+        return self.timer.isActive()
+
+    def start(self):
+        """Включение сторожевого таймера."""
+        if self.is_running():
+            return
+        self.last_beat = monotonic()
+        self.reported = False
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.watch, args=(self.stop_event,),
+                                       name="stall-watchdog", daemon=True)
+        self.thread.start()
+        self.timer.start()
+        logger.debug(f"Сторожевой таймер зависаний включен, порог {self.threshold} с")
+
+    def stop(self):
+        """Выключение сторожевого таймера."""
+        self.timer.stop()
+        if self.stop_event is not None:
+            self.stop_event.set()
+            self.stop_event = None
+            self.thread = None
+            logger.debug(f"Сторожевой таймер выключен, максимальная задержка цикла событий "
+                         f"{self.max_latency * 1000:.0f} мс, зависаний: {self.stall_count}")
+
+    def heartbeat(self):
+        """Отметка о том, что цикл событий обрабатывает события."""
+        now = monotonic()
+        latency = now - self.last_beat - HEARTBEAT_INTERVAL / 1000
+        self.last_beat = now
+        if latency > self.max_latency:
+            self.max_latency = latency
+        if self.reported:
+            self.reported = False
+            logger.warning(f"Интерфейс не отвечал {latency + HEARTBEAT_INTERVAL / 1000:.2f} с")
+
+    def watch(self, stop_event):
+        """Цикл фонового потока, проверяющего отметки основного потока."""
+        while not stop_event.wait(self.threshold / 2):
+            blocked = monotonic() - self.last_beat
+            if blocked > self.threshold and not self.reported:
+                self.reported = True
+                self.stall_count += 1
+                self.report_stall(blocked)
+
+    def report_stall(self, blocked):
+        """Сохранение стека основного потока во время зависания."""
+        try:
+            frame = sys._current_frames().get(self.main_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "стек недоступен\n"
+            logger.warning(f"Интерфейс занят уже {blocked:.2f} с, стек основного потока:\n{stack}")
+            with open(report_path("stall"), "w", encoding="utf-8") as report:
+                report.write(f"Интерфейс занят {blocked:.2f} с\n\n{stack}")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении стека зависания: {str(e)}")
+            logger.error(traceback.format_exc())
+
+class ActionProfiler:
+    """
+    Профилировщик действий пользователя.
+
+    Когда включен, выполняет отмеченные декоратором profiled действия под
+    cProfile и tracemalloc и пишет отчет в каталог диагностики.
+    """
+
+    def __init__(self):
+        """Инициализация профилировщика."""
+        self.enabled = env_flag("TASKMANAGER_PROFILE")
+        # Признак выполняемого профилирования: вложенные действия не профилируются отдельно
+        self.active = False
+
+    def run(self, name, func, *args):
+        """
+        Выполнение действия под профилировщиком.
+
+        Args:
+            name: Название действия для отчета
+            func: Функция действия
+            args: Аргументы функции
+
+        Returns:
+            Результат функции
+        """
+        self.active = True
+        tracing = not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        profile = cProfile.Profile()
+        start = perf_counter()
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            elapsed = perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if tracing:
+                tracemalloc.stop()
+            self.active = False
+            self.write_report(name, elapsed, peak, profile, snapshot)
+
+    def write_report(self, name, elapsed, peak, profile, snapshot):
+        """Запись отчета о профилировании действия."""
+        try:
+            stream = StringIO()
+            stream.write(f"Действие: {name}\nВремя: {elapsed * 1000:.1f} мс\n"
+                         f"Пиковая память: {peak / 1024:.1f} КБ\n\n")
+            pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(PROFILE_REPORT_LINES)
+            stream.write("\nВыделения памяти по строкам:\n")
+            for stat in snapshot.statistics("lineno")[:PROFILE_REPORT_LINES // 2]:
+                stream.write(f"{stat}\n")
+
+            path = report_path(f"profile-{name}")
+            with open(path, "w", encoding="utf-8") as report:
+                report.write(stream.getvalue())
+            logger.debug(f"Профиль действия {name} ({elapsed * 1000:.1f} мс) сохранен: {path}")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении профиля: {str(e)}")
+            logger.error(traceback.format_exc())
+
+# Общий профилировщик действий приложения
+profiler = ActionProfiler()
+
+def profiled(func):
+    """
+    Декоратор действия, которое можно профилировать.
+
+    Лишние аргументы сигналов Qt (например, checked у QAction.triggered)
+    отбрасываются, как это делает PyQt для обычных слотов.
+    """
+    parameters = inspect.signature(func).parameters.values()
+    if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+        max_args = None
+    else:
+        max_args = sum(1 for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+
+    @wraps(func)
+    def wrapper(*args):
+        if max_args is not None:
+            args = args[:max_args]
+        if not profiler.enabled or profiler.active:
+            return func(*args)
+        return profiler.run(func.__name__, func, *args)
+    return wrapper
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Поиск похожих задач (почти-дубликатов).
+Текст задачи (заголовок и начало описания) разбивается на символьные
+шинглы, по ним считается MinHash-подпись (одна хеш-функция, значения
+раскладываются по ячейкам подписи), а подпись делится на полосы LSH. Ключи полос хранятся в базе (таблица task_lsh_buckets);
+триггеры ставят новые и измененные задачи в очередь, ключи для которой
+вычисляются перед поиском, поэтому для проверки новой задачи достаточно
+найти задачи с общими ключами и сравнить только их.
+Отчет по всей базе сравнивает задачи внутри общих корзин в пуле процессов.
+
+Запуск отчета из командной строки:
+    python duplicate_index.py tasks.db --threshold 0.7 --workers 4
+"""
+
+import os
+import re
+import sys
+import json
+import zlib
+import sqlite3
+import hashlib
+import logging
+import argparse
+import traceback
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.request import pathname2url
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Длина шингла в символах
+SHINGLE_SIZE = 3
+
+# Количество символов описания, участвующих в сравнении (совпадает с длиной
+# превью, поэтому начало описания всегда есть в tasks.description)
+DUPLICATE_DESCRIPTION_LENGTH = 200
+
+# Количество полос LSH и значений MinHash в полосе. Задачи со сходством 0.7
+# попадают в общую корзину с вероятностью ~0.89, со сходством 0.9 - почти всегда
+LSH_BANDS = 8
+LSH_ROWS = 4
+MINHASH_SIZE = LSH_BANDS * LSH_ROWS
+
+# Порог сходства (коэффициент Жаккара по шинглам) для предупреждения о дубликате
+DUPLICATE_THRESHOLD = 0.7
+
+# Максимальное количество кандидатов, сравниваемых при проверке одной задачи
+DUPLICATE_CANDIDATE_LIMIT = 20
+
+# Количество корзин, передаваемых одному процессу при построении отчета
+DUPLICATE_REPORT_CHUNK = 2000
+
+# Максимальное количество разных задач внутри корзины, с которыми сравнивается
+# очередная задача (защита от квадратичного времени для огромных корзин)
+MAX_BUCKET_REPRESENTATIVES = 20
+
+# 32-битный хеш шингла: старшие 5 бит - номер ячейки подписи (MINHASH_SIZE = 32),
+# остальные - значение
+MINHASH_VALUE_BITS = 27
+MINHASH_EMPTY = 1 << MINHASH_VALUE_BITS
+
+# Нечетный множитель для перемешивания битов crc32 (золотое сечение, 2^32 / phi)
+MINHASH_MULTIPLIER = 0x9E3779B1
+
+def normalize_text(text):
+    """Текст в нижнем регистре из слов, разделенных одним пробелом."""
+    text = (text or "").casefold().replace("ё", "е")
+    return " ".join(re.findall(r"\w+", text))
+
+def task_text(title, description):
+    """Сравниваемый текст задачи: заголовок и начало описания."""
+    return normalize_text(f"{title or ''} {(description or '')[:DUPLICATE_DESCRIPTION_LENGTH]}")
+
+def shingles(title, description):
+    """Множество шинглов текста задачи."""
+    text = task_text(title, description)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def similarity(first, second):
+    """Коэффициент Жаккара двух множеств шинглов."""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+def minhash(shingle_set):
+    """
+    MinHash-подпись непустого множества шинглов (MINHASH_SIZE значений).
+
+    Каждый шингл хешируется один раз и попадает в одну ячейку подписи, где
+    сохраняется минимальное значение. Пустые ячейки заполняются значением
+    ближайшей заполненной ячейки справа со сдвигом на расстояние до нее,
+    поэтому у одинаковых множеств подписи совпадают и для коротких текстов.
+    """
+    signature = [MINHASH_EMPTY] * MINHASH_SIZE
+    for shingle in shingle_set:
+        # crc32 не зависит от запуска (в отличие от hash() для строк)
+        value = (zlib.crc32(shingle.encode("utf-8")) * MINHASH_MULTIPLIER) & 0xFFFFFFFF
+        cell = value >> MINHASH_VALUE_BITS
+        value &= MINHASH_EMPTY - 1
+        if value < signature[cell]:
+            signature[cell] = value
+    if MINHASH_EMPTY in signature:
+        filled = list(signature)
+        for cell in range(MINHASH_SIZE):
+            if filled[cell] == MINHASH_EMPTY:
+                for distance in range(1, MINHASH_SIZE):
+                    value = filled[(cell + distance) % MINHASH_SIZE]
+                    if value != MINHASH_EMPTY:
+                        signature[cell] = value + distance * MINHASH_EMPTY
+                        break
+    return signature
+
+def lsh_buckets(title, description):
+    """
+    Ключи корзин LSH задачи: по одному на полосу подписи.
+
+    Returns:
+        list: 64-битные ключи (пустой список для задачи без текста)
+    """
+    shingle_set = shingles(title, description)
+    if not shingle_set:
+        return []
+    signature = minhash(shingle_set)
+    keys = []
+    for band in range(LSH_BANDS):
+        values = array('I', [band] + signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+        digest = hashlib.blake2b(values.tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+def index_rows(rows):
+    """
+    Строки таблицы task_lsh_buckets для пачки задач (выполняется в пуле процессов).
+
+    Args:
+        rows: Кортежи (ID задачи, заголовок, описание)
+
+    Returns:
+        list: Кортежи (ключ корзины, ID задачи)
+    """
+    return [(key, task_id) for task_id, title, description in rows
+            for key in lsh_buckets(title, description)]
+
+def connect_read_only(db_path):
+    """Открытие базы только для чтения (для процессов отчета)."""
+    return sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+
+def load_shingles(conn, task_ids):
+    """Шинглы задач по списку ID."""
+    result = {}
+    task_ids = list(task_ids)
+    for start in range(0, len(task_ids), 500):
+        rows = conn.execute("""
+            SELECT id, title, substr(IFNULL(description, ''), 1, ?)
+            FROM tasks
+            WHERE id IN (SELECT value FROM json_each(?))
+        """, (DUPLICATE_DESCRIPTION_LENGTH, json.dumps(task_ids[start:start + 500])))
+        for task_id, title, description in rows:
+            result[task_id] = shingles(title, description)
+    return result
+
+def compare_buckets(db_path, buckets, threshold=DUPLICATE_THRESHOLD):
+    """
+    Сравнение задач внутри корзин (выполняется в пуле процессов).
+
+    Каждая задача корзины сравнивается с уже встреченными в ней непохожими
+    задачами; похожие пары объединяются в группы вызывающей стороной.
+
+    Args:
+        db_path: Путь к файлу базы данных (открывается только для чтения)
+        buckets: Списки ID задач с общим ключом корзины
+        threshold: Порог сходства
+
+    Returns:
+        list: Пары (ID задачи, ID похожей задачи)
+    """
+    conn = connect_read_only(db_path)
+    try:
+        shingle_sets = load_shingles(conn, {task_id for bucket in buckets for task_id in bucket})
+    finally:
+        conn.close()
+    pairs = []
+    for bucket in buckets:
+        representatives = []
+        for task_id in bucket:
+            current = shingle_sets.get(task_id)
+            if not current:
+                continue
+            for other_id, other in representatives:
+                if similarity(current, other) >= threshold:
+                    pairs.append((other_id, task_id))
+                    break
+            else:
+                if len(representatives) < MAX_BUCKET_REPRESENTATIVES:
+                    representatives.append((task_id, current))
+    return pairs
+
+def iter_candidate_buckets(db_path):
+    """Корзины с несколькими задачами (одинаковые наборы задач - один раз)."""
+    conn = connect_read_only(db_path)
+    try:
+        seen = set()
+        for (members,) in conn.execute("""
+            SELECT group_concat(task_id)
+            FROM task_lsh_buckets
+            GROUP BY bucket
+            HAVING COUNT(*) > 1
+        """):
+            # Одинаковые задачи совпадают во всех полосах - сравниваем их один раз
+            bucket = tuple(sorted(int(task_id) for task_id in members.split(",")))
+            if bucket not in seen:
+                seen.add(bucket)
+                yield bucket
+    finally:
+        conn.close()
+
+def find_duplicate_groups(db_path, threshold=DUPLICATE_THRESHOLD, workers=None):
+    """
+    Отчет о дубликатах по всей базе.
+
+    Корзины с несколькими задачами берутся из task_lsh_buckets, задачи
+    внутри корзин сравниваются в пуле процессов, похожие пары
+    объединяются в группы.
+
+    Args:
+        db_path: Путь к файлу базы данных
+        threshold: Порог сходства
+        workers: Количество процессов (по умолчанию - по числу процессоров)
+
+    Returns:
+        list: Группы ID похожих задач (по убыванию размера группы)
+    """
+    try:
+        parent = {}
+
+        def find(task_id):
+            root = task_id
+            while parent[root] != root:
+                root = parent[root]
+            while task_id != root:
+                parent[task_id], task_id = root, parent[task_id]
+            return root
+
+        def merge(pairs):
+            for first, second in pairs:
+                parent.setdefault(first, first)
+                parent.setdefault(second, second)
+                first_root, second_root = find(first), find(second)
+                if first_root != second_root:
+                    parent[max(first_root, second_root)] = min(first_root, second_root)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Ограничиваем количество задач в очереди, чтобы не держать в памяти все корзины
+            window = (workers or os.cpu_count() or 1) * 2
+            pending = deque()
+            chunk = []
+            for bucket in iter_candidate_buckets(db_path):
+                chunk.append(bucket)
+                if len(chunk) == DUPLICATE_REPORT_CHUNK:
+                    pending.append(executor.submit(compare_buckets, db_path, chunk, threshold))
+                    chunk = []
+                    if len(pending) >= window:
+                        merge(pending.popleft().result())
+            if chunk:
+                pending.append(executor.submit(compare_buckets, db_path, chunk, threshold))
+            while pending:
+                merge(pending.popleft().result())
+
+        groups = {}
+        for task_id in parent:
+            groups.setdefault(find(task_id), []).append(task_id)
+        result = sorted((sorted(group) for group in groups.values()), key=lambda group: (-len(group), group[0]))
+        logger.debug(f"Найдено групп похожих задач: {len(result)}")
+        return result
+    except Exception as e:
+        logger.error(f"Ошибка при поиске дубликатов: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def main():
+    """Отчет о дубликатах из командной строки."""
+    from database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Отчет о похожих задачах")
+    parser.add_argument("db_path", nargs="?", default="tasks.db", help="файл базы данных")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD, help="порог сходства (0-1)")
+    parser.add_argument("--workers", type=int, default=None, help="количество процессов")
+    args = parser.parse_args()
+
+    # Открытие базы строит индекс, если его еще нет
+    db_manager = DatabaseManager(args.db_path)
+    try:
+        db_manager.refresh_duplicate_index()
+        groups = find_duplicate_groups(args.db_path, args.threshold, args.workers)
+        titles = db_manager.get_task_titles([task_id for group in groups for task_id in group])
+    finally:
+        db_manager.close()
+
+    print(f"Групп похожих задач: {len(groups)}")
+    for number, group in enumerate(groups, 1):
+        print(f"\n{number}. Задач: {len(group)}")
+        for task_id in group:
+            print(f"   [{task_id}] {titles.get(task_id, '')}")
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
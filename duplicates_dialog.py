@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Диалоговое окно отчета о похожих задачах.
+Двойной щелчок по задаче выделяет ее в списке главного окна.
+"""
+
+import logging
+import traceback
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                            QTreeWidget, QTreeWidgetItem)
+from PyQt6.QtCore import Qt, pyqtSignal
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+class DuplicatesDialog(QDialog):
+    """Диалоговое окно отчета о похожих задачах."""
+
+    # Сигнал о выборе задачи: ID задачи
+    task_chosen = pyqtSignal(int)
+
+    def __init__(self, groups, titles, parent=None):
+        """
+        Инициализация диалогового окна.
+
+        Args:
+            groups: Группы ID похожих задач
+            titles: Заголовки задач (ID -> заголовок)
+            parent: Родительский виджет
+        """
+        try:
+            logger.debug("Инициализация диалога похожих задач")
+            super().__init__(parent)
+
+            # Настройка окна
+            self.setWindowTitle("Похожие задачи")
+            self.setMinimumSize(500, 400)
+
+            # Создание виджетов
+            self.setup_ui()
+            self.show_groups(groups, titles)
+        except Exception as e:
+            logger.error(f"Ошибка в инициализации диалога похожих задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса."""
+        try:
+            layout = QVBoxLayout(self)
+
+            self.summaryLabel = QLabel()
+            layout.addWidget(self.summaryLabel)
+
+            # Группы похожих задач
+            self.groupTree = QTreeWidget()
+            self.groupTree.setHeaderLabels(["Задача", "ID"])
+            self.groupTree.setColumnWidth(0, 380)
+            layout.addWidget(self.groupTree)
+
+            # Кнопки
+            button_layout = QHBoxLayout()
+            self.closeButton = QPushButton("Закрыть")
+            button_layout.addStretch()
+            button_layout.addWidget(self.closeButton)
+            layout.addLayout(button_layout)
+
+            self.closeButton.clicked.connect(self.accept)
+            self.groupTree.itemDoubleClicked.connect(self.choose_task)
+
+            logger.debug("UI диалога похожих задач настроен")
+        except Exception as e:
+            logger.error(f"Ошибка при настройке UI: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def show_groups(self, groups, titles):
+        """Заполнение дерева групп."""
+        self.summaryLabel.setText(f"Групп похожих задач: {len(groups)}, "
+                                  f"задач в них: {sum(len(group) for group in groups)}")
+        for number, group in enumerate(groups, 1):
+            group_item = QTreeWidgetItem([f"Группа {number} ({len(group)})", ""])
+            for task_id in group:
+                item = QTreeWidgetItem([titles.get(task_id, ""), str(task_id)])
+                item.setData(0, Qt.ItemDataRole.UserRole, task_id)
+                group_item.addChild(item)
+            self.groupTree.addTopLevelItem(group_item)
+        # Небольшие отчеты раскрываются сразу
+        if len(groups) <= 50:
+            self.groupTree.expandAll()
+
+    def choose_task(self, item, column):
+        """Передача выбранной задачи главному окну."""
+        task_id = item.data(0, Qt.ItemDataRole.UserRole)
+        if task_id is not None:
+            self.task_chosen.emit(task_id)
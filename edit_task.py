@@ -5,7 +5,12 @@
 
 import logging
 import traceback
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QTextEdit, QPushButton, QMessageBox
+from datetime import datetime
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QTextEdit, QPushButton,
+                            QMessageBox, QCheckBox, QDateTimeEdit, QSpinBox, QComboBox)
+from PyQt6.QtCore import QDateTime
+from database import DATETIME_FORMAT
+from recurrence import RecurrenceRule, RECURRENCE_UNITS
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -13,7 +18,8 @@ logger = logging.getLogger(__name__)
 class EditTaskDialog(QDialog):
     """Диалоговое окно для создания и редактирования задач."""
     
-    def __init__(self, parent=None, title="", description=""):
+    def __init__(self, parent=None, title="", description="", due_at=None, recurrence=None,
+                 duplicate_finder=None):
         """
         Инициализация диалогового окна.
         
@@ -21,10 +27,17 @@ class EditTaskDialog(QDialog):
             parent: Родительский виджет
             title: Заголовок задачи
             description: Описание задачи
+            due_at: Срок выполнения (строка в формате DATETIME_FORMAT) или None
+            recurrence: RecurrenceRule повторяющейся задачи или None
+            duplicate_finder: Функция поиска похожих задач (заголовок, описание) ->
+                [(ID, заголовок, сходство)] или None, если проверка не нужна
         """
         try:
             logger.debug("Инициализация диалога редактирования")
             super().__init__(parent)
+            self.duplicate_finder = duplicate_finder
+            # Исходный текст: похожие задачи ищутся, только если текст изменен
+            self.initial_text = (title.strip(), description.strip())
             
             # Настройка окна
             self.setWindowTitle("Редактировать задачу")
@@ -37,8 +50,15 @@ class EditTaskDialog(QDialog):
             # Заполнение полей
             self.titleEdit.setText(title)
             self.descEdit.setPlainText(description)
+            self.dueCheck.setChecked(bool(due_at))
+            if due_at:
+                self.dueEdit.setDateTime(QDateTime(datetime.strptime(due_at, DATETIME_FORMAT)))
+            if recurrence:
+                self.repeatCheck.setChecked(True)
+                self.repeatInterval.setValue(recurrence.interval)
+                self.repeatUnit.setCurrentIndex(list(RECURRENCE_UNITS).index(recurrence.unit))
             
-            logger.debug(f"Заполнены поля: title='{title}', description='{description}'")
+            logger.debug(f"Заполнены поля: title='{title}', description='{description}', due_at='{due_at}'")
             
         except Exception as e:
             logger.error(f"Ошибка в инициализации диалога: {str(e)}")
@@ -65,6 +85,35 @@ class EditTaskDialog(QDialog):
             layout.addWidget(desc_label)
             layout.addWidget(self.descEdit)
             
+            # Поле для срока выполнения
+            due_layout = QHBoxLayout()
+            self.dueCheck = QCheckBox("Срок:")
+            self.dueEdit = QDateTimeEdit(QDateTime.currentDateTime().addDays(1))
+            self.dueEdit.setCalendarPopup(True)
+            self.dueEdit.setDisplayFormat("dd.MM.yyyy HH:mm")
+            self.dueEdit.setEnabled(False)
+            self.dueCheck.toggled.connect(self.dueEdit.setEnabled)
+            due_layout.addWidget(self.dueCheck)
+            due_layout.addWidget(self.dueEdit)
+            layout.addLayout(due_layout)
+            
+            # Правило повторения (отсчитывается от срока)
+            repeat_layout = QHBoxLayout()
+            self.repeatCheck = QCheckBox("Повторять каждые")
+            self.repeatInterval = QSpinBox()
+            self.repeatInterval.setRange(1, 365)
+            self.repeatUnit = QComboBox()
+            self.repeatUnit.addItems([label for label, _ in RECURRENCE_UNITS.values()])
+            self.repeatInterval.setEnabled(False)
+            self.repeatUnit.setEnabled(False)
+            self.repeatCheck.toggled.connect(self.repeatInterval.setEnabled)
+            self.repeatCheck.toggled.connect(self.repeatUnit.setEnabled)
+            repeat_layout.addWidget(self.repeatCheck)
+            repeat_layout.addWidget(self.repeatInterval)
+            repeat_layout.addWidget(self.repeatUnit)
+            repeat_layout.addStretch()
+            layout.addLayout(repeat_layout)
+            
             # Кнопки
             button_layout = QHBoxLayout()
             self.saveButton = QPushButton("Сохранить")
@@ -91,6 +140,11 @@ class EditTaskDialog(QDialog):
             if not title:
                 QMessageBox.warning(self, "Ошибка", "Заголовок задачи не может быть пустым")
                 return
+            if self.repeatCheck.isChecked() and not self.dueCheck.isChecked():
+                QMessageBox.warning(self, "Ошибка", "Для повторяющейся задачи нужно указать срок")
+                return
+            if not self.confirm_not_duplicate():
+                return
             self.accept()
             logger.debug("Данные валидированы и приняты")
         except Exception as e:
@@ -98,19 +152,62 @@ class EditTaskDialog(QDialog):
             logger.error(traceback.format_exc())
             raise
     
+    def confirm_not_duplicate(self):
+        """
+        Предупреждение о похожих задачах.
+        
+        Returns:
+            bool: True, если похожих задач нет или задачу решено сохранить
+        """
+        text = (self.titleEdit.text().strip(), self.descEdit.toPlainText().strip())
+        if self.duplicate_finder is None or text == self.initial_text:
+            return True
+        try:
+            matches = self.duplicate_finder(*text)
+        except Exception as e:
+            # Ошибка поиска не должна мешать сохранению задачи
+            logger.error(f"Ошибка при поиске похожих задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            return True
+        if not matches:
+            return True
+        lines = "\n".join(f"• {title} ({score:.0%})" for _, title, score in matches)
+        reply = QMessageBox.question(
+            self,
+            "Похожие задачи",
+            f"Найдены похожие задачи:\n{lines}\n\nВсе равно сохранить задачу?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        return reply == QMessageBox.StandardButton.Yes
+    
     def get_data(self):
         """
         Возвращает данные из полей ввода.
         
         Returns:
-            tuple: (заголовок, описание)
+            tuple: (заголовок, описание, срок или None)
         """
         try:
             title = self.titleEdit.text().strip()
             desc = self.descEdit.toPlainText().strip()
-            logger.debug(f"Получены данные из диалога: title='{title}', description='{desc}'")
-            return title, desc
+            due_at = None
+            if self.dueCheck.isChecked():
+                due_at = self.dueEdit.dateTime().toPyDateTime().replace(second=0, microsecond=0).strftime(DATETIME_FORMAT)
+            logger.debug(f"Получены данные из диалога: title='{title}', description='{desc}', due_at='{due_at}'")
+            return title, desc, due_at
         except Exception as e:
             logger.error(f"Ошибка при получении данных из диалога: {str(e)}")
             logger.error(traceback.format_exc())
             raise
+    
+    def get_recurrence(self):
+        """
+        Возвращает правило повторения из полей ввода.
+        
+        Returns:
+            RecurrenceRule: Правило с опорным сроком задачи или None
+        """
+        if not self.repeatCheck.isChecked() or not self.dueCheck.isChecked():
+            return None
+        unit = list(RECURRENCE_UNITS)[self.repeatUnit.currentIndex()]
+        return RecurrenceRule(unit, self.repeatInterval.value(), self.get_data()[2])
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+Обслуживание базы данных в простое.
+Когда пользователь не работает с приложением дольше порога, в фоновом
+потоке на отдельном соединении выполняются небольшие шаги: возврат
+свободных страниц (incremental_vacuum), обновление статистики
+планировщика (ANALYZE по таблицам и PRAGMA optimize) и проверка
+целостности по таблицам. Любое действие пользователя прерывает текущий
+шаг, незавершенный проход продолжается со следующего простоя.
+
+Базы создаются в режиме auto_vacuum = INCREMENTAL, но для существующего
+файла режим меняется только полной перестройкой. Поэтому для базы,
+созданной прежней версией, первый проход один раз выполняет VACUUM
+(шаг convert; если его прервать, он повторяется в следующий простой), а
+затем свободные страницы возвращаются только по шагам.
+
+Полный проход из командной строки (без прерываний):
+    python maintenance_scheduler.py tasks.db
+"""
+
+import sys
+import sqlite3
+import logging
+import argparse
+import threading
+import traceback
+from time import monotonic, perf_counter
+from PyQt6.QtCore import QObject, QTimer, QEvent, pyqtSignal
+from PyQt6.QtWidgets import QApplication
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Время без действий пользователя, после которого начинается обслуживание, с
+MAINTENANCE_IDLE_SECONDS = 120
+
+# Интервал проверки простоя, мс
+MAINTENANCE_CHECK_INTERVAL = 10 * 1000
+
+# Минимальный интервал между завершенными проходами для одной базы, с
+MAINTENANCE_INTERVAL = 12 * 60 * 60
+
+# Количество страниц, возвращаемых одним шагом incremental_vacuum
+MAINTENANCE_VACUUM_PAGES = 256
+
+# Количество строк индекса, просматриваемых ANALYZE (PRAGMA analysis_limit)
+MAINTENANCE_ANALYSIS_LIMIT = 400
+
+# Таблицы, для которых статистика не собирается: размер журнала отмены
+# быстро меняется, и снимок пустого журнала увел бы планировщик от индексов
+MAINTENANCE_ANALYZE_SKIP = ('change_txns', 'task_changes')
+
+# Ожидание блокировки базы фоновым соединением, с: если основной поток
+# пишет в базу, шаг откладывается до следующего простоя
+MAINTENANCE_BUSY_TIMEOUT = 0.1
+
+# Значения PRAGMA auto_vacuum: без возврата страниц и режим INCREMENTAL
+AUTO_VACUUM_NONE = 0
+AUTO_VACUUM_INCREMENTAL = 2
+
+# События, которые считаются действиями пользователя
+USER_INPUT_EVENTS = frozenset((
+    QEvent.Type.KeyPress, QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonDblClick,
+    QEvent.Type.MouseMove, QEvent.Type.Wheel, QEvent.Type.TouchBegin, QEvent.Type.ShortcutOverride,
+))
+
+# Названия шагов в журнале
+STEP_LABELS = {
+    'convert': "Перевод файла в режим incremental_vacuum",
+    'vacuum': "Возврат свободных страниц",
+    'analyze': "Статистика таблицы",
+    'optimize': "PRAGMA optimize",
+    'quick_check': "Проверка целостности",
+}
+
+class DatabaseMaintenance:
+    """
+    Один проход обслуживания файла базы данных на отдельном соединении.
+
+    Шаги выполняются по порядку; interrupt() можно вызывать из другого
+    потока - текущий шаг прерывается средствами SQLite и откатывается.
+    """
+
+    def __init__(self, db_path):
+        """
+        Инициализация прохода обслуживания.
+
+        Args:
+            db_path: Путь к файлу базы данных
+        """
+        self.db_path = db_path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        # Выполненные шаги: (название, результат, длительность в секундах)
+        self.report = []
+        self.freed_bytes = 0
+
+    def plan(self, conn):
+        """
+        Шаги полного прохода.
+
+        Returns:
+            list: Пары (шаг, таблица или None)
+        """
+        tables = [name for (name,) in conn.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL%'
+            ORDER BY name
+        """)]
+        convert = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_NONE
+        return ([('convert', None)] * convert + [('vacuum', None)]
+                + [('analyze', table) for table in tables if table not in MAINTENANCE_ANALYZE_SKIP]
+                + [('optimize', None)]
+                + [('quick_check', table) for table in tables])
+
+    def interrupt(self):
+        """Прерывание прохода (можно вызывать из любого потока)."""
+        self.stop_event.set()
+        with self.lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+    def run(self, steps=None):
+        """
+        Выполнение шагов до конца прохода или до прерывания.
+
+        Args:
+            steps: Невыполненные шаги прерванного прохода (None - полный проход)
+
+        Returns:
+            list: Невыполненные шаги (пустой список - проход завершен)
+        """
+        conn = sqlite3.connect(self.db_path, timeout=MAINTENANCE_BUSY_TIMEOUT,
+                               isolation_level=None, check_same_thread=False)
+        with self.lock:
+            self.conn = conn
+        try:
+            steps = list(self.plan(conn) if steps is None else steps)
+            while steps and not self.stop_event.is_set():
+                name, table = steps[0]
+                label = STEP_LABELS[name] + (f" {table}" if table else "")
+                start = perf_counter()
+                try:
+                    result = getattr(self, f"step_{name}")(conn, table)
+                except sqlite3.OperationalError as e:
+                    if self.stop_event.is_set():
+                        logger.info(f"Обслуживание базы прервано действием пользователя: {label}")
+                        break
+                    if "locked" in str(e) or "busy" in str(e):
+                        logger.info(f"База занята, обслуживание отложено: {label}")
+                        break
+                    raise
+                elapsed = perf_counter() - start
+                self.report.append((label, result, elapsed))
+                logger.info(f"Обслуживание базы: {label} - {result} ({elapsed * 1000:.0f} мс)")
+                steps.pop(0)
+            return steps
+        finally:
+            with self.lock:
+                self.conn = None
+            conn.close()
+
+    def summary(self):
+        """Краткий итог прохода для строки состояния."""
+        elapsed = sum(elapsed for _, _, elapsed in self.report)
+        return (f"Обслуживание базы выполнено за {elapsed:.1f} с, "
+                f"освобождено {self.freed_bytes // 1024} КБ")
+
+    def step_convert(self, conn, table):
+        """
+        Однократная полная перестройка файла базы прежней версии для
+        включения режима auto_vacuum = INCREMENTAL.
+        """
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_NONE:
+            return "не требуется"
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+        conn.execute("VACUUM")
+        freed = page_count - conn.execute("PRAGMA page_count").fetchone()[0]
+        self.freed_bytes += max(freed, 0) * page_size
+        return f"файл перестроен, освобождено {max(freed, 0) * page_size // 1024} КБ"
+
+    def step_vacuum(self, conn, table):
+        """Возврат свободных страниц файлу по MAINTENANCE_VACUUM_PAGES за шаг."""
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            return "режим incremental_vacuum не включен"
+        if not free:
+            return "свободных страниц нет"
+
+        freed = 0
+        while free and not self.stop_event.is_set():
+            # Прагма возвращает по строке на страницу: без чтения всех строк
+            # возвращается только одна страница
+            conn.execute(f"PRAGMA incremental_vacuum({MAINTENANCE_VACUUM_PAGES})").fetchall()
+            left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            freed += free - left
+            self.freed_bytes += (free - left) * page_size
+            free = left
+        return f"освобождено {freed * page_size // 1024} КБ, осталось свободных страниц: {free}"
+
+    def step_analyze(self, conn, table):
+        """Обновление статистики планировщика по выборке строк одной таблицы."""
+        conn.execute(f"PRAGMA analysis_limit = {MAINTENANCE_ANALYSIS_LIMIT}")
+        conn.execute(f'ANALYZE "{table}"')
+        return "статистика обновлена"
+
+    def step_optimize(self, conn, table):
+        """PRAGMA optimize (новые версии SQLite дополнительно пересчитывают устаревшую статистику)."""
+        conn.execute("PRAGMA optimize").fetchall()
+        return "выполнено"
+
+    def step_quick_check(self, conn, table):
+        """Проверка целостности страниц одной таблицы и ее индексов."""
+        problems = [message for (message,) in conn.execute(f"PRAGMA quick_check('{table}')")
+                    if message != "ok"]
+        if problems:
+            logger.error(f"Нарушена целостность таблицы {table}: {'; '.join(problems[:10])}")
+            return f"найдено нарушений: {len(problems)}"
+        return "ok"
+
+class MaintenanceScheduler(QObject):
+    """
+    Класс для запуска обслуживания базы данных, пока пользователь не работает
+    с приложением.
+
+    Фильтр событий приложения отмечает время последнего действия
+    пользователя и прерывает идущий проход; таймер запускает проход в
+    фоновом потоке после MAINTENANCE_IDLE_SECONDS без действий.
+    """
+
+    # Сигнал о завершении прохода: итог для строки состояния
+    maintenance_finished = pyqtSignal(str)
+
+    def __init__(self, db_manager, parent=None, idle_seconds=MAINTENANCE_IDLE_SECONDS):
+        """
+        Инициализация планировщика обслуживания.
+
+        Args:
+            db_manager: Менеджер базы данных
+            parent: Родительский объект
+            idle_seconds: Время простоя перед началом обслуживания в секундах
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.idle_seconds = idle_seconds
+        self.last_input = monotonic()
+        # Невыполненные шаги прерванных проходов: путь к базе -> шаги
+        self.pending = {}
+        # Время завершения последнего прохода: путь к базе -> monotonic()
+        self.finished_at = {}
+        self.maintenance = None
+        self.thread = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(MAINTENANCE_CHECK_INTERVAL)
+        self.timer.timeout.connect(self.check_idle)
+        logger.debug("Планировщик обслуживания инициализирован")
+
+    def start(self):
+        """Включение отслеживания простоя."""
+        QApplication.instance().installEventFilter(self)
+        self.last_input = monotonic()
+        self.timer.start()
+
+    def stop(self):
+        """Выключение отслеживания простоя и прерывание идущего прохода."""
+        self.timer.stop()
+        app = QApplication.instance()
+        if app is not None:
+            app.removeEventFilter(self)
+        maintenance = self.maintenance
+        if maintenance is not None:
+            maintenance.interrupt()
+        if self.thread is not None:
+            self.thread.join()
+
+    def is_running(self):
+        """Проверка, выполняется ли сейчас обслуживание."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def eventFilter(self, obj, event):
+        if event.type() in USER_INPUT_EVENTS:
+            self.last_input = monotonic()
+            # Ссылка копируется: фоновый поток сбрасывает ее по завершении прохода
+            maintenance = self.maintenance
+            if maintenance is not None:
+                maintenance.interrupt()
+        return False
+
+    def check_idle(self):
+        """Запуск прохода обслуживания, если пользователь не работает дольше порога."""
+        try:
+            if self.is_running() or monotonic() - self.last_input < self.idle_seconds:
+                return
+            db_path = self.db_manager.db_path
+            finished_at = self.finished_at.get(db_path)
+            if (db_path not in self.pending and finished_at is not None
+                    and monotonic() - finished_at < MAINTENANCE_INTERVAL):
+                return
+            self.maintenance = DatabaseMaintenance(db_path)
+            self.thread = threading.Thread(target=self.run_maintenance,
+                                           args=(self.maintenance, self.pending.pop(db_path, None)),
+                                           name="maintenance", daemon=True)
+            self.thread.start()
+            logger.debug(f"Начато обслуживание базы {db_path}")
+        except Exception as e:
+            logger.error(f"Ошибка при запуске обслуживания базы: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def run_maintenance(self, maintenance, steps):
+        """Выполнение прохода обслуживания (в фоновом потоке)."""
+        db_path = maintenance.db_path
+        try:
+            remaining = maintenance.run(steps)
+            if remaining:
+                self.pending[db_path] = remaining
+                return
+            self.finished_at[db_path] = monotonic()
+            self.maintenance_finished.emit(maintenance.summary())
+        except Exception as e:
+            # Проход не повторяется до следующего интервала, чтобы ошибка
+            # не повторялась каждые MAINTENANCE_CHECK_INTERVAL
+            self.finished_at[db_path] = monotonic()
+            logger.error(f"Ошибка при обслуживании базы: {str(e)}")
+            logger.error(traceback.format_exc())
+        finally:
+            self.maintenance = None
+
+def main():
+    """Полный проход обслуживания из командной строки."""
+    parser = argparse.ArgumentParser(description="Обслуживание базы данных задач")
+    parser.add_argument("db_path", nargs="?", default="tasks.db", help="файл базы данных")
+    args = parser.parse_args()
+
+    maintenance = DatabaseMaintenance(args.db_path)
+    maintenance.run()
+    for label, result, elapsed in maintenance.report:
+        print(f"{label:<45} {elapsed * 1000:8.1f} мс  {result}")
+    print(maintenance.summary())
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Правила повторения задач.
+Правило хранится один раз для серии; повторения вычисляются по номеру
+от опорного срока и разворачиваются только для запрошенного интервала дат.
+"""
+
+import heapq
+from calendar import monthrange
+from datetime import datetime, timedelta
+from itertools import islice
+from task import DATETIME_FORMAT
+
+# Единицы интервала повторения: единица -> (подпись для выбора, "каждый раз")
+RECURRENCE_UNITS = {
+    'day': ("дн.", "ежедневно"),
+    'week': ("нед.", "еженедельно"),
+    'month': ("мес.", "ежемесячно"),
+}
+
+# Максимальное количество повторений, разворачиваемых за один запрос
+MAX_EXPANDED_OCCURRENCES = 1000
+
+def add_months(moment, months):
+    """Сдвиг даты на заданное число месяцев с ограничением дня концом месяца."""
+    year, month = divmod(moment.month - 1 + months, 12)
+    year += moment.year
+    day = min(moment.day, monthrange(year, month + 1)[1])
+    return moment.replace(year=year, month=month + 1, day=day)
+
+class RecurrenceRule:
+    """Правило повторения: каждые interval единиц unit от опорного срока."""
+
+    __slots__ = ('unit', 'interval', 'anchor_at')
+
+    def __init__(self, unit, interval=1, anchor_at=None):
+        """
+        Инициализация правила.
+
+        Args:
+            unit: Единица интервала из RECURRENCE_UNITS
+            interval: Количество единиц между повторениями
+            anchor_at: Опорный срок (строка в формате DATETIME_FORMAT)
+        """
+        if unit not in RECURRENCE_UNITS:
+            raise ValueError(f"Неизвестная единица повторения: {unit}")
+        if interval < 1:
+            raise ValueError("Интервал повторения должен быть положительным")
+        self.unit = unit
+        self.interval = interval
+        self.anchor_at = anchor_at
+
+    def occurrence(self, index):
+        """Срок повторения с заданным номером (0 - опорный срок)."""
+        anchor = datetime.strptime(self.anchor_at, DATETIME_FORMAT)
+        if self.unit == 'month':
+            # Считаем от опорного срока, чтобы 31-е число не сползало после коротких месяцев
+            return add_months(anchor, index * self.interval)
+        days = 7 if self.unit == 'week' else 1
+        return anchor + timedelta(days=index * self.interval * days)
+
+    def index_after(self, moment):
+        """Номер первого повторения строго позже moment."""
+        anchor = datetime.strptime(self.anchor_at, DATETIME_FORMAT)
+        if moment < anchor:
+            return 0
+        if self.unit == 'month':
+            months = (moment.year - anchor.year) * 12 + moment.month - anchor.month
+            index = months // self.interval
+            while self.occurrence(index) <= moment:
+                index += 1
+            return index
+        step = timedelta(days=self.interval * (7 if self.unit == 'week' else 1))
+        return (moment - anchor) // step + 1
+
+    def next_after(self, moment):
+        """
+        Срок первого повторения строго позже moment.
+
+        Args:
+            moment: datetime или строка в формате DATETIME_FORMAT
+
+        Returns:
+            str: Срок в формате DATETIME_FORMAT
+        """
+        if isinstance(moment, str):
+            moment = datetime.strptime(moment, DATETIME_FORMAT)
+        return self.occurrence(self.index_after(moment)).strftime(DATETIME_FORMAT)
+
+    def occurrences(self, start, end, after=None):
+        """
+        Генератор сроков повторений в интервале [start, end).
+
+        Вычисление начинается сразу с первого повторения интервала,
+        предыдущие повторения не перебираются.
+
+        Args:
+            start: Начало интервала (datetime)
+            end: Конец интервала (datetime)
+            after: Пропустить повторения не позже этого срока (datetime)
+        """
+        if after is not None and after >= start:
+            index = self.index_after(after)
+        else:
+            index = self.index_after(start - timedelta(seconds=1))
+        while True:
+            moment = self.occurrence(index)
+            if moment >= end:
+                return
+            yield moment.strftime(DATETIME_FORMAT)
+            index += 1
+
+    def describe(self):
+        """Описание правила для отображения."""
+        label, every = RECURRENCE_UNITS[self.unit]
+        if self.interval == 1:
+            return every
+        return f"каждые {self.interval} {label}"
+
+    def __repr__(self):
+        return f"RecurrenceRule(unit={self.unit!r}, interval={self.interval!r}, anchor_at={self.anchor_at!r})"
+
+def expand_occurrences(series, start, end, limit=MAX_EXPANDED_OCCURRENCES):
+    """
+    Разворачивание будущих повторений серий в интервале дат.
+
+    Повторения создаются только в памяти и только для интервала;
+    текущее (сохраненное в базе) повторение серии не включается.
+
+    Args:
+        series: Кортежи (ID задачи, заголовок, текущий срок, RecurrenceRule)
+        start: Начало интервала (datetime)
+        end: Конец интервала (datetime)
+        limit: Максимальное количество повторений
+
+    Returns:
+        list: Кортежи (срок, ID задачи, заголовок) в порядке сроков
+    """
+    def series_occurrences(task_id, title, due_at, rule):
+        current = datetime.strptime(due_at, DATETIME_FORMAT)
+        for moment in rule.occurrences(start, end, after=current):
+            yield moment, task_id, title
+
+    generators = [series_occurrences(*item) for item in series]
+    return list(islice(heapq.merge(*generators), limit))
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Планировщик напоминаний о сроках задач.
+Хранит ближайшие сроки в куче и взводит один таймер на ближайший срок.
+"""
+
+import heapq
+import logging
+import traceback
+from datetime import datetime, timedelta
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from database import DATETIME_FORMAT
+from task import TaskSelection
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Горизонт планирования: в кучу загружаются сроки на это время вперед
+REMINDER_HORIZON = timedelta(hours=24)
+
+# Максимальный интервал таймера в миллисекундах
+MAX_TIMER_INTERVAL = 60 * 60 * 1000
+
+class ReminderScheduler(QObject):
+    """Класс для планирования напоминаний о сроках задач."""
+
+    # Сигнал о наступлении срока задачи: (ID задачи, заголовок)
+    reminder_due = pyqtSignal(int, str)
+
+    def __init__(self, db_manager, parent=None):
+        """
+        Инициализация планировщика напоминаний.
+
+        Args:
+            db_manager: Менеджер базы данных
+            parent: Родительский объект
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+        # Куча элементов (срок, ID задачи, заголовок); устаревшие элементы
+        # не удаляются сразу, а пропускаются при извлечении
+        self.heap = []
+        # Актуальные напоминания: ID задачи -> (срок, заголовок)
+        self.entries = {}
+        self.window_end = datetime.now()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.handle_timeout)
+        logger.debug("Планировщик напоминаний инициализирован")
+
+    def reload(self):
+        """Загрузка сроков на горизонт планирования запросом по индексу."""
+        try:
+            now = datetime.now()
+            self.window_end = now + REMINDER_HORIZON
+            rows = self.db_manager.get_upcoming_due(now.strftime(DATETIME_FORMAT),
+                                                    self.window_end.strftime(DATETIME_FORMAT))
+            self.entries = {task_id: (due_at, title) for task_id, title, due_at in rows}
+            self.heap = [(due_at, task_id, title) for task_id, (due_at, title) in self.entries.items()]
+            heapq.heapify(self.heap)
+            logger.debug(f"Загружено напоминаний: {len(self.entries)}")
+            self.arm()
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке напоминаний: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def update_task(self, task_id, title, due_at):
+        """
+        Добавление или изменение напоминания для одной задачи.
+
+        Args:
+            task_id: ID задачи
+            title: Заголовок задачи
+            due_at: Новый срок (строка в формате DATETIME_FORMAT) или None
+        """
+        try:
+            now = datetime.now().strftime(DATETIME_FORMAT)
+            if due_at and now <= due_at < self.window_end.strftime(DATETIME_FORMAT):
+                self.entries[task_id] = (due_at, title)
+                heapq.heappush(self.heap, (due_at, task_id, title))
+            else:
+                self.entries.pop(task_id, None)
+            self.arm()
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении напоминания: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def remove_tasks(self, task_ids):
+        """
+        Удаление напоминаний для задач.
+        
+        Args:
+            task_ids: TaskSelection или список ID задач
+        """
+        try:
+            if isinstance(task_ids, TaskSelection):
+                # В куче только невыполненные задачи горизонта, поэтому проверяем их
+                for task_id in [task_id for task_id in self.entries if task_ids.contains(task_id, False)]:
+                    del self.entries[task_id]
+            else:
+                for task_id in task_ids:
+                    self.entries.pop(task_id, None)
+            self.arm()
+        except Exception as e:
+            logger.error(f"Ошибка при удалении напоминаний: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def is_current(self, item):
+        """Проверка, что элемент кучи соответствует актуальному напоминанию."""
+        due_at, task_id, title = item
+        return self.entries.get(task_id) == (due_at, title)
+
+    def arm(self):
+        """Взвод таймера на ближайший актуальный срок."""
+        # Пропускаем устаревшие элементы на вершине кучи
+        while self.heap and not self.is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+
+        # Пересобираем кучу, если устаревших элементов стало слишком много
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [item for item in self.heap if self.is_current(item)]
+            heapq.heapify(self.heap)
+
+        if self.heap:
+            next_time = datetime.strptime(self.heap[0][0], DATETIME_FORMAT)
+        else:
+            next_time = self.window_end
+        delay = (next_time - datetime.now()).total_seconds() * 1000
+        self.timer.start(int(min(max(delay, 0), MAX_TIMER_INTERVAL)))
+
+    def handle_timeout(self):
+        """Обработка срабатывания таймера."""
+        try:
+            now = datetime.now()
+            now_str = now.strftime(DATETIME_FORMAT)
+            while self.heap and self.heap[0][0] <= now_str:
+                item = heapq.heappop(self.heap)
+                if self.is_current(item):
+                    due_at, task_id, title = item
+                    del self.entries[task_id]
+                    logger.debug(f"Наступил срок задачи {task_id}: {title}")
+                    self.reminder_due.emit(task_id, title)
+
+            if now >= self.window_end:
+                self.reload()
+            else:
+                self.arm()
+        except Exception as e:
+            logger.error(f"Ошибка при обработке напоминаний: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def stop(self):
+        """Остановка таймера напоминаний."""
+        self.timer.stop()
@@ -1,4 +1,5 @@
 from PyQt6.QtCore import QSettings
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -58,4 +59,94 @@ class SettingsManager:
             return self.settings.value("sound_enabled", True, type=bool)
         except Exception as e:
             logger.error(f"Ошибка при загрузке настройки звука: {str(e)}")
-            return True 
\ No newline at end of file
+            return True
+    
+    def save_archive_days(self, days):
+        """Сохранение срока, после которого выполненные задачи уходят в архив."""
+        try:
+            self.settings.setValue("archive_days", days)
+            logger.debug(f"Срок архивации сохранен: {days} дн.")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении срока архивации: {str(e)}")
+    
+    def load_archive_days(self):
+        """Загрузка срока архивации выполненных задач."""
+        try:
+            return self.settings.value("archive_days", 30, type=int)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке срока архивации: {str(e)}")
+            return 30
+    
+    def save_backup_settings(self, interval_minutes, keep):
+        """Сохранение интервала резервного копирования и количества хранимых копий."""
+        try:
+            self.settings.setValue("backup_interval", interval_minutes)
+            self.settings.setValue("backup_keep", keep)
+            logger.debug(f"Настройки резервного копирования сохранены: {interval_minutes} мин., {keep} копий")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении настроек резервного копирования: {str(e)}")
+    
+    def load_backup_interval(self):
+        """Загрузка интервала резервного копирования в минутах."""
+        try:
+            return self.settings.value("backup_interval", 60, type=int)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке интервала резервного копирования: {str(e)}")
+            return 60
+    
+    def load_backup_keep(self):
+        """Загрузка количества хранимых резервных копий."""
+        try:
+            return self.settings.value("backup_keep", 10, type=int)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке количества резервных копий: {str(e)}")
+            return 10
+    
+    def save_workspaces(self, workspaces):
+        """Сохранение списка рабочих областей: пары (название, путь к базе)."""
+        try:
+            self.settings.setValue("workspaces", json.dumps([list(item) for item in workspaces], ensure_ascii=False))
+            logger.debug(f"Список рабочих областей сохранен: {len(workspaces)}")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении списка рабочих областей: {str(e)}")
+    
+    def load_workspaces(self):
+        """Загрузка списка рабочих областей (пустой список, если он не сохранялся)."""
+        try:
+            return [tuple(item) for item in json.loads(self.settings.value("workspaces", "[]", type=str))]
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке списка рабочих областей: {str(e)}")
+            return []
+    
+    def save_current_workspace(self, name):
+        """Сохранение названия текущей рабочей области."""
+        try:
+            self.settings.setValue("current_workspace", name)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении текущей рабочей области: {str(e)}")
+    
+    def load_current_workspace(self):
+        """Загрузка названия текущей рабочей области."""
+        try:
+            return self.settings.value("current_workspace", "", type=str)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке текущей рабочей области: {str(e)}")
+            return ""
+    
+    def save_view_state(self, workspace, state):
+        """Сохранение состояния вида (фильтр, вкладка, текущая задача) рабочей области."""
+        try:
+            states = json.loads(self.settings.value("view_states", "{}", type=str))
+            states[workspace] = state
+            self.settings.setValue("view_states", json.dumps(states, ensure_ascii=False))
+            logger.debug(f"Состояние вида рабочей области '{workspace}' сохранено")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении состояния вида: {str(e)}")
+    
+    def load_view_state(self, workspace):
+        """Загрузка состояния вида рабочей области (пустой словарь, если его нет)."""
+        try:
+            return json.loads(self.settings.value("view_states", "{}", type=str)).get(workspace, {})
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке состояния вида: {str(e)}")
+            return {}
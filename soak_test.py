@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+Нагрузочный прогон главного окна менеджера задач.
+Запускает настоящее окно TaskManager без экрана (платформа Qt offscreen)
+на большой временной базе, заменяет диалоги и звуки заглушками и выполняет
+случайную, но воспроизводимую по seed последовательность действий пользователя:
+
+    python soak_test.py --tasks 20000 --actions 2000 --seed 1
+
+В конце выводятся задержки действий (p50/p95/p99), рост памяти и количество
+объектов Qt по ходу прогона.
+"""
+
+import os
+import gc
+import sys
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from time import perf_counter
+
+# Окно должно создаваться без экрана, поэтому платформа задается до импорта Qt
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication, QMessageBox, QInputDialog
+from PyQt6.QtCore import Qt, QObject, QEvent, QModelIndex, QItemSelection, QItemSelectionModel
+
+import TaskManager as task_manager_module
+from TaskManager import TaskManager
+from settings import SettingsManager
+from database import DatabaseManager
+from benchmark import fill_database
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Отдельные настройки, чтобы прогон не менял настройки пользователя
+SOAK_SETTINGS_COMPANY = "TaskManagerSoakTest"
+
+# Веса действий в случайной сессии
+ACTION_WEIGHTS = {
+    'add': 15,
+    'edit': 10,
+    'edit_inline': 10,
+    'toggle': 20,
+    'priority': 20,
+    'board_drop': 5,
+    'delete': 10,
+    'scroll': 10,
+}
+
+# Максимальный размер выделения для групповых действий
+MAX_SELECTION = 50
+
+def process_memory():
+    """Память процесса (рабочий набор) в байтах или None, если ее не узнать."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+            return counters.WorkingSetSize
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+def percentile(sorted_values, percent):
+    """Перцентиль по упорядоченным значениям (метод ближайшего ранга)."""
+    index = max(0, min(len(sorted_values) - 1, int(round(percent / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class SoakDriver:
+    """Драйвер случайной сессии пользователя в главном окне."""
+
+    def __init__(self, window, seed):
+        """
+        Инициализация драйвера.
+
+        Args:
+            window: Главное окно TaskManager
+            seed: Начальное значение генератора случайных чисел
+        """
+        self.window = window
+        self.table = window.ui_manager.taskTable
+        self.model = window.ui_manager.taskModel
+        self.random = random.Random(seed)
+        self.counter = 0
+        self.timings = defaultdict(list)
+        self.samples = []
+        self.errors = []
+
+    def run_action(self, name):
+        """Выполнение одного действия с замером времени вместе с обработкой событий."""
+        action = getattr(self, f"do_{name}")
+        start = perf_counter()
+        action()
+        QApplication.processEvents()
+        # processEvents не выполняет отложенные удаления (deleteLater), которые
+        # в приложении выполняет главный цикл событий после возврата из обработчика
+        QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+        self.timings[name].append(perf_counter() - start)
+
+    def choose_action(self):
+        """Случайное действие с учетом весов; без задач возможно только добавление."""
+        if self.model.rowCount() == 0:
+            return 'add'
+        names = list(ACTION_WEIGHTS)
+        return self.random.choices(names, weights=[ACTION_WEIGHTS[name] for name in names])[0]
+
+    def select_random(self, allow_range=False):
+        """Выделение случайной строки или (иногда) диапазона строк."""
+        rows = self.model.rowCount()
+        row = self.random.randrange(rows)
+        self.table.clearSelection()
+        self.table.selectRow(row)
+        if allow_range and self.random.random() < 0.2:
+            bottom = min(rows - 1, row + self.random.randrange(1, MAX_SELECTION))
+            selection = QItemSelection(self.model.index(row, 0),
+                                       self.model.index(bottom, self.model.columnCount() - 1))
+            self.table.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.Select)
+        return row
+
+    def next_title(self):
+        """Уникальный заголовок для новой или измененной задачи."""
+        self.counter += 1
+        return f"Нагрузочная задача {self.counter}"
+
+    def stub_dialog(self, dialog):
+        """Заполнение диалога задачи вместо ввода пользователя."""
+        dialog.titleEdit.setText(self.next_title())
+        dialog.descEdit.setPlainText("Описание\n" * self.random.randrange(1, 5))
+        return 1
+
+    def do_add(self):
+        self.window.add_task()
+
+    def do_edit(self):
+        self.select_random()
+        self.window.edit_task()
+
+    def do_edit_inline(self):
+        row = self.select_random()
+        task_id = self.model.task_id(row)
+        field, value = self.random.choice((
+            ('title', self.next_title()),
+            ('priority', self.random.randint(1, 4)),
+            ('completed', self.random.random() < 0.5),
+        ))
+        self.window.handle_task_edited(row, task_id, field, value)
+
+    def do_toggle(self):
+        self.select_random(allow_range=True)
+        self.window.toggle_task_status()
+
+    def do_priority(self):
+        self.select_random(allow_range=True)
+        if self.random.random() < 0.5:
+            self.window.increase_priority()
+        else:
+            self.window.decrease_priority()
+
+    def do_board_drop(self):
+        # Отпускание карточки в случайной колонке доски тем же путем, что и при перетаскивании
+        row = self.select_random()
+        column = self.random.choice(self.window.ui_manager.taskBoard.column_models())
+        column.dropMimeData(self.model.mimeData([self.model.index(row, 0)]),
+                            Qt.DropAction.MoveAction, -1, -1, QModelIndex())
+
+    def do_delete(self):
+        self.select_random(allow_range=True)
+        self.window.delete_task()
+
+    def do_scroll(self):
+        scroll_bar = self.table.verticalScrollBar()
+        scroll_bar.setValue(self.random.randint(scroll_bar.minimum(), scroll_bar.maximum()))
+
+    def sample(self, done):
+        """Снимок памяти и количества объектов Qt после очередной группы действий."""
+        gc.collect()
+        traced, _ = tracemalloc.get_traced_memory()
+        self.samples.append({
+            'actions': done,
+            'traced': traced,
+            'process': process_memory(),
+            'widgets': len(QApplication.allWidgets()),
+            'children': len(self.window.findChildren(QObject)),
+            'rows': self.model.rowCount(),
+        })
+
+    def run(self, actions, report_every):
+        """Выполнение сессии из заданного количества действий."""
+        tracemalloc.start()
+        self.sample(0)
+        for done in range(1, actions + 1):
+            self.run_action(self.choose_action())
+            if done % report_every == 0 or done == actions:
+                self.sample(done)
+        tracemalloc.stop()
+
+    def report(self):
+        """Вывод задержек действий, роста памяти и количества объектов Qt."""
+        print("\nЗадержка действий, мс:")
+        print(f"  {'Действие':<12} {'кол-во':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'макс':>8}")
+        for name in ACTION_WEIGHTS:
+            values = sorted(self.timings.get(name, ()))
+            if not values:
+                continue
+            p50, p95, p99 = (percentile(values, p) * 1000 for p in (50, 95, 99))
+            print(f"  {name:<12} {len(values):>7} {p50:8.1f} {p95:8.1f} {p99:8.1f} {values[-1] * 1000:8.1f}")
+
+        print("\nПамять и объекты Qt:")
+        print(f"  {'действий':>8} {'Python, МБ':>11} {'процесс, МБ':>12} {'виджеты':>8} {'QObject':>8} {'строк':>7}")
+        for sample in self.samples:
+            process = f"{sample['process'] / 2 ** 20:12.1f}" if sample['process'] else f"{'-':>12}"
+            print(f"  {sample['actions']:>8} {sample['traced'] / 2 ** 20:11.1f} {process} "
+                  f"{sample['widgets']:>8} {sample['children']:>8} {sample['rows']:>7}")
+
+        # Первый снимок после разогрева принимается за базовый уровень
+        if len(self.samples) >= 3:
+            base, last = self.samples[1], self.samples[-1]
+            print(f"\nРост памяти Python после разогрева: {(last['traced'] - base['traced']) / 2 ** 20:+.1f} МБ")
+            for key, label in (('widgets', "виджетов"), ('children', "дочерних QObject окна")):
+                growth = last[key] - base[key]
+                verdict = "возможная утечка" if growth > 0 else "без роста"
+                print(f"Количество {label}: {base[key]} -> {last[key]} ({verdict})")
+        if self.errors:
+            print(f"\nСообщений об ошибках: {len(self.errors)}")
+            for text in self.errors[:10]:
+                print(f"  {text}")
+
+def install_stubs(driver):
+    """Замена модальных диалогов и звуков заглушками."""
+    def record_error(parent, title, text, *args, **kwargs):
+        driver.errors.append(text)
+        return QMessageBox.StandardButton.Ok
+
+    QMessageBox.question = staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.Yes)
+    QMessageBox.information = staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.Ok)
+    QMessageBox.warning = staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.Ok)
+    QMessageBox.critical = staticmethod(record_error)
+    QInputDialog.getText = staticmethod(lambda *args, **kwargs: (driver.next_title(), True))
+    task_manager_module.EditTaskDialog.exec = lambda dialog: driver.stub_dialog(dialog)
+
+    sound_manager = driver.window.sound_manager
+    sound_manager.play_click = lambda: None
+    sound_manager.play_complete = lambda: None
+
+def main():
+    """Запуск нагрузочного прогона."""
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон главного окна менеджера задач")
+    parser.add_argument("--tasks", type=int, default=20000, help="Количество задач в тестовой базе")
+    parser.add_argument("--actions", type=int, default=2000, help="Количество действий в сессии")
+    parser.add_argument("--seed", type=int, default=1, help="Начальное значение генератора случайных чисел")
+    parser.add_argument("--report-every", type=int, default=200, help="Интервал снимков памяти в действиях")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="taskmanager-soak-")
+    cwd = os.getcwd()
+    app = QApplication.instance() or QApplication(sys.argv)
+    settings_manager = SettingsManager(company=SOAK_SETTINGS_COMPANY)
+    window = None
+    try:
+        # База и файлы окна (архив, копии) создаются во временном каталоге
+        os.chdir(workdir)
+        db_manager = DatabaseManager("tasks.db")
+        fill_database(db_manager, args.tasks)
+        db_manager.close()
+
+        task_manager_module.SettingsManager = lambda: SettingsManager(company=SOAK_SETTINGS_COMPANY)
+        settings_manager.settings.clear()
+        start = perf_counter()
+        window = TaskManager()
+        window.show()
+        QApplication.processEvents()
+        print(f"Окно открыто за {(perf_counter() - start) * 1000:.0f} мс, задач: {args.tasks}")
+
+        driver = SoakDriver(window, args.seed)
+        install_stubs(driver)
+        start = perf_counter()
+        driver.run(args.actions, max(1, args.report_every))
+        print(f"Выполнено действий: {args.actions} за {perf_counter() - start:.1f} с (seed {args.seed})")
+        driver.report()
+        return 1 if driver.errors else 0
+    finally:
+        if window is not None:
+            window.close()
+        settings_manager.settings.clear()
+        app.processEvents()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    # TaskManager при импорте включает подробный журнал, который исказил бы замеры
+    logging.getLogger().setLevel(logging.WARNING)
+    sys.exit(main())
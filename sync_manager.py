@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+"""
+Двусторонняя синхронизация файлов базы задач.
+У каждой задачи есть постоянный идентификатор uid и версия (время последнего
+изменения в миллисекундах), удаленная задача оставляет надгробие с версией
+удаления. Хеши версий складываются (XOR) в дерево по префиксам uid (таблица
+sync_buckets); триггеры отмечают измененные листья, которые пересчитываются
+перед сравнением. Базы сравниваются от корня
+дерева: спускаться нужно только в различающиеся узлы, поэтому для баз,
+отличающихся несколькими задачами, читаются десятки строк дерева, а не все
+задачи. Отличающиеся задачи объединяются по версиям (целиком или по
+отдельным полям) и записываются в обе базы. Изменения можно передать и
+файлом (например, на флешке или через общую папку).
+
+Синхронизируются поля задач и теги; правила повторения, вложения и связи
+подзадач остаются локальными. Перенос задачи в архив не синхронизируется:
+в другой базе задача остается в списке.
+
+Запуск из командной строки:
+    python sync_manager.py sync tasks.db other.db --rule field
+    python sync_manager.py export tasks.db changes.json.gz --since 0
+    python sync_manager.py import tasks.db changes.json.gz
+"""
+
+import sys
+import gzip
+import json
+import hashlib
+import logging
+import argparse
+import traceback
+from datetime import datetime
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Длины префиксов uid на уровнях дерева хешей (листья - 16^4 = 65536 узлов,
+# около 15 задач в листе для базы из миллиона задач)
+SYNC_PREFIX_LENGTHS = (1, 2, 3, 4)
+
+# Синхронизируемые поля задачи (версия хранится для каждого поля)
+SYNC_FIELDS = ('title', 'description', 'priority', 'completed', 'due_at', 'tags')
+
+# Поля задачи, хранящиеся в колонках таблицы tasks
+SYNC_TASK_COLUMNS = ('title', 'description', 'priority', 'completed', 'due_at')
+
+# Правила разрешения конфликтов
+SYNC_RULES = {
+    'lww': "Побеждает последнее изменение задачи",
+    'field': "Побеждает последнее изменение каждого поля",
+}
+
+# Текущее время в миллисекундах для версий (выражение SQL)
+SYNC_CLOCK = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+# Хеши строк - неотрицательные 62-битные числа: XOR хешей узла всегда
+# помещается в колонку INTEGER таблицы sync_buckets
+SYNC_HASH_MASK = (1 << 62) - 1
+
+# Признак файла изменений
+CHANGESET_FORMAT = "taskmanager-changeset"
+CHANGESET_VERSION = 1
+
+# Количество uid в одном запросе чтения задач
+SYNC_READ_BATCH = 500
+
+# Если после изменений отмечено больше листьев дерева хешей, дерево
+# строится заново одним проходом вместо пересчета по листьям
+SYNC_REFRESH_MAX_LEAVES = 2000
+
+def sync_row_hash(uid, version, deleted):
+    """Хеш строки дерева синхронизации."""
+    digest = hashlib.blake2b(f"{uid}:{version}:{int(deleted)}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & SYNC_HASH_MASK
+
+def legacy_task_uid(task_id, created_at):
+    """
+    Идентификатор задачи, созданной до появления синхронизации.
+
+    Вычисляется из ID и времени создания, поэтому копии одного файла базы
+    получают одинаковые идентификаторы задач независимо друг от друга.
+    """
+    return hashlib.blake2b(f"{task_id}:{created_at}".encode("utf-8"), digest_size=16).hexdigest()
+
+def record_key(record):
+    """Ключ сравнения записей по правилу последнего изменения (с однозначным выбором при равных версиях)."""
+    return (record['version'], record['deleted'], json.dumps(record.get('fields'), sort_keys=True))
+
+def merge_records(local, remote, rule='lww'):
+    """
+    Объединение двух состояний одной задачи.
+
+    Удаление против изменения и правило 'lww' выбирают запись с большей
+    версией. Правило 'field' берет каждое поле из записи, где оно изменено
+    позже; объединенная запись получает версию больше обеих, поэтому при
+    следующем сравнении она побеждает обе исходные.
+
+    Args:
+        local: Запись задачи первой базы или None
+        remote: Запись задачи второй базы или None
+        rule: Правило разрешения конфликтов ('lww' или 'field')
+
+    Returns:
+        dict: Итоговая запись задачи
+    """
+    if local is None or remote is None:
+        return remote if local is None else local
+    winner, other = sorted((local, remote), key=record_key, reverse=True)
+    if rule != 'field' or winner['deleted'] or other['deleted']:
+        return winner
+
+    fields = {}
+    field_versions = {}
+    for field in SYNC_FIELDS:
+        winner_version = winner['field_versions'][field]
+        other_version = other['field_versions'][field]
+        source = other if other_version > winner_version else winner
+        fields[field] = source['fields'][field]
+        field_versions[field] = max(winner_version, other_version)
+    if fields == winner['fields']:
+        return winner
+
+    merged = dict(winner, fields=fields, field_versions=field_versions,
+                  version=max(winner['version'], other['version']) + 1)
+    if other['field_versions']['completed'] > winner['field_versions']['completed']:
+        merged['completed_at'] = other['completed_at']
+    return merged
+
+def write_changeset(path, records):
+    """Запись файла изменений (JSON, сжатый gzip)."""
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        json.dump({
+            'format': CHANGESET_FORMAT,
+            'version': CHANGESET_VERSION,
+            'created_at': datetime.now().isoformat(timespec="seconds"),
+            'records': list(records),
+        }, file, ensure_ascii=False)
+
+def read_changeset(path):
+    """
+    Чтение файла изменений.
+
+    Returns:
+        list: Записи задач
+
+    Raises:
+        ValueError: Файл не является файлом изменений
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        changeset = json.load(file)
+    if not isinstance(changeset, dict) or changeset.get('format') != CHANGESET_FORMAT:
+        raise ValueError(f"Файл {path} не является файлом изменений задач")
+    if changeset.get('version', 0) > CHANGESET_VERSION:
+        raise ValueError(f"Файл изменений {path} создан более новой версией программы")
+    return changeset['records']
+
+class SyncManager:
+    """Синхронизация базы задач с другой базой или файлом изменений."""
+
+    def __init__(self, db_manager):
+        """
+        Инициализация менеджера синхронизации.
+
+        Args:
+            db_manager: Менеджер базы данных
+        """
+        self.db_manager = db_manager
+
+    def bucket_hashes(self, level, parent):
+        """Непустые узлы дерева хешей уровня level под узлом parent: префикс -> (хеш, количество)."""
+        self.db_manager.cursor.execute("""
+            SELECT prefix, hash, count FROM sync_buckets
+            WHERE level = ? AND prefix >= ? AND prefix < ? AND count != 0
+        """, (level, parent, parent + "g"))
+        return {prefix: (row_hash, count) for prefix, row_hash, count in self.db_manager.cursor.fetchall()}
+
+    def leaf_versions(self, prefixes):
+        """Версии задач (в том числе перенесенных в архив) и надгробий в листьях дерева: uid -> (версия, удалена)."""
+        result = {}
+        for prefix in prefixes:
+            self.db_manager.cursor.execute("""
+                SELECT uid, version, 0 FROM tasks WHERE uid >= ?1 AND uid < ?2
+                UNION ALL
+                SELECT uid, version, 1 FROM sync_tombstones WHERE uid >= ?1 AND uid < ?2
+                UNION ALL
+                SELECT uid, version, 0 FROM sync_archived WHERE uid >= ?1 AND uid < ?2
+            """, (prefix, prefix + "g"))
+            for uid, version, deleted in self.db_manager.cursor.fetchall():
+                result[uid] = (version, deleted)
+        return result
+
+    def diff(self, other):
+        """
+        Поиск различающихся задач сравнением деревьев хешей двух баз.
+
+        Args:
+            other: SyncManager второй базы
+
+        Returns:
+            tuple: (множество uid различающихся задач, количество сравненных узлов)
+        """
+        self.db_manager.refresh_sync_buckets()
+        other.db_manager.refresh_sync_buckets()
+        compared = 0
+        leaves = []
+        pending = [("", 0)]
+        while pending:
+            parent, depth = pending.pop()
+            level = SYNC_PREFIX_LENGTHS[depth]
+            mine = self.bucket_hashes(level, parent)
+            theirs = other.bucket_hashes(level, parent)
+            for prefix in mine.keys() | theirs.keys():
+                compared += 1
+                if mine.get(prefix) == theirs.get(prefix):
+                    continue
+                if depth + 1 < len(SYNC_PREFIX_LENGTHS):
+                    pending.append((prefix, depth + 1))
+                else:
+                    leaves.append(prefix)
+
+        mine = self.leaf_versions(leaves)
+        theirs = other.leaf_versions(leaves)
+        uids = {uid for uid in mine.keys() | theirs.keys() if mine.get(uid) != theirs.get(uid)}
+        logger.debug(f"Сравнено узлов: {compared}, различающихся листьев: {len(leaves)}, задач: {len(uids)}")
+        return uids, compared
+
+    def read_records(self, uids):
+        """
+        Чтение полных записей задач и надгробий. Для задачи, перенесенной в
+        архив, возвращается ее последняя запись до переноса.
+
+        Returns:
+            dict: uid -> запись задачи
+        """
+        cursor = self.db_manager.cursor
+        records = {}
+        uids = list(uids)
+        for start in range(0, len(uids), SYNC_READ_BATCH):
+            batch = json.dumps(uids[start:start + SYNC_READ_BATCH])
+            cursor.execute("""
+                SELECT t.uid, t.version, t.field_versions, t.created_at, t.completed_at,
+                       t.title, IFNULL(decompress_description(z.data), t.description), t.priority,
+                       t.completed, t.due_at,
+                       (SELECT json_group_array(name) FROM (
+                            SELECT g.name FROM task_tags tt JOIN tags g ON g.id = tt.tag_id
+                            WHERE tt.task_id = t.id ORDER BY g.name))
+                FROM tasks t
+                LEFT JOIN task_descriptions_z z ON z.task_id = t.id
+                WHERE t.uid IN (SELECT value FROM json_each(?))
+            """, (batch,))
+            for (uid, version, field_versions, created_at, completed_at,
+                 title, description, priority, completed, due_at, tags) in cursor.fetchall():
+                # Поля, не изменявшиеся после создания задачи, имеют версию задачи
+                field_versions = json.loads(field_versions or "{}")
+                records[uid] = {
+                    'uid': uid,
+                    'version': version,
+                    'deleted': False,
+                    'created_at': created_at,
+                    'completed_at': completed_at,
+                    'fields': {
+                        'title': title,
+                        'description': description or "",
+                        'priority': priority or 1,
+                        'completed': int(bool(completed)),
+                        'due_at': due_at,
+                        'tags': json.loads(tags),
+                    },
+                    'field_versions': {field: field_versions.get(field, version) for field in SYNC_FIELDS},
+                }
+            cursor.execute("""
+                SELECT uid, version FROM sync_tombstones
+                WHERE uid IN (SELECT value FROM json_each(?))
+            """, (batch,))
+            for uid, version in cursor.fetchall():
+                records[uid] = {'uid': uid, 'version': version, 'deleted': True}
+            cursor.execute("""
+                SELECT uid, record FROM sync_archived
+                WHERE uid IN (SELECT value FROM json_each(?))
+            """, (batch,))
+            for uid, record in cursor.fetchall():
+                records[uid] = json.loads(record)
+        return records
+
+    def keep_archived(self, uids):
+        """
+        Сохранение последних записей задач перед переносом в архив (без фиксации транзакции).
+
+        Записи остаются в дереве хешей вместо задач: в другой базе задача
+        остается в списке, а ее изменение или удаление там заменяет запись.
+
+        Args:
+            uids: Идентификаторы переносимых задач
+        """
+        records = self.read_records(uids)
+        self.db_manager.cursor.executemany("""
+            INSERT INTO sync_archived (uid, version, record) VALUES (?, ?, ?)
+            ON CONFLICT (uid) DO UPDATE SET version = excluded.version, record = excluded.record
+        """, [(uid, record['version'], json.dumps(record, ensure_ascii=False))
+              for uid, record in records.items() if not record['deleted']])
+
+    def apply_records(self, records):
+        """
+        Запись задач и удалений из другой базы.
+
+        Изменения вносятся с сохранением версий записей (признак sync_apply),
+        поэтому не считаются новыми изменениями этой базы. Журнал отмены
+        очищается: записанные в нем действия могли относиться к замененным задачам.
+
+        Args:
+            records: Итоговые записи задач
+
+        Returns:
+            int: Количество записанных задач и удалений
+        """
+        db_manager = self.db_manager
+        cursor = db_manager.cursor
+        records = list(records)
+        if not records:
+            return 0
+        try:
+            cursor.execute("UPDATE journal_state SET value = 1 WHERE key = 'sync_apply'")
+            for record in records:
+                cursor.execute("SELECT id FROM tasks WHERE uid = ?", (record['uid'],))
+                row = cursor.fetchone()
+                if record['deleted']:
+                    if row:
+                        cursor.execute("DELETE FROM tasks WHERE id = ?", (row[0],))
+                    cursor.execute("""
+                        INSERT INTO sync_tombstones (uid, version) VALUES (?, ?)
+                        ON CONFLICT (uid) DO UPDATE SET version = excluded.version
+                    """, (record['uid'], record['version']))
+                    continue
+
+                fields = record['fields']
+                values = (fields['title'], fields['priority'], fields['completed'], record['completed_at'],
+                          fields['due_at'], record['created_at'], record['version'],
+                          json.dumps(record['field_versions'], sort_keys=True))
+                if row:
+                    task_id = row[0]
+                    cursor.execute("""
+                        UPDATE tasks
+                        SET title = ?, priority = ?, completed = ?, completed_at = ?, due_at = ?,
+                            created_at = ?, version = ?, field_versions = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    """, values + (task_id,))
+                else:
+                    cursor.execute("""
+                        INSERT INTO tasks (title, priority, completed, completed_at, due_at,
+                                           created_at, version, field_versions, uid, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    """, values + (record['uid'],))
+                    task_id = cursor.lastrowid
+                db_manager.write_description(task_id, fields['description'])
+
+                cursor.execute("""
+                    SELECT g.name FROM task_tags tt JOIN tags g ON g.id = tt.tag_id
+                    WHERE tt.task_id = ? ORDER BY g.name
+                """, (task_id,))
+                if [name for (name,) in cursor.fetchall()] != fields['tags']:
+                    tags = json.dumps(fields['tags'])
+                    cursor.execute("DELETE FROM task_tags WHERE task_id = ?", (task_id,))
+                    cursor.execute("INSERT OR IGNORE INTO tags (name) SELECT value FROM json_each(?)", (tags,))
+                    cursor.execute("""
+                        INSERT OR IGNORE INTO task_tags (task_id, tag_id)
+                        SELECT ?, id FROM tags WHERE name IN (SELECT value FROM json_each(?))
+                    """, (task_id, tags))
+            # Теги без задач больше не показываются в фильтре
+            cursor.execute("DELETE FROM tags WHERE task_count <= 0")
+            cursor.execute("UPDATE journal_state SET value = 0 WHERE key = 'sync_apply'")
+            db_manager.clear_journal()
+            db_manager.conn.commit()
+            db_manager.invalidate_caches()
+            logger.debug(f"Записано изменений из другой базы: {len(records)}")
+            return len(records)
+        except Exception as e:
+            logger.error(f"Ошибка при записи изменений синхронизации: {str(e)}")
+            logger.error(traceback.format_exc())
+            db_manager.conn.rollback()
+            raise
+
+    def sync(self, other, rule='lww', changeset_path=None):
+        """
+        Двусторонняя синхронизация с другой базой.
+
+        Args:
+            other: DatabaseManager второй базы
+            rule: Правило разрешения конфликтов ('lww' или 'field')
+            changeset_path: Путь для сохранения файла итоговых изменений или None
+
+        Returns:
+            dict: Статистика ('compared' - узлов дерева, 'differing' - задач,
+                  'to_local' и 'to_other' - записано в эту и во вторую базу)
+        """
+        try:
+            other_sync = SyncManager(other)
+            uids, compared = self.diff(other_sync)
+            local = self.read_records(uids)
+            remote = other_sync.read_records(uids)
+
+            to_local = []
+            to_other = []
+            merged_records = []
+            for uid in sorted(uids):
+                merged = merge_records(local.get(uid), remote.get(uid), rule)
+                merged_records.append(merged)
+                if merged != local.get(uid):
+                    to_local.append(merged)
+                if merged != remote.get(uid):
+                    to_other.append(merged)
+
+            self.apply_records(to_local)
+            other_sync.apply_records(to_other)
+            if changeset_path:
+                write_changeset(changeset_path, merged_records)
+
+            stats = {'compared': compared, 'differing': len(uids),
+                     'to_local': len(to_local), 'to_other': len(to_other)}
+            logger.debug(f"Синхронизация с {other.db_path} завершена: {stats}")
+            return stats
+        except Exception as e:
+            logger.error(f"Ошибка при синхронизации баз: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def last_version(self):
+        """Наибольшая версия задач и надгробий базы (для экспорта следующих изменений)."""
+        self.db_manager.cursor.execute("""
+            SELECT MAX(IFNULL((SELECT MAX(version) FROM tasks), 0),
+                       IFNULL((SELECT MAX(version) FROM sync_tombstones), 0),
+                       IFNULL((SELECT MAX(version) FROM sync_archived), 0))
+        """)
+        return self.db_manager.cursor.fetchone()[0]
+
+    def export_changeset(self, path, since=0):
+        """
+        Сохранение задач и удалений с версией больше since в файл изменений.
+
+        Args:
+            path: Путь к файлу изменений
+            since: Версия предыдущего экспорта (0 - все задачи)
+
+        Returns:
+            tuple: (количество записей, наибольшая версия базы для следующего экспорта)
+        """
+        try:
+            last_version = self.last_version()
+            self.db_manager.cursor.execute("""
+                SELECT uid FROM tasks WHERE version > ?1
+                UNION ALL
+                SELECT uid FROM sync_tombstones WHERE version > ?1
+                UNION ALL
+                SELECT uid FROM sync_archived WHERE version > ?1
+            """, (since,))
+            uids = [uid for (uid,) in self.db_manager.cursor.fetchall()]
+            records = self.read_records(uids)
+            write_changeset(path, (records[uid] for uid in sorted(records)))
+            logger.debug(f"Сохранено изменений в файл {path}: {len(records)}")
+            return len(records), last_version
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении файла изменений: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def import_changeset(self, path, rule='lww'):
+        """
+        Применение файла изменений другой базы.
+
+        Args:
+            path: Путь к файлу изменений
+            rule: Правило разрешения конфликтов ('lww' или 'field')
+
+        Returns:
+            tuple: (количество записей в файле, количество записанных изменений)
+        """
+        try:
+            records = read_changeset(path)
+            local = self.read_records(record['uid'] for record in records)
+            changes = []
+            for record in records:
+                merged = merge_records(local.get(record['uid']), record, rule)
+                if merged != local.get(record['uid']):
+                    changes.append(merged)
+            applied = self.apply_records(changes)
+            logger.debug(f"Применен файл изменений {path}: {applied} из {len(records)}")
+            return len(records), applied
+        except Exception as e:
+            logger.error(f"Ошибка при применении файла изменений: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+def main():
+    """Синхронизация и обмен файлами изменений из командной строки."""
+    from database import DatabaseManager, database_needs_upgrade
+
+    parser = argparse.ArgumentParser(description="Синхронизация баз задач")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sync_parser = commands.add_parser("sync", help="синхронизировать две базы")
+    sync_parser.add_argument("db_path", help="файл базы данных")
+    sync_parser.add_argument("other_path", help="файл второй базы данных")
+    sync_parser.add_argument("--rule", choices=SYNC_RULES, default="lww", help="правило разрешения конфликтов")
+    sync_parser.add_argument("--changeset", help="сохранить итоговые изменения в файл")
+    sync_parser.add_argument("--upgrade-other", action="store_true",
+                             help="обновить схему второй базы, если она создана прежней версией")
+    export_parser = commands.add_parser("export", help="сохранить изменения базы в файл")
+    export_parser.add_argument("db_path", help="файл базы данных")
+    export_parser.add_argument("changeset", help="файл изменений")
+    export_parser.add_argument("--since", type=int, default=0, help="версия предыдущего экспорта")
+    import_parser = commands.add_parser("import", help="применить файл изменений")
+    import_parser.add_argument("db_path", help="файл базы данных")
+    import_parser.add_argument("changeset", help="файл изменений")
+    import_parser.add_argument("--rule", choices=SYNC_RULES, default="lww", help="правило разрешения конфликтов")
+    args = parser.parse_args()
+
+    # Вторая база открывается только после проверки схемы: DatabaseManager обновляет ее
+    if args.command == "sync":
+        try:
+            upgrade = database_needs_upgrade(args.other_path)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        if upgrade and not args.upgrade_other:
+            print(f"База {args.other_path} создана прежней версией программы, ее схема будет обновлена; "
+                  "для продолжения укажите --upgrade-other", file=sys.stderr)
+            return 1
+
+    db_manager = DatabaseManager(args.db_path)
+    try:
+        sync_manager = SyncManager(db_manager)
+        if args.command == "sync":
+            other = DatabaseManager(args.other_path)
+            try:
+                stats = sync_manager.sync(other, args.rule, args.changeset)
+            finally:
+                other.close()
+            print(f"Сравнено узлов: {stats['compared']}, различающихся задач: {stats['differing']}")
+            print(f"Записано в {args.db_path}: {stats['to_local']}, в {args.other_path}: {stats['to_other']}")
+        elif args.command == "export":
+            count, last_version = sync_manager.export_changeset(args.changeset, args.since)
+            print(f"Сохранено записей: {count}")
+            print(f"Для следующего экспорта: --since {last_version}")
+        else:
+            count, applied = sync_manager.import_changeset(args.changeset, args.rule)
+            print(f"Записей в файле: {count}, применено: {applied}")
+    finally:
+        db_manager.close()
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Модель задачи.
+Запись задачи, создаваемая прямо из строк SQLite, и колоночное
+хранилище, в котором модель списка держит загруженные задачи.
+"""
+
+import sys
+from array import array
+
+# Формат хранения сроков задач (локальное время)
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+class Task:
+    """Запись задачи."""
+
+    __slots__ = ('id', 'title', 'description', 'priority', 'completed',
+                 'created_at', 'updated_at', 'due_at', 'description_truncated', 'recurring')
+
+    def __init__(self, id, title, description="", priority=1, completed=False,
+                 created_at=None, updated_at=None, due_at=None, description_truncated=False,
+                 recurring=False):
+        """
+        Инициализация записи задачи.
+
+        Args:
+            id: ID задачи
+            title: Заголовок задачи
+            description: Описание задачи (в списках - только превью)
+            priority: Приоритет задачи (1-4)
+            completed: Признак выполнения
+            created_at: Время создания
+            updated_at: Время последнего изменения
+            due_at: Срок выполнения (локальное время) или None
+            description_truncated: Признак того, что описание обрезано до превью
+            recurring: Признак того, что задача - текущее повторение серии
+        """
+        self.id = id
+        self.title = title
+        self.description = description or ""
+        self.priority = priority
+        self.completed = bool(completed)
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.due_at = due_at
+        self.description_truncated = bool(description_truncated)
+        self.recurring = bool(recurring)
+
+    def __repr__(self):
+        return f"Task(id={self.id!r}, title={self.title!r}, priority={self.priority!r}, completed={self.completed!r})"
+
+def task_row_factory(cursor, row):
+    """
+    Фабрика строк sqlite3, создающая Task по именам колонок запроса.
+
+    Args:
+        cursor: Курсор, выполнивший запрос
+        row: Кортеж значений строки
+
+    Returns:
+        Task: Запись задачи
+    """
+    return Task(**{column[0]: value for column, value in zip(cursor.description, row)})
+
+class TaskColumnStore:
+    """
+    Колоночное хранилище задач для больших списков.
+
+    Числовые поля хранятся в массивах array, строки интернируются,
+    поэтому на задачу не создается отдельный объект.
+    """
+
+    __slots__ = ('ids', 'priorities', 'statuses', 'truncated', 'recurring', 'titles', 'descriptions', 'due_dates')
+
+    def __init__(self):
+        """Инициализация пустого хранилища."""
+        self.ids = array('q')
+        self.priorities = array('b')
+        self.statuses = array('b')
+        self.truncated = array('b')
+        self.recurring = array('b')
+        self.titles = []
+        self.descriptions = []
+        self.due_dates = []
+
+    def append(self, task_id, title, description, priority, completed, description_truncated=False, due_at=None,
+               recurring=False):
+        """Добавление задачи в хранилище."""
+        self.ids.append(task_id)
+        self.priorities.append(priority or 0)
+        self.statuses.append(1 if completed else 0)
+        self.truncated.append(1 if description_truncated else 0)
+        self.recurring.append(1 if recurring else 0)
+        self.titles.append(sys.intern(title))
+        self.descriptions.append(sys.intern(description or ""))
+        self.due_dates.append(sys.intern(due_at) if due_at else None)
+
+    def append_task(self, task):
+        """Добавление записи Task в хранилище."""
+        self.append(task.id, task.title, task.description, task.priority, task.completed,
+                    task.description_truncated, task.due_at, task.recurring)
+
+    def replace(self, index, task):
+        """Замена задачи на позиции index обновленной записью Task."""
+        self.ids[index] = task.id
+        self.priorities[index] = task.priority or 0
+        self.statuses[index] = 1 if task.completed else 0
+        self.truncated[index] = 1 if task.description_truncated else 0
+        self.recurring[index] = 1 if task.recurring else 0
+        self.titles[index] = sys.intern(task.title)
+        self.descriptions[index] = sys.intern(task.description or "")
+        self.due_dates[index] = sys.intern(task.due_at) if task.due_at else None
+
+    def remove(self, index):
+        """Удаление задачи на позиции index."""
+        for column in self.__slots__:
+            del getattr(self, column)[index]
+
+    def extend(self, other):
+        """Добавление в конец всех задач другого хранилища."""
+        for column in self.__slots__:
+            getattr(self, column).extend(getattr(other, column))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        """Получение задачи по позиции в виде записи Task."""
+        return Task(self.ids[index], self.titles[index], self.descriptions[index],
+                    self.priorities[index], self.statuses[index],
+                    due_at=self.due_dates[index], description_truncated=self.truncated[index],
+                    recurring=self.recurring[index])
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self[index]
+
+class TaskSelection:
+    """
+    Выделение задач без материализации списка ID.
+
+    Задается либо предикатом из TASK_PREDICATES (например, все выполненные),
+    либо списком диапазонов ID [(первый, последний), ...].
+    """
+
+    __slots__ = ('predicate', 'id_ranges', 'count')
+
+    def __init__(self, predicate=None, id_ranges=(), count=0):
+        """
+        Инициализация выделения.
+
+        Args:
+            predicate: Название предиката или None
+            id_ranges: Диапазоны ID задач (границы включительно)
+            count: Количество выделенных задач (для сообщений)
+        """
+        self.predicate = predicate
+        self.id_ranges = list(id_ranges)
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def contains(self, task_id, completed):
+        """Проверка, входит ли задача в выделение."""
+        if self.predicate is not None:
+            return TASK_PREDICATES[self.predicate][1](completed)
+        return any(first <= task_id <= last for first, last in self.id_ranges)
+
+    def __repr__(self):
+        return f"TaskSelection(predicate={self.predicate!r}, ranges={len(self.id_ranges)}, count={self.count})"
+
+# Предикаты выделения: название -> (условие SQL, проверка по признаку выполнения)
+TASK_PREDICATES = {
+    'all': ("1", lambda completed: True),
+    'completed': ("tasks.completed != 0", lambda completed: bool(completed)),
+    'open': ("tasks.completed = 0", lambda completed: not completed),
+}
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Доска задач с колонками по статусу или приоритету.
+Колонки доски - фильтрующие представления общей модели списка, поэтому
+задачи не копируются, а изменение задачи в таблице сразу переносит
+карточку в нужную колонку. Перетаскивание карточки в другую колонку
+сообщает об изменении одного поля одной задачи.
+"""
+
+import logging
+import traceback
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+                            QListView, QAbstractItemView)
+from PyQt6.QtCore import Qt, QSortFilterProxyModel, pyqtSignal
+from task_list_model import parse_task_ids
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Группировки доски: название -> (поле задачи, колонки (заголовок, значение, ключ счетчика))
+BOARD_GROUPINGS = {
+    "По статусу": ('completed', (("В работе", False, 'open'),
+                                 ("Выполнено", True, 'done'))),
+    "По приоритету": ('priority', (("Приоритет 4", 4, 'p4'),
+                                   ("Приоритет 3", 3, 'p3'),
+                                   ("Приоритет 2", 2, 'p2'),
+                                   ("Приоритет 1", 1, 'p1'))),
+}
+
+class BoardColumnModel(QSortFilterProxyModel):
+    """Колонка доски: задачи общей модели с заданным значением поля."""
+
+    # Сигнал о задаче, отпущенной в колонке: (ID задачи, поле, новое значение)
+    task_dropped = pyqtSignal(int, str, object)
+
+    def __init__(self, field, value, parent=None):
+        """
+        Инициализация колонки.
+
+        Args:
+            field: Поле задачи ('completed' или 'priority')
+            value: Значение поля для задач колонки
+            parent: Родительский объект
+        """
+        super().__init__(parent)
+        self.field = field
+        self.value = value
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.sourceModel().value(source_row, self.field) == self.value
+
+    def dropMimeData(self, data, action, row, column, parent):
+        """Перенос отпущенных задач в колонку (порядок внутри колонки не меняется)."""
+        try:
+            source = self.sourceModel()
+            for task_id in parse_task_ids(data):
+                source_row = source.find_row(task_id)
+                if source_row is not None and source.value(source_row, self.field) != self.value:
+                    self.task_dropped.emit(task_id, self.field, self.value)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при переносе задачи на доске: {str(e)}")
+            logger.error(traceback.format_exc())
+            return False
+
+class TaskBoard(QWidget):
+    """Доска задач поверх общей модели списка."""
+
+    # Сигнал о переносе задачи в другую колонку: (ID задачи, поле, новое значение)
+    task_dropped = pyqtSignal(int, str, object)
+    # Сигнал о выборе карточки: строка общей модели
+    task_selected = pyqtSignal(int)
+    # Сигнал о двойном щелчке по карточке: строка общей модели
+    task_activated = pyqtSignal(int)
+
+    def __init__(self, model, parent=None):
+        """
+        Инициализация доски.
+
+        Args:
+            model: Общая модель списка задач (TaskListModel)
+            parent: Родительский виджет
+        """
+        super().__init__(parent)
+        self.model = model
+        self.columns = []
+        self.stats = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        grouping_layout = QHBoxLayout()
+        grouping_layout.addWidget(QLabel("Группировка:"))
+        self.groupingCombo = QComboBox()
+        self.groupingCombo.addItems(BOARD_GROUPINGS)
+        grouping_layout.addWidget(self.groupingCombo)
+        grouping_layout.addStretch()
+        layout.addLayout(grouping_layout)
+        self.columnsLayout = QHBoxLayout()
+        layout.addLayout(self.columnsLayout, 1)
+
+        self.groupingCombo.currentTextChanged.connect(self.set_grouping)
+        self.set_grouping(self.groupingCombo.currentText())
+
+    def set_grouping(self, name):
+        """Перестроение колонок доски для группировки name."""
+        try:
+            for widget, _, _, _, _ in self.columns:
+                self.columnsLayout.removeWidget(widget)
+                widget.deleteLater()
+            self.columns = []
+
+            field, columns = BOARD_GROUPINGS[name]
+            for title, value, stats_key in columns:
+                # Модель колонки удаляется вместе с виджетом колонки при перестроении
+                widget = QWidget()
+                proxy = BoardColumnModel(field, value, widget)
+                proxy.setSourceModel(self.model)
+                proxy.task_dropped.connect(self.task_dropped)
+
+                view = QListView()
+                view.setModel(proxy)
+                view.setUniformItemSizes(True)
+                view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+                view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+                view.setDragEnabled(True)
+                view.setAcceptDrops(True)
+                view.setDropIndicatorShown(False)
+                view.setDragDropMode(QAbstractItemView.DragDropMode.DragDrop)
+                view.setDefaultDropAction(Qt.DropAction.MoveAction)
+                view.selectionModel().currentChanged.connect(
+                    lambda current, previous, proxy=proxy: self.handle_current_changed(proxy, current))
+                view.doubleClicked.connect(
+                    lambda index, proxy=proxy: self.task_activated.emit(proxy.mapToSource(index).row()))
+
+                column_layout = QVBoxLayout(widget)
+                column_layout.setContentsMargins(0, 0, 0, 0)
+                header = QLabel()
+                header.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                column_layout.addWidget(header)
+                column_layout.addWidget(view)
+                self.columnsLayout.addWidget(widget)
+                self.columns.append((widget, header, proxy, title, stats_key))
+            self.update_counts(self.stats)
+            logger.debug(f"Доска сгруппирована: {name}")
+        except Exception as e:
+            logger.error(f"Ошибка при построении доски: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def column_models(self):
+        """Модели колонок доски в порядке отображения."""
+        return [proxy for _, _, proxy, _, _ in self.columns]
+
+    def handle_current_changed(self, proxy, current):
+        """Передача выбранной карточки в общий выбор задачи."""
+        if current.isValid():
+            self.task_selected.emit(proxy.mapToSource(current).row())
+
+    def update_counts(self, stats):
+        """
+        Обновление заголовков колонок.
+
+        Args:
+            stats: Счетчики задач get_task_stats или None (заголовки без счетчиков,
+                например при фильтре по тегам)
+        """
+        self.stats = stats
+        for _, header, _, title, stats_key in self.columns:
+            header.setText(f"{title} ({stats[stats_key]})" if stats else title)
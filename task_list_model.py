@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Модель списка задач с постепенной загрузкой.
+Одна модель служит источником данных и для таблицы, и для доски:
+задачи запрашиваются из базы страницами по мере прокрутки и хранятся
+в колоночном хранилище, а изменения одной задачи передаются видам
+сигналами dataChanged / rowsRemoved только для ее строки.
+"""
+
+import logging
+import traceback
+from bisect import bisect_left
+from datetime import datetime
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QMimeData
+from PyQt6.QtGui import QColor
+from database import DATETIME_FORMAT, LIST_PAGE_SIZE, TAG_FILTER_PAGE_SIZE
+from delegates import STATUS_LABELS
+from task import TaskColumnStore
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Заголовки колонок списка
+TASK_COLUMNS = ("Заголовок", "Описание", "Приоритет", "Статус", "Срок")
+
+# Колонки, редактируемые делегатами прямо в таблице
+EDITABLE_COLUMNS = range(4)
+
+# MIME-тип перетаскиваемых задач (ID через запятую)
+TASK_MIME_TYPE = "application/x-taskmanager-task-ids"
+
+def parse_task_ids(mime_data):
+    """ID задач из перетаскиваемых данных."""
+    if not mime_data.hasFormat(TASK_MIME_TYPE):
+        return []
+    text = bytes(mime_data.data(TASK_MIME_TYPE)).decode("ascii")
+    return [int(task_id) for task_id in text.split(",") if task_id]
+
+class TaskListModel(QAbstractTableModel):
+    """
+    Модель списка задач по возрастанию ID с подгрузкой страниц.
+
+    Модель хранит окно подряд идущих задач списка. Обычно окно начинается
+    с первой задачи, но для перехода к далекой задаче окно загружается
+    прямо вокруг нее по ключу (ID), без строк между началом списка и ней;
+    предыдущие страницы подгружаются при прокрутке вида к началу окна.
+    """
+
+    def __init__(self, db_manager, parent=None):
+        """
+        Инициализация модели.
+
+        Args:
+            db_manager: Менеджер базы данных
+            parent: Родительский объект
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.store = TaskColumnStore()
+        # Текущий фильтр по тегам (пустой список - все задачи)
+        self.tag_names = []
+        self.match_all = True
+        # Признак того, что загружены все страницы
+        self.fetched_all = True
+        # ID, после которого начинается окно (0 - с начала списка), и признак
+        # того, что загружены все страницы перед окном
+        self.start_after = 0
+        self.fetched_start = True
+        # Время для выделения просроченных задач (обновляется при загрузке)
+        self.now = ""
+
+    def reload(self, tag_names=(), match_all=True, start_after=0):
+        """
+        Сброс модели и загрузка первой страницы задач.
+
+        Args:
+            tag_names: Теги фильтра (пустой список - все задачи)
+            match_all: True - задача должна иметь все теги, False - любой из них
+            start_after: ID, после которого начинается окно (0 - с начала списка);
+                для окна в середине списка загружается и страница перед ним,
+                чтобы вид можно было прокрутить вверх
+        """
+        self.beginResetModel()
+        try:
+            self.store = TaskColumnStore()
+            self.tag_names = list(tag_names)
+            self.match_all = match_all
+            self.start_after = start_after
+            self.fetched_all = False
+            self.fetched_start = not start_after
+            for task in self.fetch_page():
+                self.store.append_task(task)
+            if not self.fetched_start:
+                self.store = self.prepend_page(self.store)
+        finally:
+            self.endResetModel()
+
+    def is_complete(self):
+        """Признак того, что модель содержит все задачи (без фильтра)."""
+        return not self.tag_names
+
+    def fetch_page(self, before_id=None):
+        """
+        Запрос следующей страницы задач из базы (без добавления в модель).
+
+        Args:
+            before_id: ID первой задачи окна - для страницы перед окном
+
+        Returns:
+            list: Записи Task страницы
+        """
+        after_id = self.store.ids[-1] if self.store.ids else self.start_after
+        if self.tag_names:
+            page_size = TAG_FILTER_PAGE_SIZE
+            tasks = self.db_manager.filter_tasks_by_tags(self.tag_names, self.match_all, after_id=after_id,
+                                                         before_id=before_id)
+        else:
+            page_size = LIST_PAGE_SIZE
+            tasks = self.db_manager.get_tasks_page(after_id, page_size, before_id=before_id)
+        if len(tasks) < page_size:
+            if before_id is None:
+                self.fetched_all = True
+            else:
+                self.fetched_start = True
+        self.now = datetime.now().strftime(DATETIME_FORMAT)
+        return tasks
+
+    def prepend_page(self, store):
+        """Хранилище из страницы задач перед окном и задач store."""
+        result = TaskColumnStore()
+        for task in self.fetch_page(before_id=store.ids[0] if store.ids else self.start_after + 1):
+            result.append_task(task)
+        result.extend(store)
+        return result
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.fetched_all
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Подгрузка следующей страницы задач при прокрутке вида до конца."""
+        try:
+            if parent.isValid() or self.fetched_all:
+                return
+            tasks = self.fetch_page()
+            if not tasks:
+                return
+            first = len(self.store)
+            self.beginInsertRows(QModelIndex(), first, first + len(tasks) - 1)
+            for task in tasks:
+                self.store.append_task(task)
+            self.endInsertRows()
+            logger.debug(f"Подгружено задач в список: {len(tasks)}")
+        except Exception as e:
+            logger.error(f"Ошибка при подгрузке задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.fetched_all = True
+
+    def fetch_previous(self):
+        """
+        Подгрузка страницы задач перед окном при прокрутке вида к его началу.
+
+        Returns:
+            int: Количество строк, добавленных в начало модели
+        """
+        try:
+            if self.fetched_start:
+                return 0
+            store = self.prepend_page(self.store)
+            added = len(store) - len(self.store)
+            if not added:
+                return 0
+            self.beginInsertRows(QModelIndex(), 0, added - 1)
+            self.store = store
+            self.endInsertRows()
+            logger.debug(f"Подгружено задач перед окном списка: {added}")
+            return added
+        except Exception as e:
+            logger.error(f"Ошибка при подгрузке предыдущих задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.fetched_start = True
+            return 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(TASK_COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        store = self.store
+        row = index.row()
+        column = index.column()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if column == 0:
+                return store.titles[row]
+            if column == 1:
+                return store.descriptions[row] + ("…" if store.truncated[row] else "")
+            if column == 2:
+                return str(store.priorities[row])
+            if column == 3:
+                return STATUS_LABELS[store.statuses[row]]
+            if column == 4:
+                due_text = ""
+                due = store.due_dates[row]
+                if due:
+                    due_text = f"{due[8:10]}.{due[5:7]}.{due[0:4]} {due[11:16]}"
+                if store.recurring[row]:
+                    due_text += " ↻"
+                return due_text
+        elif role == Qt.ItemDataRole.UserRole:
+            # ID задачи в первой колонке, признак обрезки описания - во второй
+            if column == 0:
+                return store.ids[row]
+            if column == 1:
+                return bool(store.truncated[row])
+        elif role == Qt.ItemDataRole.BackgroundRole:
+            if store.statuses[row]:
+                return QColor("#e6ffe6")
+        elif role == Qt.ItemDataRole.ForegroundRole and column == 4:
+            # Просроченные невыполненные задачи выделяем цветом
+            due = store.due_dates[row]
+            if due and not store.statuses[row] and due < self.now:
+                return QColor("#cc0000")
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return TASK_COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            # Задачи можно отпустить на пустое место вида (колонку доски)
+            return Qt.ItemFlag.ItemIsDropEnabled
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsDragEnabled
+        if index.column() in EDITABLE_COLUMNS:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def mimeTypes(self):
+        return [TASK_MIME_TYPE]
+
+    def mimeData(self, indexes):
+        """Перетаскиваемые данные: ID задач выделенных строк."""
+        task_ids = []
+        for index in indexes:
+            task_id = self.store.ids[index.row()]
+            if task_id not in task_ids:
+                task_ids.append(task_id)
+        mime_data = QMimeData()
+        mime_data.setData(TASK_MIME_TYPE, ",".join(map(str, task_ids)).encode("ascii"))
+        return mime_data
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def dropMimeData(self, data, action, row, column, parent):
+        # Порядок строк определяется базой; перемещение обрабатывают виды
+        return False
+
+    def task_id(self, row):
+        """ID задачи строки."""
+        return self.store.ids[row]
+
+    def task(self, row):
+        """Задача строки в виде записи Task (только поля списка)."""
+        return self.store[row]
+
+    def value(self, row, field):
+        """Значение поля 'completed' или 'priority' задачи строки."""
+        if field == 'completed':
+            return bool(self.store.statuses[row])
+        return self.store.priorities[row]
+
+    def find_row(self, task_id, fetch=False):
+        """
+        Поиск строки задачи или None.
+
+        Args:
+            task_id: ID задачи
+            fetch: Подгружать страницы, пока задача может оказаться дальше
+        """
+        ids = self.store.ids
+        # Строки всегда упорядочены по ID, поэтому ищем двоичным поиском
+        while fetch and not self.fetched_all and (not ids or ids[-1] < task_id):
+            self.fetchMore()
+            ids = self.store.ids
+        row = bisect_left(ids, task_id)
+        return row if row < len(ids) and ids[row] == task_id else None
+
+    def locate(self, task_id):
+        """
+        Строка задачи; если задача вне окна, окно загружается заново вокруг нее.
+
+        Returns:
+            int: Строка задачи или None, если задачи нет в списке
+        """
+        row = self.find_row(task_id)
+        if row is None:
+            self.reload(self.tag_names, self.match_all, start_after=task_id - 1)
+            row = self.find_row(task_id)
+        return row
+
+    def refresh_row(self, row):
+        """
+        Перечитывание одной задачи из базы с обновлением только ее строки.
+
+        Returns:
+            Task: Обновленная запись задачи или None, если задача удалена
+        """
+        task = self.db_manager.get_task_preview(self.store.ids[row])
+        if task:
+            self.now = datetime.now().strftime(DATETIME_FORMAT)
+            self.store.replace(row, task)
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(TASK_COLUMNS) - 1))
+        else:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.store.remove(row)
+            self.endRemoveRows()
+        return task
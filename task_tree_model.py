@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Модель дерева задач с ленивой загрузкой.
+Дочерние задачи запрашиваются из базы только при раскрытии узла
+и страницами по TREE_PAGE_SIZE, поэтому иерархия целиком не загружается.
+"""
+
+import logging
+import traceback
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PyQt6.QtGui import QColor
+from database import TREE_PAGE_SIZE
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Заголовки колонок дерева
+TREE_COLUMNS = ("Заголовок", "Приоритет", "Статус", "Прогресс")
+
+class TreeNode:
+    """Узел дерева задач."""
+
+    __slots__ = ('task_id', 'title', 'priority', 'completed', 'has_children',
+                 'parent', 'position', 'children', 'fetched_all', 'progress')
+
+    def __init__(self, task_id=None, title="", priority=1, completed=False, has_children=True, parent=None):
+        self.task_id = task_id
+        self.title = title
+        self.priority = priority
+        self.completed = bool(completed)
+        self.has_children = bool(has_children)
+        self.parent = parent
+        # Позиция среди дочерних узлов родителя (нужна методу parent() модели)
+        self.position = 0
+        self.children = []
+        # Признак того, что загружены все дочерние задачи
+        self.fetched_all = not has_children
+        # Кэш прогресса поддерева (выполнено, всего) до следующего обновления узла
+        self.progress = None
+
+    def last_id(self):
+        """ID последней загруженной дочерней задачи."""
+        return self.children[-1].task_id if self.children else 0
+
+class TaskTreeModel(QAbstractItemModel):
+    """Модель дерева задач по колонке parent_id."""
+
+    def __init__(self, db_manager, parent=None):
+        """
+        Инициализация модели.
+
+        Args:
+            db_manager: Менеджер базы данных
+            parent: Родительский объект
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.root = TreeNode()
+        # Признак того, что данные устарели и дерево нужно перечитать при показе
+        self.dirty = True
+
+    def reload(self):
+        """Сброс дерева: заново будут загружены только задачи верхнего уровня."""
+        self.beginResetModel()
+        self.root = TreeNode()
+        self.dirty = False
+        self.endResetModel()
+
+    def mark_dirty(self):
+        """Отметка о том, что задачи изменились вне дерева."""
+        self.dirty = True
+
+    def node(self, index):
+        """Узел по индексу модели."""
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        parent_node = self.node(parent)
+        if 0 <= row < len(parent_node.children) and 0 <= column < len(TREE_COLUMNS):
+            return self.createIndex(row, column, parent_node.children[row])
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent_node = index.internalPointer().parent
+        if parent_node is None or parent_node is self.root:
+            return QModelIndex()
+        return self.createIndex(parent_node.position, 0, parent_node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(TREE_COLUMNS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        # Признак наличия подзадач приходит вместе с узлом, поэтому стрелка
+        # раскрытия видна до загрузки дочерних задач
+        return self.node(parent).has_children
+
+    def canFetchMore(self, parent):
+        return not self.node(parent).fetched_all
+
+    def fetchMore(self, parent):
+        """Загрузка следующей страницы дочерних задач узла."""
+        try:
+            node = self.node(parent)
+            rows = self.db_manager.get_children(node.task_id, node.last_id())
+            if len(rows) < TREE_PAGE_SIZE:
+                node.fetched_all = True
+            if not rows:
+                return
+            first = len(node.children)
+            self.beginInsertRows(parent, first, first + len(rows) - 1)
+            for position, row in enumerate(rows, first):
+                child = TreeNode(*row, parent=node)
+                child.position = position
+                node.children.append(child)
+            self.endInsertRows()
+            logger.debug(f"Загружено подзадач узла {node.task_id}: {len(rows)}")
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке подзадач: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.node(parent).fetched_all = True
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return node.title
+            if column == 1:
+                return str(node.priority)
+            if column == 2:
+                return "Выполнено" if node.completed else "В работе"
+            if column == 3 and node.has_children:
+                # Прогресс считается рекурсивным запросом только для видимых узлов
+                if node.progress is None:
+                    node.progress = self.db_manager.get_subtree_progress(node.task_id)
+                done, total = node.progress
+                return f"{done}/{total}"
+        elif role == Qt.ItemDataRole.UserRole:
+            return node.task_id
+        elif role == Qt.ItemDataRole.BackgroundRole and node.completed:
+            return QColor("#e6ffe6")
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return TREE_COLUMNS[section]
+        return None
+
+    def task_id(self, index):
+        """ID задачи по индексу модели."""
+        return self.node(index).task_id
+
+    def refresh_children(self, parent):
+        """
+        Перечитывание дочерних задач узла после изменения поддерева.
+
+        Раскрытые ветки внутри узла сворачиваются, остальное дерево не меняется.
+        """
+        node = self.node(parent)
+        if node.children:
+            self.beginRemoveRows(parent, 0, len(node.children) - 1)
+            node.children = []
+            self.endRemoveRows()
+        node.has_children = True
+        node.fetched_all = False
+        node.progress = None
+        self.fetchMore(parent)
+        if not node.children and node is not self.root:
+            node.has_children = False
+        self.invalidate_progress(parent)
+
+    def invalidate_progress(self, index):
+        """Сброс кэша прогресса узла и его предков."""
+        while index.isValid():
+            node = index.internalPointer()
+            node.progress = None
+            progress_index = self.createIndex(index.row(), 3, node)
+            self.dataChanged.emit(progress_index, progress_index)
+            index = index.parent()
+
+    def refresh_node(self, index):
+        """Перечитывание задачи узла и ее загруженных подзадач из базы."""
+        node = self.node(index)
+        task = self.db_manager.get_task_preview(node.task_id)
+        if task is None:
+            self.remove_node(index)
+            return
+        node.title = task.title
+        node.priority = task.priority
+        node.completed = task.completed
+        self.dataChanged.emit(self.createIndex(index.row(), 0, node),
+                              self.createIndex(index.row(), len(TREE_COLUMNS) - 1, node))
+        self.refresh_children(index)
+
+    def remove_node(self, index):
+        """Удаление узла из дерева после удаления или переноса задачи."""
+        parent = index.parent()
+        parent_node = self.node(parent)
+        row = index.row()
+        self.beginRemoveRows(parent, row, row)
+        del parent_node.children[row]
+        for position in range(row, len(parent_node.children)):
+            parent_node.children[position].position = position
+        self.endRemoveRows()
+        if not parent_node.children and parent_node.fetched_all and parent_node is not self.root:
+            parent_node.has_children = False
+        self.invalidate_progress(parent)
+
+    def find_index(self, task_id):
+        """Поиск индекса задачи среди уже загруженных узлов."""
+        if task_id is None:
+            return QModelIndex()
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for row, child in enumerate(node.children):
+                if child.task_id == task_id:
+                    return self.createIndex(row, 0, child)
+                stack.append(child)
+        return None
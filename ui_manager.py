@@ -1,19 +1,52 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
-                            QHeaderView, QPushButton, QTableWidgetItem)
-from PyQt6.QtGui import QIcon, QColor
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView,
+                            QHeaderView, QPushButton, QLabel, QToolTip, QApplication,
+                            QListWidget, QListWidgetItem, QComboBox, QTabWidget, QTreeView)
+from PyQt6.QtGui import QIcon
+from PyQt6.QtCore import Qt, QObject, QEvent
 import logging
 import os
+import time
 import winreg
 import traceback
+from task import TaskSelection
+from task_list_model import TaskListModel
+from task_tree_model import TaskTreeModel
+from task_board import TaskBoard
+from delegates import TitleDelegate, DescriptionDelegate, PriorityDelegate, StatusDelegate
 
 logger = logging.getLogger(__name__)
 
+# Максимальная длина описания во всплывающей подсказке
+DESCRIPTION_TOOLTIP_LENGTH = 2000
+
+# Количество строк, по которым подбирается ширина колонок таблицы
+COLUMN_SIZE_SAMPLE_ROWS = 100
+
+# Колонки с шириной по содержимому (заголовок и описание растягиваются)
+CONTENT_SIZED_COLUMNS = (2, 3, 4)
+
+class DescriptionToolTipFilter(QObject):
+    """Фильтр событий, загружающий полное описание задачи только для подсказки."""
+    
+    def __init__(self, ui_manager):
+        super().__init__(ui_manager.taskTable)
+        self.ui_manager = ui_manager
+    
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.ToolTip:
+            return self.ui_manager.show_description_tooltip(event)
+        return False
+
 class UIManager:
     """Класс для управления пользовательским интерфейсом."""
     
     def __init__(self, parent):
         self.parent = parent
+        # Признак того, что ширина узких колонок уже подобрана по содержимому
+        self.columns_sized = False
+        # Набранное начало заголовка для перехода к задаче и время последней буквы
+        self.search_text = ""
+        self.search_time = 0.0
         self.setup_ui()
         logger.debug("UI менеджер инициализирован")
     
@@ -27,26 +60,85 @@ class UIManager:
             # Создаем главный layout
             layout = QVBoxLayout(central_widget)
             
+            # Создаем layout с боковой панелью фильтра и таблицей
+            content_layout = QHBoxLayout()
+            
+            # Боковая панель фильтра по тегам
+            filter_layout = QVBoxLayout()
+            filter_layout.addWidget(QLabel("Рабочая область:"))
+            self.workspaceCombo = QComboBox()
+            self.workspaceCombo.setMaximumWidth(200)
+            filter_layout.addWidget(self.workspaceCombo)
+            filter_layout.addWidget(QLabel("Теги:"))
+            self.tagModeCombo = QComboBox()
+            self.tagModeCombo.addItems(["Все выбранные (И)", "Любой из выбранных (ИЛИ)"])
+            filter_layout.addWidget(self.tagModeCombo)
+            self.tagList = QListWidget()
+            self.tagList.setMaximumWidth(200)
+            filter_layout.addWidget(self.tagList)
+            self.clearTagsButton = QPushButton("Сбросить фильтр")
+            filter_layout.addWidget(self.clearTagsButton)
+            content_layout.addLayout(filter_layout)
+            
+            # Общая модель списка: таблица и доска показывают одни и те же
+            # строки, подгружаемые страницами при прокрутке
+            self.taskModel = TaskListModel(self.parent.db_manager, self.parent)
+            
             # Создаем таблицу задач
-            self.taskTable = QTableWidget()
-            self.taskTable.setColumnCount(4)
-            self.taskTable.setHorizontalHeaderLabels(["Заголовок", "Описание", "Приоритет", "Статус"])
+            self.taskTable = QTableView()
+            self.taskTable.setModel(self.taskModel)
             self.taskTable.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
             self.taskTable.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-            self.taskTable.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-            self.taskTable.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
-            
-            # Включаем поддержку drag-and-drop
-            self.taskTable.setDragEnabled(True)
-            self.taskTable.setDragDropMode(QTableWidget.DragDropMode.InternalMove)
-            self.taskTable.setDragDropOverwriteMode(False)
-            
-            # Подключаем обработчики событий drag-and-drop
-            self.taskTable.dragEnterEvent = self.handle_drag_enter
-            self.taskTable.dragMoveEvent = self.handle_drag_move
-            self.taskTable.dropEvent = self.handle_drop_event
-            
-            layout.addWidget(self.taskTable)
+            self.taskTable.verticalHeader().setResizeContentsPrecision(COLUMN_SIZE_SAMPLE_ROWS)
+            self.taskTable.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+            self.taskTable.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
+            
+            # Редактирование в таблице через делегаты (двойной щелчок или F2)
+            self.taskTable.setEditTriggers(QTableView.EditTrigger.DoubleClicked |
+                                           QTableView.EditTrigger.EditKeyPressed)
+            db_manager = self.parent.db_manager
+            self.delegates = [TitleDelegate(db_manager, self.taskTable),
+                              DescriptionDelegate(db_manager, self.taskTable),
+                              PriorityDelegate(db_manager, self.taskTable),
+                              StatusDelegate(db_manager, self.taskTable)]
+            for column, delegate in enumerate(self.delegates):
+                self.taskTable.setItemDelegateForColumn(column, delegate)
+            
+            # Строки списка всегда идут по ID и подгружаются окном, собственного
+            # порядка у задач нет, поэтому строки не перетаскиваются (статус и
+            # приоритет меняются перетаскиванием карточек на доске)
+            
+            # Переход к задаче по первым буквам заголовка ищет по индексу базы,
+            # а не по загруженным строкам
+            self.taskTable.keyboardSearch = self.handle_keyboard_search
+            # Задачи перед окном модели подгружаются при прокрутке к первой строке
+            self.taskTable.verticalScrollBar().valueChanged.connect(self.fetch_previous_rows)
+            
+            # Полное описание подгружается только при запросе подсказки
+            self.tooltipFilter = DescriptionToolTipFilter(self)
+            self.taskTable.viewport().installEventFilter(self.tooltipFilter)
+            
+            # Дерево подзадач: дочерние задачи загружаются при раскрытии узла
+            self.treeModel = TaskTreeModel(self.parent.db_manager, self.parent)
+            self.taskTree = QTreeView()
+            self.taskTree.setModel(self.treeModel)
+            self.taskTree.setUniformRowHeights(True)
+            self.taskTree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+            self.taskTree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+            self.taskTree.header().setStretchLastSection(False)
+            self.taskTree.verticalScrollBar().valueChanged.connect(self.fetch_more_tree_rows)
+            
+            # Доска с колонками по статусу или приоритету поверх общей модели
+            self.taskBoard = TaskBoard(self.taskModel)
+            self.taskBoard.task_selected.connect(self.select_task_row)
+            
+            # Вкладки списка, дерева и доски
+            self.viewTabs = QTabWidget()
+            self.viewTabs.addTab(self.taskTable, "Список")
+            self.viewTabs.addTab(self.taskTree, "Дерево")
+            self.viewTabs.addTab(self.taskBoard, "Доска")
+            content_layout.addWidget(self.viewTabs, 1)
+            layout.addLayout(content_layout)
             
             # Создаем горизонтальный layout для кнопок
             button_layout = QHBoxLayout()
@@ -71,6 +163,10 @@ class UIManager:
             # Настройка кнопок
             self.setup_buttons()
             
+            # Создаем метку со статистикой задач в строке состояния
+            self.statsLabel = QLabel()
+            self.parent.statusBar().addPermanentWidget(self.statsLabel)
+            
             logger.debug("Интерфейс настроен успешно")
         except Exception as e:
             logger.error(f"Ошибка при настройке интерфейса: {str(e)}")
@@ -88,123 +184,389 @@ class UIManager:
         except Exception as e:
             logger.error(f"Ошибка при настройке кнопок: {str(e)}")
     
-    def restore_table_state(self, state):
-        """Восстановление состояния таблицы."""
-        try:
-            self.taskTable.setRowCount(len(state))
-            for row, row_data in enumerate(state):
-                for col, text in enumerate(row_data):
-                    item = QTableWidgetItem(text)
-                    if col != 3:  # Все колонки кроме приоритета не редактируемые
-                        item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    else:
-                        item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                    self.taskTable.setItem(row, col, item)
-        except Exception as e:
-            logger.error(f"Ошибка при восстановлении состояния таблицы: {str(e)}")
-            logger.error(traceback.format_exc())
-    
-    def load_tasks(self, tasks):
-        """Загрузка задач в таблицу."""
+    def load_tasks(self, tag_names=(), match_all=True):
+        """
+        Загрузка первой страницы задач в общую модель таблицы и доски.
+        
+        Args:
+            tag_names: Теги фильтра (пустой список - все задачи)
+            match_all: True - задача должна иметь все теги, False - любой из них
+        """
         try:
-            # Блокируем сигналы таблицы
-            self.taskTable.blockSignals(True)
-            
-            # Сохраняем текущую выделенную строку
-            current_row = self.taskTable.currentRow()
-            current_id = None
-            if current_row >= 0:
-                current_id = self.taskTable.item(current_row, 0).data(Qt.ItemDataRole.UserRole)
+            # Сохраняем текущую задачу
+            current_id = self.get_current_task_id()
             
-            self.taskTable.setRowCount(0)
-            for task in tasks:
-                row = self.taskTable.rowCount()
-                self.taskTable.insertRow(row)
-                
-                # Заголовок
-                title_item = QTableWidgetItem(task[1])
-                title_item.setFlags(title_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                title_item.setData(Qt.ItemDataRole.UserRole, task[0])  # Сохраняем ID в данных ячейки
-                self.taskTable.setItem(row, 0, title_item)
-                
-                # Описание
-                desc_item = QTableWidgetItem(task[2] or "")
-                desc_item.setFlags(desc_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                self.taskTable.setItem(row, 1, desc_item)
-                
-                # Приоритет
-                priority_item = QTableWidgetItem(str(task[3]))
-                priority_item.setFlags(priority_item.flags() | Qt.ItemFlag.ItemIsEditable)
-                self.taskTable.setItem(row, 2, priority_item)
-                
-                # Статус
-                status_item = QTableWidgetItem("Выполнено" if task[4] else "В работе")
-                status_item.setFlags(status_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                self.taskTable.setItem(row, 3, status_item)
-                
-                # Если задача выполнена, меняем цвет фона
-                if task[4]:
-                    for col in range(self.taskTable.columnCount()):
-                        item = self.taskTable.item(row, col)
-                        if item:
-                            item.setBackground(QColor("#e6ffe6"))
+            # Окно загружается сразу вокруг текущей задачи (строки по возрастанию
+            # ID), страницы между началом списка и ней не запрашиваются
+            self.taskModel.reload(tag_names, match_all, start_after=current_id - 1 if current_id else 0)
             
             # Восстанавливаем выделение
-            if current_id:
-                for row in range(self.taskTable.rowCount()):
-                    if self.taskTable.item(row, 0).data(Qt.ItemDataRole.UserRole) == current_id:
-                        self.taskTable.selectRow(row)
-                        break
-            
-            self.taskTable.resizeColumnsToContents()
-            logger.debug(f"Загружено {len(tasks)} задач")
+            if current_id is not None:
+                row = self.taskModel.find_row(current_id)
+                if row is not None:
+                    self.taskTable.selectRow(row)
+            
+            # Ширина узких колонок (приоритет, статус, срок) от задач почти не зависит,
+            # поэтому подбирается один раз, а не опросом модели при каждой загрузке
+            if not self.columns_sized and self.taskModel.rowCount():
+                for column in CONTENT_SIZED_COLUMNS:
+                    self.taskTable.resizeColumnToContents(column)
+                self.columns_sized = True
+            logger.debug(f"Загружено {self.taskModel.rowCount()} задач")
             
         except Exception as e:
             logger.error(f"Ошибка при загрузке задач: {str(e)}")
             logger.error(traceback.format_exc())
             raise
+    
+    def refresh_row(self, row):
+        """
+        Обновление одной строки из базы данных (в таблице и на доске).
+        
+        Returns:
+            Task: Обновленная запись задачи или None, если задача удалена
+        """
+        try:
+            return self.taskModel.refresh_row(row)
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении строки таблицы: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    def select_task_row(self, row):
+        """Выделение строки общей модели в таблице (например, по карточке доски)."""
+        self.taskTable.selectRow(row)
+    
+    def jump_to_task(self, task_id):
+        """
+        Выделение задачи в таблице; если задача вне загруженного окна, окно
+        загружается вокруг нее.
+        
+        Returns:
+            bool: True, если задача есть в списке
+        """
+        row = self.taskModel.locate(task_id)
+        if row is None:
+            return False
+        self.taskTable.selectRow(row)
+        self.taskTable.scrollTo(self.taskModel.index(row, 0), QTableView.ScrollHint.PositionAtCenter)
+        return True
+    
+    def handle_keyboard_search(self, text):
+        """
+        Переход к задаче по набранным первым буквам заголовка.
+        
+        Буквы, набранные быстрее интервала клавиатурного поиска, складываются
+        в одну строку; повтор одной и той же буквы переходит к следующей задаче
+        на эту букву.
+        """
+        try:
+            now = time.monotonic()
+            if now - self.search_time > QApplication.keyboardInputInterval() / 1000:
+                self.search_text = ""
+            self.search_time = now
+            self.search_text += text
+            
+            current_id = self.get_current_task_id() or 0
+            prefix = self.search_text
+            if len(set(prefix)) == 1:
+                prefix = prefix[0]
+                if len(self.search_text) > 1:
+                    current_id += 1
+            names, match_all = self.get_tag_filter()
+            task_id = self.parent.db_manager.find_task_by_title(prefix, current_id, names, match_all)
+            if task_id is not None:
+                self.jump_to_task(task_id)
+        except Exception as e:
+            logger.error(f"Ошибка при переходе к задаче по заголовку: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    def fetch_previous_rows(self, value):
+        """Подгрузка задач перед окном модели при прокрутке таблицы к первой строке."""
+        if value != self.taskTable.verticalScrollBar().minimum():
+            return
+        added = self.taskModel.fetch_previous()
+        if added:
+            # Строка, бывшая первой, остается на месте
+            self.taskTable.scrollTo(self.taskModel.index(added, 0), QTableView.ScrollHint.PositionAtTop)
+    
+    def is_tree_view(self):
+        """Проверка, открыта ли вкладка дерева."""
+        return self.viewTabs.currentWidget() is self.taskTree
+    
+    def fetch_more_tree_rows(self, value):
+        """
+        Подгрузка следующей страницы подзадач при прокрутке дерева до конца.
+        
+        QTreeView сам подгружает только задачи верхнего уровня, поэтому
+        для раскрытых узлов страницы запрашиваются здесь.
+        """
+        try:
+            if value < self.taskTree.verticalScrollBar().maximum():
+                return
+            index = self.taskTree.indexAt(self.taskTree.viewport().rect().bottomLeft())
+            if not index.isValid():
+                return
+            parent = index.parent()
+            while parent.isValid():
+                if self.treeModel.canFetchMore(parent):
+                    self.treeModel.fetchMore(parent)
+                    return
+                parent = parent.parent()
+        except Exception as e:
+            logger.error(f"Ошибка при подгрузке подзадач: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    def get_current_tree_index(self):
+        """Индекс выбранной задачи в дереве или None."""
+        index = self.taskTree.currentIndex()
+        return index.sibling(index.row(), 0) if index.isValid() else None
+    
+    def load_tags(self, tags):
+        """Загрузка тегов со счетчиками в боковую панель с сохранением отметок."""
+        try:
+            checked = set(self.get_tag_filter()[0])
+            self.tagList.blockSignals(True)
+            self.tagList.clear()
+            for name, count in tags:
+                item = QListWidgetItem(f"{name} ({count})")
+                item.setData(Qt.ItemDataRole.UserRole, name)
+                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+                item.setCheckState(Qt.CheckState.Checked if name in checked else Qt.CheckState.Unchecked)
+                self.tagList.addItem(item)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке тегов: {str(e)}")
+            logger.error(traceback.format_exc())
         finally:
-            # Разблокируем сигналы таблицы
-            self.taskTable.blockSignals(False)
+            self.tagList.blockSignals(False)
+    
+    def get_tag_filter(self):
+        """
+        Получение текущего фильтра по тегам.
+        
+        Returns:
+            tuple: (список отмеченных тегов, True для режима И / False для режима ИЛИ)
+        """
+        names = []
+        for index in range(self.tagList.count()):
+            item = self.tagList.item(index)
+            if item.checkState() == Qt.CheckState.Checked:
+                names.append(item.data(Qt.ItemDataRole.UserRole))
+        return names, self.tagModeCombo.currentIndex() == 0
+    
+    def clear_tag_filter(self):
+        """Снятие всех отметок фильтра по тегам."""
+        self.tagList.blockSignals(True)
+        for index in range(self.tagList.count()):
+            self.tagList.item(index).setCheckState(Qt.CheckState.Unchecked)
+        self.tagList.blockSignals(False)
+    
+    def set_tag_filter(self, names, match_all):
+        """Отметка тегов фильтра без загрузки задач."""
+        names = set(names)
+        self.tagList.blockSignals(True)
+        self.tagModeCombo.blockSignals(True)
+        self.tagModeCombo.setCurrentIndex(0 if match_all else 1)
+        for index in range(self.tagList.count()):
+            item = self.tagList.item(index)
+            checked = item.data(Qt.ItemDataRole.UserRole) in names
+            item.setCheckState(Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked)
+        self.tagModeCombo.blockSignals(False)
+        self.tagList.blockSignals(False)
+    
+    def load_workspaces(self, names, current):
+        """Заполнение переключателя рабочих областей."""
+        self.workspaceCombo.blockSignals(True)
+        self.workspaceCombo.clear()
+        self.workspaceCombo.addItems(names)
+        self.workspaceCombo.setCurrentText(current)
+        self.workspaceCombo.blockSignals(False)
+    
+    def set_db_manager(self, db_manager):
+        """Переключение модели списка, делегатов и дерева на базу другой рабочей области."""
+        for delegate in self.delegates:
+            delegate.db_manager = db_manager
+        self.taskModel.db_manager = db_manager
+        self.treeModel.db_manager = db_manager
+        self.treeModel.mark_dirty()
+    
+    def get_view_state(self):
+        """
+        Состояние вида для сохранения в настройках рабочей области.
+        
+        Returns:
+            dict: Вкладка, фильтр по тегам, текущая задача и прокрутка списка
+        """
+        names, match_all = self.get_tag_filter()
+        return {
+            'tab': self.viewTabs.currentIndex(),
+            'tags': names,
+            'match_all': match_all,
+            'task_id': self.get_current_task_id(),
+            'scroll': self.taskTable.verticalScrollBar().value(),
+        }
+    
+    def restore_view_state(self, state):
+        """
+        Восстановление вкладки и фильтра до загрузки задач.
+        
+        Текущая задача и прокрутка восстанавливаются после загрузки
+        методом restore_view_position.
+        """
+        self.viewTabs.blockSignals(True)
+        self.viewTabs.setCurrentIndex(state.get('tab', 0))
+        self.viewTabs.blockSignals(False)
+        self.set_tag_filter(state.get('tags', []), state.get('match_all', True))
+    
+    def restore_view_position(self, state):
+        """Восстановление текущей задачи и прокрутки списка после загрузки задач."""
+        task_id = state.get('task_id')
+        if task_id is not None:
+            # Окно строк загружается вокруг нужной задачи
+            self.jump_to_task(task_id)
+        # Сохраненная прокрутка отсчитывается от начала списка
+        if self.taskModel.fetched_start:
+            self.taskTable.verticalScrollBar().setValue(state.get('scroll', 0))
+    
+    def update_stats(self, stats):
+        """Обновление статистики задач в строке состояния."""
+        try:
+            self.statsLabel.setText(
+                f"Всего: {stats['total']} | В работе: {stats['open']} | Выполнено: {stats['done']} | "
+                f"P1: {stats['p1']} P2: {stats['p2']} P3: {stats['p3']} P4: {stats['p4']} | "
+                f"Просрочено: {stats.get('overdue', 0)}"
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении статистики: {str(e)}")
+            logger.error(traceback.format_exc())
+    
+    def get_selected_row_ranges(self):
+        """
+        Получение выделенных строк в виде объединенных диапазонов.
+        
+        Returns:
+            list: Кортежи (первая строка, последняя строка) по возрастанию
+        """
+        ranges = sorted((selection_range.top(), selection_range.bottom())
+                        for selection_range in self.taskTable.selectionModel().selection())
+        merged = []
+        for top, bottom in ranges:
+            if merged and top <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], bottom))
+            else:
+                merged.append((top, bottom))
+        return merged
+    
+    def get_selection(self):
+        """
+        Получение выделенных задач без обхода ячеек таблицы.
+        
+        Returns:
+            TaskSelection: Выделение в виде предиката или диапазонов ID
+        """
+        try:
+            row_ranges = self.get_selected_row_ranges()
+            count = sum(bottom - top + 1 for top, bottom in row_ranges)
+            if not count:
+                return TaskSelection()
+            
+            row_ids = self.taskModel.store.ids
+            if self.taskModel.is_complete():
+                # Выделены все строки полностью загруженной таблицы - достаточно предиката
+                if (row_ranges == [(0, len(row_ids) - 1)] and self.taskModel.fetched_all
+                        and self.taskModel.fetched_start):
+                    return TaskSelection(predicate='all', count=count)
+                # Загруженные строки полной таблицы - все задачи до последнего ID,
+                # поэтому диапазон строк совпадает с диапазоном ID
+                id_ranges = [(row_ids[top], row_ids[bottom]) for top, bottom in row_ranges]
+            else:
+                # Для отфильтрованной таблицы объединяем идущие подряд ID
+                id_ranges = []
+                for top, bottom in row_ranges:
+                    for task_id in row_ids[top:bottom + 1]:
+                        if id_ranges and id_ranges[-1][1] + 1 == task_id:
+                            id_ranges[-1][1] = task_id
+                        else:
+                            id_ranges.append([task_id, task_id])
+            return TaskSelection(id_ranges=id_ranges, count=count)
+        except Exception as e:
+            logger.error(f"Ошибка при получении выделенных задач: {str(e)}")
+            logger.error(traceback.format_exc())
+            return TaskSelection()
     
     def get_selected_task_ids(self):
-        """Получение ID выбранных задач."""
+        """Получение ID выбранных задач (для небольших выделений)."""
         try:
-            selected_rows = self.taskTable.selectionModel().selectedRows()
-            return [self.taskTable.item(row.row(), 0).data(Qt.ItemDataRole.UserRole) for row in selected_rows]
+            row_ids = self.taskModel.store.ids
+            return [task_id for top, bottom in self.get_selected_row_ranges()
+                    for task_id in row_ids[top:bottom + 1]]
         except Exception as e:
             logger.error(f"Ошибка при получении ID выбранных задач: {str(e)}")
             return []
     
-    def get_selected_task_titles(self):
-        """Получение заголовков выбранных задач."""
+    def get_selected_task_titles(self, limit=10):
+        """Получение заголовков первых выбранных задач (не больше limit)."""
         try:
-            selected_rows = self.taskTable.selectionModel().selectedRows()
-            return [self.taskTable.item(row.row(), 0).text() for row in selected_rows]
+            titles = []
+            for top, bottom in self.get_selected_row_ranges():
+                for row in range(top, min(bottom + 1, top + limit - len(titles))):
+                    titles.append(self.taskModel.store.titles[row])
+                if len(titles) >= limit:
+                    break
+            return titles
         except Exception as e:
             logger.error(f"Ошибка при получении заголовков выбранных задач: {str(e)}")
             return []
     
+    def get_current_row(self):
+        """Строка текущей задачи в общей модели или -1."""
+        index = self.taskTable.currentIndex()
+        return index.row() if index.isValid() else -1
+    
+    def get_current_task_id(self):
+        """ID текущей задачи или None."""
+        row = self.get_current_row()
+        return self.taskModel.task_id(row) if row >= 0 else None
+    
+    def get_current_preview(self):
+        """Текущая задача в виде строки списка (без запроса к базе) или None."""
+        row = self.get_current_row()
+        return self.taskModel.task(row) if row >= 0 else None
+    
     def get_current_task(self):
         """Получение текущей выбранной задачи."""
         try:
-            selected = self.taskTable.currentRow()
-            if selected < 0:
+            task_id = self.get_current_task_id()
+            if task_id is None:
                 return None
                 
-            task_id = self.taskTable.item(selected, 0).data(Qt.ItemDataRole.UserRole)
-            title = self.taskTable.item(selected, 0).text()
-            desc = self.taskTable.item(selected, 1).text()
-            
-            return {
-                'id': task_id,
-                'title': title,
-                'description': desc
-            }
+            # Модель хранит только превью, поэтому задача загружается из базы
+            return self.parent.db_manager.get_task(task_id)
         except Exception as e:
             logger.error(f"Ошибка при получении текущей задачи: {str(e)}")
             return None
     
+    def show_description_tooltip(self, event):
+        """Показ полного описания задачи во всплывающей подсказке."""
+        try:
+            index = self.taskTable.indexAt(event.pos())
+            if not index.isValid() or index.column() != 1:
+                return False
+            
+            if not index.data(Qt.ItemDataRole.UserRole):
+                return False
+            
+            task_id = self.taskModel.task_id(index.row())
+            description = self.parent.db_manager.get_task_description(task_id)
+            if len(description) > DESCRIPTION_TOOLTIP_LENGTH:
+                description = description[:DESCRIPTION_TOOLTIP_LENGTH] + "…"
+            QToolTip.showText(event.globalPos(), description, self.taskTable)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при показе описания задачи: {str(e)}")
+            logger.error(traceback.format_exc())
+            return False
+    
     def load_styles(self):
         """Загрузка стилей приложения."""
         try:
@@ -233,7 +595,7 @@ class UIManager:
                     QMainWindow {
                         background-color: #202020;
                     }
-                    QTableWidget {
+                    QTableView {
                         background-color: #202020;
                         color: #ffffff;
                     }
@@ -246,143 +608,3 @@ class UIManager:
         except Exception as e:
             logger.error(f"Ошибка при загрузке стилей: {str(e)}")
             raise
-    
-    def handle_drag_enter(self, event):
-        """Обработка события входа в зону перетаскивания."""
-        try:
-            if event.source() == self.taskTable:
-                event.acceptProposedAction()
-            else:
-                event.ignore()
-        except Exception as e:
-            logger.error(f"Ошибка при обработке dragEnterEvent: {str(e)}")
-            event.ignore()
-    
-    def handle_drag_move(self, event):
-        """Обработка события перемещения при перетаскивании."""
-        try:
-            if event.source() == self.taskTable:
-                event.acceptProposedAction()
-            else:
-                event.ignore()
-        except Exception as e:
-            logger.error(f"Ошибка при обработке dragMoveEvent: {str(e)}")
-            event.ignore()
-    
-    def handle_drop_event(self, event):
-        """Обработка события отпускания при перетаскивании."""
-        try:
-            if event.source() != self.taskTable:
-                event.ignore()
-                return
-            
-            # Получаем индексы строк
-            drop_row = self.taskTable.rowAt(int(event.position().y()))
-            selected_rows = self.taskTable.selectionModel().selectedRows()
-            
-            if not selected_rows or drop_row < 0 or drop_row >= self.taskTable.rowCount():
-                event.ignore()
-                return
-            
-            source_row = selected_rows[0].row()
-            
-            # Если перетаскиваем на ту же строку, игнорируем событие
-            if source_row == drop_row:
-                event.ignore()
-                return
-            
-            # Получаем ID перемещаемой задачи
-            source_task_id = self.taskTable.item(source_row, 0).data(Qt.ItemDataRole.UserRole)
-            
-            # Получаем все задачи из базы данных
-            tasks = self.parent.db_manager.get_all_tasks()
-            
-            # Находим индекс перемещаемой задачи в списке
-            source_index = next(i for i, task in enumerate(tasks) if task[0] == source_task_id)
-            
-            # Перемещаем задачу в списке
-            task = tasks.pop(source_index)
-            tasks.insert(drop_row if drop_row < source_index else drop_row, task)
-            
-            # Обновляем порядок в базе данных
-            self.parent.db_manager.reorder_tasks(tasks)
-            
-            # Перезагружаем задачи
-            self.load_tasks(tasks)
-            
-            # Выделяем перемещенную строку
-            self.taskTable.selectRow(drop_row)
-            
-            event.acceptProposedAction()
-            
-        except Exception as e:
-            logger.error(f"Ошибка при обработке dropEvent: {str(e)}")
-            logger.error(traceback.format_exc())
-            # В случае ошибки перезагружаем задачи из базы данных
-            tasks = self.parent.db_manager.get_all_tasks()
-            self.load_tasks(tasks)
-            event.ignore()
-    
-    def move_row_up(self, row):
-        """Перемещение данных из указанной строки на одну позицию вверх."""
-        # Сохраняем данные текущей строки
-        current_data = []
-        for col in range(self.taskTable.columnCount()):
-            item = self.taskTable.item(row, col)
-            if item:
-                new_item = QTableWidgetItem(item.text())
-                new_item.setFlags(item.flags())
-                new_item.setBackground(item.background())
-                if col == 0:
-                    new_item.setData(Qt.ItemDataRole.UserRole, item.data(Qt.ItemDataRole.UserRole))
-                current_data.append(new_item)
-            else:
-                current_data.append(None)
-        
-        # Перемещаем данные из верхней строки вниз
-        for col in range(self.taskTable.columnCount()):
-            item = self.taskTable.item(row - 1, col)
-            if item:
-                new_item = QTableWidgetItem(item.text())
-                new_item.setFlags(item.flags())
-                new_item.setBackground(item.background())
-                if col == 0:
-                    new_item.setData(Qt.ItemDataRole.UserRole, item.data(Qt.ItemDataRole.UserRole))
-                self.taskTable.setItem(row, col, new_item)
-        
-        # Вставляем сохраненные данные в верхнюю строку
-        for col in range(self.taskTable.columnCount()):
-            if current_data[col]:
-                self.taskTable.setItem(row - 1, col, current_data[col])
-    
-    def move_row_down(self, row):
-        """Перемещение данных из указанной строки на одну позицию вниз."""
-        # Сохраняем данные текущей строки
-        current_data = []
-        for col in range(self.taskTable.columnCount()):
-            item = self.taskTable.item(row, col)
-            if item:
-                new_item = QTableWidgetItem(item.text())
-                new_item.setFlags(item.flags())
-                new_item.setBackground(item.background())
-                if col == 0:
-                    new_item.setData(Qt.ItemDataRole.UserRole, item.data(Qt.ItemDataRole.UserRole))
-                current_data.append(new_item)
-            else:
-                current_data.append(None)
-        
-        # Перемещаем данные из нижней строки вверх
-        for col in range(self.taskTable.columnCount()):
-            item = self.taskTable.item(row + 1, col)
-            if item:
-                new_item = QTableWidgetItem(item.text())
-                new_item.setFlags(item.flags())
-                new_item.setBackground(item.background())
-                if col == 0:
-                    new_item.setData(Qt.ItemDataRole.UserRole, item.data(Qt.ItemDataRole.UserRole))
-                self.taskTable.setItem(row, col, new_item)
-        
-        # Вставляем сохраненные данные в нижнюю строку
-        for col in range(self.taskTable.columnCount()):
-            if current_data[col]:
-                self.taskTable.setItem(row + 1, col, current_data[col]) 
\ No newline at end of file
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Менеджер рабочих областей.
+Каждая рабочая область хранится в отдельном файле SQLite. Базы открываются
+при первом обращении, открытыми остаются только несколько последних
+использованных областей, остальные закрываются.
+"""
+
+import os
+import re
+import logging
+import traceback
+from collections import OrderedDict
+from database import DatabaseManager
+from archive_manager import ArchiveManager
+from backup_manager import BackupManager
+from attachment_manager import AttachmentManager
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Название и файл рабочей области по умолчанию (база до появления рабочих областей)
+DEFAULT_WORKSPACE = "Основная"
+DEFAULT_WORKSPACE_PATH = "tasks.db"
+
+# Каталог для файлов новых рабочих областей
+WORKSPACES_DIR = "workspaces"
+
+# Количество одновременно открытых рабочих областей
+WORKSPACE_POOL_SIZE = 3
+
+class Workspace:
+    """Открытая рабочая область: база задач и связанные с ней менеджеры."""
+
+    def __init__(self, name, path, backup_keep):
+        """
+        Открытие базы рабочей области.
+
+        Args:
+            name: Название рабочей области
+            path: Путь к файлу базы данных
+            backup_keep: Количество хранимых резервных копий
+        """
+        self.name = name
+        self.path = path
+        self.db_manager = DatabaseManager(path)
+        self.archive_manager = ArchiveManager(self.db_manager)
+        self.backup_manager = BackupManager(path, keep=backup_keep,
+                                            archive_path=self.archive_manager.archive_path)
+        self.attachment_manager = AttachmentManager(self.db_manager)
+
+    def close(self):
+        """Закрытие соединений рабочей области."""
+        self.attachment_manager.close()
+        self.archive_manager.close()
+        self.db_manager.close()
+
+class WorkspaceManager:
+    """Класс для управления списком рабочих областей и пулом открытых баз."""
+
+    def __init__(self, settings_manager, pool_size=WORKSPACE_POOL_SIZE):
+        """
+        Инициализация менеджера рабочих областей.
+
+        Args:
+            settings_manager: Менеджер настроек (список областей хранится в нем)
+            pool_size: Количество одновременно открытых рабочих областей
+        """
+        self.settings_manager = settings_manager
+        self.pool_size = max(1, pool_size)
+        # Название -> путь к базе в порядке создания
+        self.paths = OrderedDict(settings_manager.load_workspaces() or [(DEFAULT_WORKSPACE, DEFAULT_WORKSPACE_PATH)])
+        # Открытые рабочие области от давно использованной к последней
+        self.pool = OrderedDict()
+        logger.debug(f"Менеджер рабочих областей инициализирован: {len(self.paths)} областей")
+
+    def names(self):
+        """Названия рабочих областей в порядке создания."""
+        return list(self.paths)
+
+    def initial_name(self):
+        """Рабочая область, открытая при последнем запуске (или первая из списка)."""
+        name = self.settings_manager.load_current_workspace()
+        return name if name in self.paths else next(iter(self.paths))
+
+    def get(self, name):
+        """
+        Получение рабочей области с открытием базы при первом обращении.
+
+        Args:
+            name: Название рабочей области
+
+        Returns:
+            Workspace: Открытая рабочая область
+        """
+        workspace = self.pool.get(name)
+        if workspace is not None:
+            self.pool.move_to_end(name)
+            return workspace
+
+        workspace = Workspace(name, self.paths[name], self.settings_manager.load_backup_keep())
+        self.pool[name] = workspace
+        logger.debug(f"Открыта рабочая область '{name}': {workspace.path}")
+
+        # Закрываем давно не использованные области
+        while len(self.pool) > self.pool_size:
+            old_name, old_workspace = self.pool.popitem(last=False)
+            self.close_workspace(old_workspace)
+            logger.debug(f"Рабочая область '{old_name}' закрыта как давно не использованная")
+        return workspace
+
+    def create(self, name):
+        """
+        Создание новой рабочей области в отдельном файле.
+
+        Args:
+            name: Название рабочей области
+
+        Returns:
+            str: Путь к файлу базы новой области
+        """
+        name = name.strip()
+        if not name:
+            raise ValueError("Название рабочей области не может быть пустым")
+        if name in self.paths:
+            raise ValueError(f"Рабочая область '{name}' уже существует")
+
+        # Имя файла из названия области; совпадающие имена получают номер
+        os.makedirs(WORKSPACES_DIR, exist_ok=True)
+        base = re.sub(r"[^\w-]+", "_", name).strip("_") or "workspace"
+        path = os.path.join(WORKSPACES_DIR, f"{base}.db")
+        number = 1
+        used = set(self.paths.values())
+        while path in used or os.path.exists(path):
+            number += 1
+            path = os.path.join(WORKSPACES_DIR, f"{base}_{number}.db")
+
+        self.paths[name] = path
+        self.settings_manager.save_workspaces(list(self.paths.items()))
+        logger.debug(f"Создана рабочая область '{name}': {path}")
+        return path
+
+    def close_workspace(self, workspace):
+        """Закрытие одной рабочей области без прерывания закрытия остальных."""
+        try:
+            workspace.close()
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии рабочей области '{workspace.name}': {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def close_all(self):
+        """Закрытие всех открытых рабочих областей."""
+        while self.pool:
+            _, workspace = self.pool.popitem()
+            self.close_workspace(workspace)